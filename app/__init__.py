@@ -34,10 +34,37 @@ def create_app():
     # Configuration de l'application avec les variables d'environnement
     app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER")
     app.config["TSHARK_PATH"] = os.getenv("TSHARK_PATH")
+    # Nombre de processus utilisés pour décoder les captures (1 = décodage séquentiel)
+    app.config["PACKETS_WORKERS"] = int(os.getenv("PACKETS_WORKERS", "1"))
+    # Conversion des captures : "tshark" (export -T json complet), "fields"
+    # (export -T fields limité aux champs des modèles) ou "native"
+    app.config["PCAP_CONVERTER"] = os.getenv("PCAP_CONVERTER", "tshark")
+    # Budget mémoire du cache des captures chargées (en octets)
+    app.config["CAPTURE_CACHE_MAX_BYTES"] = int(
+        os.getenv("CAPTURE_CACHE_MAX_BYTES", str(512 << 20))
+    )
+    # Écart maximal entre un DENM et la CAM qui lui est associée (en secondes)
+    app.config["DENM_CAM_WINDOW"] = float(os.getenv("DENM_CAM_WINDOW", "60"))
+    # Nombre maximal de points par série des graphiques et méthode de réduction
+    # ("lttb" ou "minmax")
+    app.config["CHART_MAX_POINTS"] = int(os.getenv("CHART_MAX_POINTS", "1000"))
+    app.config["CHART_DOWNSAMPLING"] = os.getenv("CHART_DOWNSAMPLING", "lttb")
+    # Nombre de graphiques calculés en parallèle et de réponses gardées en cache
+    app.config["CHART_WORKERS"] = int(os.getenv("CHART_WORKERS", "4"))
+    app.config["CHART_CACHE_ENTRIES"] = int(os.getenv("CHART_CACHE_ENTRIES", "256"))
+    # Nombre de paquets par page de l'API, par défaut et au maximum
+    app.config["API_PAGE_SIZE"] = int(os.getenv("API_PAGE_SIZE", "100"))
+    app.config["API_MAX_PAGE_SIZE"] = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
     app.secret_key = os.getenv("SECRET_KEY")
     app.logger.debug("Configuration de l'application chargée")
     print("Configuration de l'application chargée.")
 
+    from .extensions import capture_cache, chart_cache
+
+    capture_cache.init_app(app)
+    chart_cache.init_app(app)
+    app.logger.debug("Caches des captures et des graphiques initialisés")
+
     print("Enregistrement des blueprints...")
     # Importation et enregistrement des blueprints pour les vues et l'API
     from .routes.views.views import views_blueprint
@@ -48,19 +75,23 @@ def create_app():
     from .routes.api.paquet.cam import cam_blueprint
     from .routes.api.paquet.denm import denm_blueprint
     from .routes.api.paquet.geo import geo_blueprint
+    from .routes.api.paquet.paquet import paquet_blueprint
 
     app.register_blueprint(cam_blueprint, url_prefix="/api/paquet/cam")
     app.register_blueprint(denm_blueprint, url_prefix="/api/paquet/denm")
     app.register_blueprint(geo_blueprint, url_prefix="/api/paquet/geo")
+    app.register_blueprint(paquet_blueprint, url_prefix="/api/paquet")
     app.logger.debug("Blueprints 'paquet' enregistrés")
 
     from .routes.api.paquets.cam import cam_paq_blueprint
     from .routes.api.paquets.denm import denm_paq_blueprint
     from .routes.api.paquets.geo import geo_paq_blueprint
+    from .routes.api.paquets.paquets import paquets_blueprint
 
     app.register_blueprint(cam_paq_blueprint, url_prefix="/api/paquets/cam")
     app.register_blueprint(denm_paq_blueprint, url_prefix="/api/paquets/denm")
     app.register_blueprint(geo_paq_blueprint, url_prefix="/api/paquets/geo")
+    app.register_blueprint(paquets_blueprint, url_prefix="/api/paquets")
     app.logger.debug("Blueprints 'paquets' enregistrés")
 
     print("Tous les blueprints ont été enregistrés.")
@@ -0,0 +1,8 @@
+from app.services.capture_cache import CaptureCache
+from app.services.chart_cache import ChartCache
+
+# Cache des captures chargées, partagé par toutes les requêtes du processus
+capture_cache = CaptureCache()
+
+# Cache des données des graphiques du tableau de bord
+chart_cache = ChartCache()
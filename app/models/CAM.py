@@ -4,9 +4,35 @@ import datetime
 import re
 
 from app.models.GeoNetworking import GeoNetworking
+from app.models.Packet import to_number
 
 
 class CAM(GeoNetworking):
+    __slots__ = (
+        "generation_delta_time",
+        "station_type",
+        "latitude",
+        "longitude",
+        "semi_major_confidence",
+        "semi_minor_confidence",
+        "semi_major_orientation",
+        "altitude_value",
+        "altitude_confidence",
+    )
+
+    TSHARK_FIELDS = {
+        **GeoNetworking.TSHARK_FIELDS,
+        "generation_delta_time": "cam.generationDeltaTime",
+        "station_type": "its.stationType",
+        "latitude": "its.latitude",
+        "longitude": "its.longitude",
+        "semi_major_confidence": "its.semiMajorAxisLength",
+        "semi_minor_confidence": "its.semiMinorAxisLength",
+        "semi_major_orientation": "its.semiMajorAxisOrientation",
+        "altitude_value": "its.altitudeValue",
+        "altitude_confidence": "its.altitudeConfidence",
+    }
+
     def __init__(
         self,
         src_mac,
@@ -31,6 +57,7 @@ class CAM(GeoNetworking):
         altitude_confidence,
         stationID,
         seq_num=0,
+        utc_offset=None,
     ):
         super().__init__(
             src_mac,
@@ -46,16 +73,17 @@ class CAM(GeoNetworking):
             src_pos_speed,
             stationID,
             seq_num,
+            utc_offset,
         )
-        self.generation_delta_time = generation_delta_time
-        self.station_type = station_type
-        self.latitude = latitude
-        self.longitude = longitude
-        self.semi_major_confidence = semi_major_confidence
-        self.semi_minor_confidence = semi_minor_confidence
-        self.semi_major_orientation = semi_major_orientation
-        self.altitude_value = altitude_value
-        self.altitude_confidence = altitude_confidence
+        self.generation_delta_time = to_number(generation_delta_time)
+        self.station_type = to_number(station_type)
+        self.latitude = to_number(latitude)
+        self.longitude = to_number(longitude)
+        self.semi_major_confidence = to_number(semi_major_confidence)
+        self.semi_minor_confidence = to_number(semi_minor_confidence)
+        self.semi_major_orientation = to_number(semi_major_orientation)
+        self.altitude_value = to_number(altitude_value)
+        self.altitude_confidence = to_number(altitude_confidence)
 
     def __str__(self):
         return (
@@ -107,7 +135,7 @@ class CAM(GeoNetworking):
             src_mac=geo_packet.src_mac,
             dst_mac=geo_packet.dst_mac,
             protocol=geo_packet.protocol,
-            time=geo_packet.time,
+            time=geo_packet.timestamp,
             frame_number=geo_packet.frame_number,
             frame_len=geo_packet.frame_len,
             eth_type=geo_packet.eth_type,
@@ -117,6 +145,7 @@ class CAM(GeoNetworking):
             src_pos_speed=geo_packet.src_pos_speed,
             stationID=geo_packet.stationID,
             seq_num=geo_packet.seq_num,
+            utc_offset=geo_packet.utc_offset,
             generation_delta_time=cam_info["cam.generationDeltaTime"],
             station_type=basic_container["its.stationType"],
             latitude=ref_pos["its.latitude"],
@@ -140,11 +169,13 @@ class CAM(GeoNetworking):
         """Check if a given position is within a certain radius of the CAM's position
 
         Args:
-            lat (float): The latitude of the point to check
-            long (float): The longitude of the point to check
+            lat (float): The latitude of the point to check, in degrees
+            long (float): The longitude of the point to check, in degrees
             radius (float): The radius in kilometers
 
         Returns:
             bool: True if the point is within the radius, False otherwise
         """
-        return self.haversine(self.latitude, self.longitude, lat, long) <= radius
+        # Les positions ITS sont en dixièmes de microdegré
+        latitude, longitude = float(self.latitude) / 1e7, float(self.longitude) / 1e7
+        return self.haversine(latitude, longitude, lat, long) <= radius
@@ -0,0 +1,271 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from app.models.CAM import CAM
+from app.utils import geodesy
+
+# Durée des tranches de temps de l'index (en secondes)
+TIME_SLICE = 60.0
+# Côté des cellules de la grille spatiale de chaque tranche (en kilomètres)
+CELL_SIZE_KM = 0.5
+# Fenêtres plus petites : toutes les CAM de la fenêtre sont comparées
+SCAN_LIMIT = 32
+# Marge entre les distances NumPy et les distances scalaires (relative, en km)
+RELATIVE_TOLERANCE = 1e-9
+ABSOLUTE_TOLERANCE = 1e-9
+
+
+class _Series:
+    """The CAMs of one station type, sorted by time
+
+    Each time slice of ``TIME_SLICE`` seconds has a grid of cells of
+    ``CELL_SIZE_KM``: ``slices`` maps a slice number to the (i, j) cell of
+    each non-empty cell, the offsets of the cells in ``members``, and the
+    CAMs of the cells (positions in the series, ascending).
+    """
+
+    __slots__ = (
+        "times",
+        "lat",
+        "lon",
+        "rows",
+        "slices",
+        "min_cos",
+        "cell",
+    )
+
+    def __init__(self, times, lat, lon, rows, cell):
+        self.times = times
+        self.lat = lat
+        self.lon = lon
+        self.rows = rows
+        self.cell = cell
+
+        # Borne basse de cos(latitude) des CAM, pour borner les distances en
+        # longitude ; sans borne si la série traverse l'antiméridien
+        if len(lon) and lon.max() - lon.min() <= 180:
+            self.min_cos = max(math.cos(math.radians(np.abs(lat).max() + cell)), 0.0)
+        else:
+            self.min_cos = 0.0
+
+        self.slices = {}
+        slice_ids = np.floor(times / TIME_SLICE).astype(np.int64)
+        cell_i = np.floor(lat / cell).astype(np.int64)
+        cell_j = np.floor(lon / cell).astype(np.int64)
+        members = np.lexsort((cell_j, cell_i, slice_ids))
+        keys = np.stack(
+            [slice_ids[members], cell_i[members], cell_j[members]], axis=1
+        )
+        changes = np.diff(keys, axis=0) != 0
+        cell_starts = np.concatenate(([0], np.flatnonzero(changes.any(axis=1)) + 1))
+        slice_starts = np.flatnonzero(changes[:, 0]) + 1
+        slice_starts = np.concatenate(([0], slice_starts, [len(members)]))
+        for first, end in zip(slice_starts[:-1].tolist(), slice_starts[1:].tolist()):
+            cells = cell_starts[
+                np.searchsorted(cell_starts, first) : np.searchsorted(cell_starts, end)
+            ]
+            self.slices[int(keys[first, 0])] = (
+                keys[cells, 1],
+                keys[cells, 2],
+                np.append(cells - first, end - first),
+                members[first:end],
+            )
+
+    def distances(self, indices, lat, lon):
+        """Compute the haversine distances from a point to some CAMs
+
+        Args:
+            indices (np.ndarray): The positions of the CAMs in the series
+            lat (float): The latitude of the point, in degrees
+            lon (float): The longitude of the point, in degrees
+
+        Returns:
+            np.ndarray: The distances, in kilometers
+        """
+        return geodesy.one_to_many(lat, lon, self.lat[indices], self.lon[indices])
+
+    def lower_bound(self, ring, lat):
+        """Bound the distance from a point to the CAMs of a ring of cells
+
+        Args:
+            ring (int): The Chebyshev distance between the cells and the cell
+                of the point
+            lat (float): The latitude of the point, in degrees
+
+        Returns:
+            float: A distance no CAM of the ring is closer than, in kilometers
+        """
+        gap = math.radians(max(ring - 1, 0) * self.cell)
+        along_latitude = geodesy.EARTH_RADIUS_KM * gap
+        cos_product = max(math.cos(math.radians(lat)), 0.0) * self.min_cos
+        half_chord = math.sqrt(cos_product) * math.sin(min(gap, math.pi) / 2)
+        along_longitude = 2 * geodesy.EARTH_RADIUS_KM * math.asin(min(half_chord, 1.0))
+        return min(along_latitude, along_longitude)
+
+
+class CamIndex:
+    """A spatio-temporal index of the CAMs of a capture
+
+    The CAMs are grouped by station type and sorted by time, so the CAMs of
+    a time window are a contiguous range found by binary search. Inside each
+    time slice, a grid of cells lets the nearest CAM be searched from the
+    cell of the point outwards, stopping as soon as the next cells are
+    further than the closest CAM found.
+
+    ``nearest`` returns exactly the CAM the linear scan would: the distances
+    computed with NumPy only shortlist the candidates, the closest is then
+    chosen with ``geodesy.distance`` in the order of the capture, the first
+    one winning a tie. Like the scan, which compared the ``time`` field of
+    the packets, the times are truncated to the second.
+    """
+
+    def __init__(self, series):
+        """Create an index from its series
+
+        Args:
+            series (Dict[object, _Series]): The CAMs of each station type
+        """
+        self.series = series
+
+    @staticmethod
+    def from_table(table, cell_size: float = CELL_SIZE_KM):
+        """Build the index of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+            cell_size (float): The side of the cells of the grid, in kilometers
+
+        Returns:
+            CamIndex: The index
+        """
+        rows = np.flatnonzero(table.type_mask(CAM))
+        # Temps à la seconde, comme le champ « time » des paquets
+        times = np.floor(table.epoch[rows])
+        lat = table.degrees("latitude")[rows]
+        lon = table.degrees("longitude")[rows]
+        valid = np.isfinite(times) & np.isfinite(lat) & np.isfinite(lon)
+        rows, times, lat, lon = rows[valid], times[valid], lat[valid], lon[valid]
+
+        by_type = defaultdict(list)
+        for index, station_type in enumerate(table.values("station_type", rows)):
+            by_type[station_type].append(index)
+
+        cell = math.degrees(cell_size / geodesy.EARTH_RADIUS_KM)
+        series = {}
+        for station_type, indices in by_type.items():
+            indices = np.array(indices)
+            # Tri stable : à temps égal, l'ordre de la capture est conservé
+            indices = indices[np.argsort(times[indices], kind="stable")]
+            series[station_type] = _Series(
+                times[indices], lat[indices], lon[indices], rows[indices], cell
+            )
+        return CamIndex(series)
+
+    def nearest(self, station_type, time, position, window):
+        """Find the CAM closest to a position within a time window
+
+        Args:
+            station_type (int): The station type of the CAMs
+            time (float): The time, in seconds since the epoch
+            position (Tuple[float, float]): The latitude and longitude, in degrees
+            window (float): The maximum time between the CAM and ``time``,
+                in seconds
+
+        Returns:
+            Tuple[float, float]: The position of the closest CAM, in degrees,
+            None if no CAM of the station type was sent within the window
+        """
+        series = self.series.get(station_type)
+        if series is None or math.isnan(time):
+            return None
+        time = math.floor(time)
+        start = int(np.searchsorted(series.times, time - window, side="left"))
+        end = int(np.searchsorted(series.times, time + window, side="right"))
+        if start >= end:
+            return None
+
+        lat, lon = position
+        if end - start <= SCAN_LIMIT:
+            candidates = np.arange(start, end)
+        else:
+            candidates = self._candidates(series, start, end, time, window, lat, lon)
+
+        # Choix final comme le parcours linéaire, dans l'ordre de la capture
+        closest = None
+        min_distance = float("inf")
+        for index in candidates[np.argsort(series.rows[candidates])].tolist():
+            cam_pos = (float(series.lat[index]), float(series.lon[index]))
+            distance = geodesy.distance(*position, *cam_pos)
+            if distance < min_distance:
+                min_distance = distance
+                closest = cam_pos
+        return closest
+
+    @staticmethod
+    def _candidates(series, start, end, time, window, lat, lon):
+        """Shortlist the CAMs of a window that may be the closest to a position
+
+        Args:
+            series (_Series): The CAMs of the station type
+            start (int): The first CAM of the window in the series
+            end (int): The CAM after the last one of the window
+            time (float): The time, in seconds since the epoch
+            window (float): The maximum time between the CAM and ``time``
+            lat (float): The latitude, in degrees
+            lon (float): The longitude, in degrees
+
+        Returns:
+            np.ndarray: The positions in the series of the CAMs whose distance
+            is within the tolerance of the smallest one
+        """
+        i = math.floor(lat / series.cell)
+        j = math.floor(lon / series.cell)
+        first = math.floor((time - window) / TIME_SLICE)
+        last = math.floor((time + window) / TIME_SLICE)
+
+        # Cellules non vides des tranches de la fenêtre, par anneau autour du point
+        grids = [
+            series.slices[slice_id]
+            for slice_id in range(first, last + 1)
+            if slice_id in series.slices
+        ]
+        rings = [np.maximum(np.abs(grid[0] - i), np.abs(grid[1] - j)) for grid in grids]
+        grid_of_cell = np.repeat(np.arange(len(grids)), [len(ring) for ring in rings])
+        cell_of_cell = np.concatenate([np.arange(len(ring)) for ring in rings])
+        rings = np.concatenate(rings)
+        order = np.argsort(rings, kind="stable")
+        rings = rings[order].tolist()
+        cells = list(zip(grid_of_cell[order].tolist(), cell_of_cell[order].tolist()))
+
+        found, distances = [], []
+        best = float("inf")
+        position = 0
+        while position < len(cells):
+            ring = rings[position]
+            limit = best * (1 + RELATIVE_TOLERANCE) + ABSOLUTE_TOLERANCE
+            if limit < series.lower_bound(ring, lat):
+                break
+            # Les CAM d'une cellule sont triées par temps : la fenêtre est une tranche
+            ring_indices = []
+            while position < len(cells) and rings[position] == ring:
+                grid, cell = cells[position]
+                _, _, offsets, members = grids[grid]
+                indices = members[offsets[cell] : offsets[cell + 1]]
+                low, high = np.searchsorted(indices, (start, end))
+                if low < high:
+                    ring_indices.append(indices[low:high])
+                position += 1
+            if ring_indices:
+                indices = np.concatenate(ring_indices)
+                ring_distances = series.distances(indices, lat, lon)
+                best = min(best, float(ring_distances.min()))
+                found.append(indices)
+                distances.append(ring_distances)
+
+        if not found:
+            return np.array([], dtype=np.int64)
+        found, distances = np.concatenate(found), np.concatenate(distances)
+        # Les NaN éventuels ne sont jamais plus proches (comme avec `<`)
+        return found[distances <= best * (1 + RELATIVE_TOLERANCE) + ABSOLUTE_TOLERANCE]
@@ -4,6 +4,7 @@ import datetime
 import re
 
 from app.models.GeoNetworking import GeoNetworking
+from app.models.Packet import to_number
 
 
 class DENM(GeoNetworking):
@@ -11,6 +12,39 @@ class DENM(GeoNetworking):
     A class to represent a DENM packet
     """
 
+    __slots__ = (
+        "originating_station_id",
+        "sequence_number",
+        "detection_time",
+        "reference_time",
+        "latitude",
+        "longitude",
+        "semi_major_confidence",
+        "semi_minor_confidence",
+        "semi_major_orientation",
+        "altitude",
+        "altitude_confidence",
+        "validity_duration",
+        "station_type",
+    )
+
+    TSHARK_FIELDS = {
+        **GeoNetworking.TSHARK_FIELDS,
+        "originating_station_id": "its.originatingStationId",
+        "sequence_number": "its.sequenceNumber",
+        "detection_time": "denm.detectionTime",
+        "reference_time": "denm.referenceTime",
+        "latitude": "its.latitude",
+        "longitude": "its.longitude",
+        "semi_major_confidence": "its.semiMajorConfidence",
+        "semi_minor_confidence": "its.semiMinorConfidence",
+        "semi_major_orientation": "its.semiMajorOrientation",
+        "altitude": "its.altitudeValue",
+        "altitude_confidence": "its.altitudeConfidence",
+        "validity_duration": "denm.validityDuration",
+        "station_type": "denm.stationType",
+    }
+
     def __init__(
         self,
         src_mac,
@@ -39,6 +73,7 @@ class DENM(GeoNetworking):
         station_type,
         stationID,
         seq_num=0,
+        utc_offset=None,
     ):
         """Create a DENM packet
 
@@ -46,7 +81,7 @@ class DENM(GeoNetworking):
             src_mac (str): Source MAC address
             dst_mac (str): Destination MAC address
             protocol (str): Protocol
-            time (str): Time
+            time (float | str): Time, as an epoch or a frame.time string
             frame_number (int): Frame number
             frame_len (int): Frame length
             eth_type (str): Ethernet type
@@ -56,8 +91,8 @@ class DENM(GeoNetworking):
             src_pos_speed (float): Source position speed
             originating_station_id (int): Originating station ID
             sequence_number (int): Sequence number
-            detection_time (str): Detection time
-            reference_time (str): Reference time
+            detection_time (int): Detection time
+            reference_time (int): Reference time
             latitude (float): Latitude
             longitude (float): Longitude
             semi_major_confidence (float): Semi-major confidence
@@ -68,6 +103,8 @@ class DENM(GeoNetworking):
             validity_duration (int): Validity duration
             station_type (int): Station type
             stationID (int): Station ID
+            seq_num (int): Sequence number
+            utc_offset (int): UTC offset of the capture, in seconds
         """
         super().__init__(
             src_mac,
@@ -83,20 +120,21 @@ class DENM(GeoNetworking):
             src_pos_speed,
             stationID,
             seq_num,
+            utc_offset,
         )
-        self.originating_station_id = originating_station_id
-        self.sequence_number = sequence_number
-        self.detection_time = detection_time
-        self.reference_time = reference_time
-        self.latitude = latitude
-        self.longitude = longitude
-        self.semi_major_confidence = semi_major_confidence
-        self.semi_minor_confidence = semi_minor_confidence
-        self.semi_major_orientation = semi_major_orientation
-        self.altitude = altitude
-        self.altitude_confidence = altitude_confidence
-        self.validity_duration = validity_duration
-        self.station_type = station_type
+        self.originating_station_id = to_number(originating_station_id)
+        self.sequence_number = to_number(sequence_number)
+        self.detection_time = to_number(detection_time)
+        self.reference_time = to_number(reference_time)
+        self.latitude = to_number(latitude)
+        self.longitude = to_number(longitude)
+        self.semi_major_confidence = to_number(semi_major_confidence)
+        self.semi_minor_confidence = to_number(semi_minor_confidence)
+        self.semi_major_orientation = to_number(semi_major_orientation)
+        self.altitude = to_number(altitude)
+        self.altitude_confidence = to_number(altitude_confidence)
+        self.validity_duration = to_number(validity_duration)
+        self.station_type = to_number(station_type)
 
     def __str__(self):
         """To string method
@@ -162,7 +200,7 @@ class DENM(GeoNetworking):
             src_mac=geo_packet.src_mac,
             dst_mac=geo_packet.dst_mac,
             protocol=geo_packet.protocol,
-            time=geo_packet.time,
+            time=geo_packet.timestamp,
             frame_number=geo_packet.frame_number,
             frame_len=geo_packet.frame_len,
             eth_type=geo_packet.eth_type,
@@ -175,6 +213,7 @@ class DENM(GeoNetworking):
             ],
             stationID=geo_packet.stationID,
             seq_num=geo_packet.seq_num,
+            utc_offset=geo_packet.utc_offset,
             sequence_number=denm_info["denm.actionId_element"]["its.sequenceNumber"],
             detection_time=denm_info["denm.detectionTime"],
             reference_time=denm_info["denm.referenceTime"],
@@ -201,11 +240,13 @@ class DENM(GeoNetworking):
         """Check if a given position is within a certain radius of the DENM's event position
 
         Args:
-            lat (float): The latitude of the point to check
-            long (float): The longitude of the point to check
+            lat (float): The latitude of the point to check, in degrees
+            long (float): The longitude of the point to check, in degrees
             radius (float): The radius in kilometers
 
         Returns:
             bool: True if the point is within the radius, False otherwise
         """
-        return self.haversine(self.latitude, self.longitude, lat, long) <= radius
+        # Les positions ITS sont en dixièmes de microdegré
+        latitude, longitude = float(self.latitude) / 1e7, float(self.longitude) / 1e7
+        return self.haversine(latitude, longitude, lat, long) <= radius
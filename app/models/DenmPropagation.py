@@ -0,0 +1,215 @@
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from app.models.DENM import DENM
+
+# Une réception d'un DENM : numéro de séquence GeoNetworking, RHL, heure,
+# station relais (d'après la MAC source), position de l'événement en degrés,
+# type de station et décalage UTC de l'horloge de la capture
+Reception = namedtuple(
+    "Reception",
+    ["seq_num", "rhl", "time", "relay", "position", "station_type", "utc_offset"],
+)
+
+
+class DenmMessage:
+    """The receptions of one DENM, identified by its action ID
+
+    Attributes:
+        station_id (int): The originating station ID
+        sequence_number (int): The sequence number of the action ID
+        receptions (List[Reception]): Every reception, in capture order
+        unique (List[Reception]): The first reception of each GeoNetworking
+            sequence number (seq_num), in capture order
+        hops (List[Reception]): The first reception of each RHL value, in
+            capture order
+    """
+
+    __slots__ = ("station_id", "sequence_number", "receptions", "unique", "hops")
+
+    def __init__(self, station_id, sequence_number):
+        """Create a DENM without receptions
+
+        Args:
+            station_id (int): The originating station ID
+            sequence_number (int): The sequence number of the action ID
+        """
+        self.station_id = station_id
+        self.sequence_number = sequence_number
+        self.receptions = []
+        self.unique = []
+        self.hops = []
+
+
+class DenmPropagation:
+    """The propagation of the DENMs of a capture, built in one pass
+
+    Every DENM reception is grouped under its message (originating station,
+    sequence number), with the station that relayed it. The hops, repetition
+    and reception distributions and the DENM map are projections of this
+    model.
+
+    Attributes:
+        messages (Dict[int, Dict[int, DenmMessage]]): The messages of each
+            originating station, by sequence number, in order of their first
+            reception
+    """
+
+    def __init__(self, messages):
+        """Create a model from its messages
+
+        Args:
+            messages (Dict[int, Dict[int, DenmMessage]]): The messages
+        """
+        self.messages = messages
+
+    @staticmethod
+    def from_table(table, station_index):
+        """Build the model of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+            station_index (StationIndex): The station behind each MAC address
+
+        Returns:
+            DenmPropagation: The model
+        """
+        rows = np.flatnonzero(table.type_mask(DENM))
+        times = table.epoch[rows].tolist()
+        if "utc_offset" in table.columns:
+            utc_offsets = table.values("utc_offset", rows)
+        else:
+            utc_offsets = [None] * len(rows)
+        positions = zip(
+            table.degrees("latitude")[rows].tolist(),
+            table.degrees("longitude")[rows].tolist(),
+        )
+        records = zip(
+            table.values("originating_station_id", rows),
+            table.values("sequence_number", rows),
+            table.values("seq_num", rows),
+            table.values("rhl", rows),
+            table.values("src_mac", rows),
+            table.values("station_type", rows),
+            times,
+            positions,
+            utc_offsets,
+        )
+
+        messages = defaultdict(dict)
+        seen = {}  # message -> (seq_num vus, RHL vus)
+        for record in records:
+            station, sequence, seq_num, rhl, mac, kind, time, position, offset = record
+            message = messages[station].get(sequence)
+            if message is None:
+                message = messages[station][sequence] = DenmMessage(station, sequence)
+                seen[station, sequence] = (set(), set())
+            reception = Reception(
+                seq_num,
+                rhl,
+                time,
+                station_index.station(mac, time),
+                position,
+                kind,
+                offset,
+            )
+            message.receptions.append(reception)
+            seq_nums, rhls = seen[station, sequence]
+            if seq_num not in seq_nums:
+                seq_nums.add(seq_num)
+                message.unique.append(reception)
+            if rhl not in rhls:
+                rhls.add(rhl)
+                message.hops.append(reception)
+        return DenmPropagation(dict(messages))
+
+    def __iter__(self):
+        """Iterate over the messages, by station then sequence number
+
+        Returns:
+            Iterator[DenmMessage]: The messages, in order of first reception
+        """
+        for sequences in self.messages.values():
+            yield from sequences.values()
+
+    def stations(self):
+        """Get the originating stations
+
+        Returns:
+            List[int]: The stations, in order of their first DENM
+        """
+        return list(self.messages)
+
+    def reception_distribution(self):
+        """Count the distinct receptions (by seq_num) of each DENM
+
+        Returns:
+            defaultdict: The hop count (distinct receptions minus one) and the
+            receptions by relaying station of each DENM, by originating station
+        """
+        data = defaultdict(list)
+        for message in self:
+            data[message.station_id].append(
+                {
+                    "hop_count": len(message.unique) - 1,
+                    "passage_details": _count_relays(message.unique),
+                }
+            )
+        return data
+
+    def repetition_distribution(self):
+        """Count all the receptions of each DENM, repetitions included
+
+        Returns:
+            defaultdict: The repetition count (receptions minus one) and the
+            receptions by relaying station of each DENM, by originating station
+        """
+        data = defaultdict(list)
+        for message in self:
+            data[message.station_id].append(
+                {
+                    "hop_count": len(message.receptions) - 1,
+                    "passage_details": _count_relays(message.receptions),
+                }
+            )
+        return data
+
+    def hops_distribution(self):
+        """Follow the RHL hop chain of each DENM
+
+        Returns:
+            defaultdict: The number of distinct RHL values, the receptions by
+            relaying station and the relaying stations in order of each DENM,
+            by originating station
+        """
+        data = defaultdict(list)
+        for message in self:
+            data[message.station_id].append(
+                {
+                    "hop_count": len(message.hops),
+                    "passage_details": _count_relays(message.hops),
+                    "passage_path": [
+                        reception.relay
+                        for reception in message.hops
+                        if reception.relay is not None
+                    ],
+                }
+            )
+        return data
+
+
+def _count_relays(receptions):
+    """Count receptions by relaying station
+
+    Args:
+        receptions (List[Reception]): The receptions
+
+    Returns:
+        defaultdict: The number of receptions of each known relaying station
+    """
+    counts = defaultdict(int)
+    for reception in receptions:
+        if reception.relay is not None:
+            counts[reception.relay] += 1
+    return counts
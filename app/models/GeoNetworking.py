@@ -2,10 +2,13 @@ import json
 import os
 import datetime
 import re
-import math
 
 
-from app.models.Packet import Packet
+from app.models.Packet import Packet, to_number
+from app.utils import geodesy
+
+# Type d'en-tête commun d'un paquet GeoBroadcast (ETSI EN 302 636-4-1)
+GEOBROADCAST_HEADER_TYPE = 4
 
 
 class GeoNetworking(Packet):
@@ -20,6 +23,27 @@ class GeoNetworking(Packet):
         seq_num (int): Sequence number
     """
 
+    __slots__ = (
+        "rhl",
+        "src_pos_lat",
+        "src_pos_long",
+        "src_pos_speed",
+        "stationID",
+        "seq_num",
+    )
+
+    TSHARK_FIELDS = {
+        **Packet.TSHARK_FIELDS,
+        "rhl": "geonw.bh.rhl",
+        "src_pos_lat": "geonw.src_pos.lat",
+        "src_pos_long": "geonw.src_pos.long",
+        "src_pos_speed": "geonw.src_pos.speed",
+        "stationID": "its.stationId",
+        "seq_num": "geonw.seq_num",
+    }
+    # Type d'en-tête : seul le numéro de séquence d'un GeoBroadcast est lu
+    TSHARK_EXTRA_FIELDS = ("geonw.ch.htype",)
+
     def __init__(
         self,
         src_mac,
@@ -35,6 +59,7 @@ class GeoNetworking(Packet):
         src_pos_speed,
         stationID,
         seq_num=0,
+        utc_offset=None,
     ):
         """Create a GeoNetworking packet
 
@@ -42,7 +67,7 @@ class GeoNetworking(Packet):
             src_mac (str): Source MAC address
             dst_mac (str): Destination MAC address
             protocol (str): Protocol
-            time (str): Time
+            time (float | str): Time, as an epoch or a frame.time string
             frame_number (int): Frame number
             frame_len (int): Frame length
             eth_type (str): Ethernet type
@@ -52,6 +77,7 @@ class GeoNetworking(Packet):
             src_pos_speed (float): Source position speed
             stationID (int): Station ID
             seq_num (int): Sequence number
+            utc_offset (int): UTC offset of the capture, in seconds
         """
         super().__init__(
             src_mac,
@@ -61,13 +87,14 @@ class GeoNetworking(Packet):
             frame_number,
             frame_len,
             eth_type,
+            utc_offset,
         )
-        self.rhl = rhl
-        self.src_pos_lat = src_pos_lat
-        self.src_pos_long = src_pos_long
-        self.src_pos_speed = src_pos_speed
-        self.stationID = stationID
-        self.seq_num = seq_num
+        self.rhl = to_number(rhl)
+        self.src_pos_lat = to_number(src_pos_lat)
+        self.src_pos_long = to_number(src_pos_long)
+        self.src_pos_speed = to_number(src_pos_speed)
+        self.stationID = to_number(stationID)
+        self.seq_num = to_number(seq_num)
 
     def __str__(self):
         """To string method
@@ -135,11 +162,12 @@ class GeoNetworking(Packet):
         except KeyError:
             seq_num = 0
 
+        timestamp, utc_offset = Packet.frame_clock(packet_dict["frame"])
         return GeoNetworking(
             src_mac=packet_dict["eth"]["eth.src"],
             dst_mac=packet_dict["eth"]["eth.dst"],
             protocol=packet_dict["frame"]["frame.protocols"],
-            time=packet_dict["frame"]["frame.time"],
+            time=timestamp,
             frame_number=packet_dict["frame"]["frame.number"],
             frame_len=packet_dict["frame"]["frame.len"],
             eth_type=packet_dict["eth"]["eth.type"],
@@ -150,8 +178,26 @@ class GeoNetworking(Packet):
             # {Root}._source.layers.its.its.ItsPduHeader_element its.stationId
             stationID=packet_dict["its"]["its.ItsPduHeader_element"]["its.stationId"],
             seq_num=seq_num,
+            utc_offset=utc_offset,
         )
 
+    @classmethod
+    def _arguments_from_fields(cls, fields):
+        """Get the constructor arguments from a row of a tshark -T fields export
+
+        Args:
+            fields (dict): The values of the row, by tshark field name
+
+        Returns:
+            dict: The constructor arguments
+        """
+        arguments = super()._arguments_from_fields(fields)
+        # Comme from_dict, le numéro de séquence n'est lu que dans l'en-tête GBC
+        header_type = int(fields.get("geonw.ch.htype") or "0", 0)
+        if GEOBROADCAST_HEADER_TYPE not in (header_type, header_type >> 4):
+            arguments["seq_num"] = 0
+        return arguments
+
     @staticmethod
     def from_json(packet_json):
         """Create a GeoNetworking packet from a JSON string
@@ -190,13 +236,17 @@ class GeoNetworking(Packet):
         """Calculate the distance between the source position and a given position
 
         Args:
-            lat (float): The latitude
-            long (float): The longitude
+            lat (float): The latitude, in degrees
+            long (float): The longitude, in degrees
 
         Returns:
-            float: The distance between the source position and the given position
+            float: The distance in kilometers between the source position and the
+            given position
         """
-        return self.haversine(lat, long, self.src_pos_lat, self.src_pos_long)
+        # Les positions GeoNetworking sont en dixièmes de microdegré
+        return self.haversine(
+            lat, long, float(self.src_pos_lat) / 1e7, float(self.src_pos_long) / 1e7
+        )
 
     @staticmethod
     def haversine(lat1, long1, lat2, long2):
@@ -209,18 +259,6 @@ class GeoNetworking(Packet):
             long2 (float): The longitude of the second point
 
         Returns:
-            float: The haversine distance between the two points
+            float: The haversine distance between the two points, in kilometers
         """
-        # Convert latitude and longitude from degrees to radians
-        lat1, long1, lat2, long2 = map(math.radians, [lat1, long1, lat2, long2])
-
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlong = long2 - long1
-        a = (
-            math.sin(dlat / 2) ** 2
-            + math.cos(lat1) * math.cos(lat2) * math.sin(dlong / 2) ** 2
-        )
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        r = 6371  # Radius of Earth in kilometers. Use 3956 for miles
-        return c * r
+        return geodesy.distance(lat1, long1, lat2, long2)
@@ -2,8 +2,177 @@ import json
 import os
 import datetime
 import re
+import math
+import sys
+import calendar
+import time as _time
 from dateutil import parser
 
+# Format du champ frame.time de tshark : 'Jun 12, 2024 10:15:23.123456789 CEST'
+_WALL_CLOCK = r"([A-Z][a-z]{2}) +(\d{1,2}), (\d{4}) (\d{2}):(\d{2}):(\d{2})(\.\d+)?"
+_FRAME_TIME = re.compile(_WALL_CLOCK + r"(?: (\S+))?$")
+# Heure locale seule : les versions récentes de tshark écrivent le nom complet
+# du fuseau ('Central European Summer Time')
+_FRAME_WALL_CLOCK = re.compile(_WALL_CLOCK)
+_MONTHS = {
+    month: number
+    for number, month in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), start=1
+    )
+}
+# Fuseaux que dateutil reconnaît sans tzinfos, les autres noms sont ignorés
+_UTC_NAMES = ("UTC", "GMT", "Z")
+# Décalages UTC déjà rencontrés, partagés par les paquets
+_UTC_OFFSETS = {}
+
+
+def to_number(value):
+    """Convert a numeric field of tshark to an int or a float
+
+    Args:
+        value (str): The value, as exported by tshark
+
+    Returns:
+        int | float | str: The number, or the interned string if the value is
+        not a number (e.g. a missing field)
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return sys.intern(value)
+
+
+def intern_string(value):
+    """Share the repeated strings (MAC addresses, protocol stacks) between packets
+
+    Args:
+        value (str): The value
+
+    Returns:
+        str: The interned string, other values unchanged
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def format_timestamp(timestamp, utc_offset=None):
+    """Format seconds since the epoch for display
+
+    Args:
+        timestamp (float): The seconds since the epoch
+        utc_offset (int): The UTC offset of the capture at that time, in
+            seconds, None to use the local time zone of the server
+
+    Returns:
+        str: The wall-clock time in 'YYYY-MM-DD HH:MM:SS' format
+    """
+    if math.isnan(timestamp):
+        return "Invalid date format"
+    return wall_clock_time(timestamp, utc_offset).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def wall_clock_time(timestamp, utc_offset=None):
+    """Get the wall-clock time of the capture at seconds since the epoch
+
+    Args:
+        timestamp (float): The seconds since the epoch
+        utc_offset (int): The UTC offset of the capture at that time, in
+            seconds, None to use the local time zone of the server
+
+    Returns:
+        datetime.datetime: The naive wall-clock time, to the second as in
+        the 'YYYY-MM-DD HH:MM:SS' format
+    """
+    if utc_offset is None:
+        moment = datetime.datetime.fromtimestamp(timestamp)
+    else:
+        moment = datetime.datetime.fromtimestamp(
+            timestamp + utc_offset, datetime.timezone.utc
+        ).replace(tzinfo=None)
+    return moment.replace(microsecond=0)
+
+
+def frame_utc_offset(frame_time, timestamp):
+    """Get the UTC offset of the wall-clock time of a frame.time string
+
+    tshark writes frame.time in the time zone of the machine that exported
+    the capture. The offset is the difference between that wall-clock time
+    and the epoch of the frame, rounded to 15 minutes.
+
+    Args:
+        frame_time (str): The frame.time string, None if absent
+        timestamp (float): The seconds since the epoch of the frame
+
+    Returns:
+        int: The offset in seconds, None if the string is not in the tshark
+        format
+    """
+    match = _FRAME_WALL_CLOCK.match(frame_time) if isinstance(frame_time, str) else None
+    if not match or match.group(1) not in _MONTHS or math.isnan(timestamp):
+        return None
+    offset = round((_wall_clock(match.groups()) - timestamp) / 900) * 900
+    return _UTC_OFFSETS.setdefault(offset, offset)
+
+
+def _wall_clock(groups):
+    """Read the wall-clock time of a frame.time string as if it were UTC
+
+    Args:
+        groups (tuple): The month, day, year, hour, minute, second and
+            fraction groups of _WALL_CLOCK
+
+    Returns:
+        float: The seconds since the epoch of that time in UTC
+    """
+    month, day, year, hour, minute, second, fraction = groups[:7]
+    fields = (int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second))
+    return calendar.timegm(fields) + (float(fraction) if fraction else 0.0)
+
+
+def parse_frame_time(value):
+    """Convert a frame time to seconds since the epoch
+
+    Accepts an epoch (frame.time_epoch, as a number or a string) or a
+    frame.time string. The tshark format is parsed with a fixed-format
+    parser, other formats with dateutil. As with dateutil, a time zone name
+    other than UTC/GMT is ignored and the time is read as local time.
+
+    Args:
+        value (float | str): The frame time
+
+    Returns:
+        float: The seconds since the epoch, NaN if the time could not be parsed
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+
+    match = _FRAME_TIME.match(value) if isinstance(value, str) else None
+    if match and match.group(1) in _MONTHS:
+        month, day, year, hour, minute, second, fraction, zone = match.groups()
+        if zone in _UTC_NAMES:
+            return _wall_clock(match.groups())
+        fields = (int(year), _MONTHS[month], int(day))
+        fields += (int(hour), int(minute), int(second), 0, 0, -1)
+        return _time.mktime(fields) + (float(fraction) if fraction else 0.0)
+
+    try:
+        parsed_date = parser.parse(value)
+    except (ValueError, TypeError, OverflowError) as e:
+        print(f"Error parsing date: {e}")
+        return math.nan
+    if parsed_date.tzinfo is None:
+        return _time.mktime(parsed_date.timetuple()) + parsed_date.microsecond / 1e6
+    return parsed_date.timestamp()
+
 
 class Packet:
     """
@@ -13,14 +182,50 @@ class Packet:
         src_mac (str): Source MAC address
         dst_mac (str): Destination MAC address
         protocol (str): Protocol
-        time (str): Time
+        timestamp (float): Time, in seconds since the epoch
         frame_number (int): Frame number
         frame_len (int): Frame length
         eth_type (str): Ethernet type
+        utc_offset (int): UTC offset of the time zone of the capture, in
+            seconds, None if unknown
     """
 
+    # Pas de __dict__ par paquet : les attributs sont stockés dans des slots
+    __slots__ = (
+        "src_mac",
+        "dst_mac",
+        "protocol",
+        "timestamp",
+        "frame_number",
+        "frame_len",
+        "eth_type",
+        "utc_offset",
+    )
+
+    # Champs tshark lus par le modèle, par argument du constructeur
+    TSHARK_FIELDS = {
+        "src_mac": "eth.src",
+        "dst_mac": "eth.dst",
+        "protocol": "frame.protocols",
+        "time": "frame.time_epoch",
+        "frame_number": "frame.number",
+        "frame_len": "frame.len",
+        "eth_type": "eth.type",
+    }
+    # Champs tshark nécessaires en plus pour interpréter les précédents : l'heure
+    # locale de la trame donne le fuseau de la capture
+    TSHARK_EXTRA_FIELDS = ("frame.time",)
+
     def __init__(
-        self, src_mac, dst_mac, protocol, time, frame_number, frame_len, eth_type
+        self,
+        src_mac,
+        dst_mac,
+        protocol,
+        time,
+        frame_number,
+        frame_len,
+        eth_type,
+        utc_offset=None,
     ):
         """Create a packet
 
@@ -28,18 +233,23 @@ class Packet:
             src_mac (str): Source MAC address
             dst_mac (str): Destination MAC address
             protocol (str): Protocol
-            time (str): Time
+            time (float | str): Time, as an epoch or a frame.time string
             frame_number (int): Frame number
             frame_len (int): Frame length
             eth_type (str): Ethernet type
+            utc_offset (int): UTC offset of the capture, in seconds; read from
+                ``time`` when it is a frame.time string and None is given
         """
-        self.src_mac = src_mac
-        self.dst_mac = dst_mac
-        self.protocol = protocol
-        self.time = self._format_time(time)
-        self.frame_number = frame_number
-        self.frame_len = frame_len
-        self.eth_type = eth_type
+        self.src_mac = intern_string(src_mac)
+        self.dst_mac = intern_string(dst_mac)
+        self.protocol = intern_string(protocol)
+        self.timestamp = parse_frame_time(time)
+        self.frame_number = to_number(frame_number)
+        self.frame_len = to_number(frame_len)
+        self.eth_type = intern_string(eth_type)
+        if utc_offset is None:
+            utc_offset = frame_utc_offset(time, self.timestamp)
+        self.utc_offset = utc_offset
 
     def __str__(self):
         """Summary of the packet
@@ -90,31 +300,106 @@ class Packet:
         Returns:
             Packet: The packet
         """
+        timestamp, utc_offset = Packet.frame_clock(packet_dict["frame"])
         return Packet(
             src_mac=packet_dict["eth"]["eth.src"],
             dst_mac=packet_dict["eth"]["eth.dst"],
             protocol=packet_dict["frame"]["frame.protocols"],
-            time=packet_dict["frame"]["frame.time"],
+            time=timestamp,
             frame_number=packet_dict["frame"]["frame.number"],
             frame_len=packet_dict["frame"]["frame.len"],
             eth_type=packet_dict["eth"]["eth.type"],
+            utc_offset=utc_offset,
         )
 
-    def _format_time(self, time_str):
-        """Try to format the time string using dateutil parser and reformat it to the desired format.
+    @classmethod
+    def from_fields(cls, fields):
+        """Create a packet from a row of a tshark -T fields export
 
         Args:
-            time_str (str): The original time string.
+            fields (dict): The values of the row, by tshark field name
 
         Returns:
-            str: The formatted time string in '%b %d, %Y %H:%M:%S.%f000 %Z' format.
+            Packet: The packet
         """
-        try:
-            parsed_date = parser.parse(time_str)
-            return parsed_date.strftime("%b %d, %Y %H:%M:%S.%f000 %Z")
-        except (ValueError, TypeError) as e:
-            print(f"Error parsing date: {e}")
-            return "Invalid date format"
+        return cls(**cls._arguments_from_fields(fields))
+
+    @classmethod
+    def _arguments_from_fields(cls, fields):
+        """Get the constructor arguments from a row of a tshark -T fields export
+
+        Args:
+            fields (dict): The values of the row, by tshark field name
+
+        Returns:
+            dict: The constructor arguments
+        """
+        arguments = {}
+        for arg, name in cls.TSHARK_FIELDS.items():
+            if name != "frame.time_epoch":
+                arguments[arg] = fields[name]
+        # frame.time lu si l'export est antérieur à l'ajout de frame.time_epoch
+        arguments["time"], arguments["utc_offset"] = Packet.frame_clock(fields)
+        return arguments
+
+    @staticmethod
+    def frame_time(frame):
+        """Get the time of a frame layer, frame.time_epoch when it is present
+
+        Args:
+            frame (dict): The frame layer of a tshark JSON export
+
+        Returns:
+            str: The frame time
+        """
+        return frame.get("frame.time_epoch", frame["frame.time"])
+
+    @staticmethod
+    def frame_clock(frame):
+        """Get the time and the UTC offset of the capture from a frame layer
+
+        The frame time is parsed once, the constructor then takes the epoch
+        as is.
+
+        Args:
+            frame (dict): The frame layer of a tshark JSON export, or a row of
+                a tshark -T fields export
+
+        Returns:
+            Tuple[float, int]: The seconds since the epoch and the offset in
+            seconds, None if frame.time is absent
+        """
+        timestamp = parse_frame_time(Packet.frame_time(frame))
+        return timestamp, frame_utc_offset(frame.get("frame.time"), timestamp)
+
+    @classmethod
+    def attribute_names(cls):
+        """Get the attributes of this type of packet, base class first
+
+        Returns:
+            List[str]: The names of the slots of the class and its parents
+        """
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(klass.__dict__.get("__slots__", ()))
+        return names
+
+    def attributes(self):
+        """Get the values of the attributes of the packet
+
+        Returns:
+            dict: The values, by attribute name
+        """
+        return {name: getattr(self, name) for name in self.attribute_names()}
+
+    @classmethod
+    def tshark_fields(cls):
+        """Get the tshark fields needed to create this type of packet
+
+        Returns:
+            List[str]: The tshark field names
+        """
+        return list(cls.TSHARK_FIELDS.values()) + list(cls.TSHARK_EXTRA_FIELDS)
 
     @staticmethod
     def from_json(packet_json):
@@ -129,21 +414,15 @@ class Packet:
         packet_dict = json.loads(packet_json)
         return Packet.from_dict(packet_dict)
 
-    def _format_time(self, time_str):
-        """Try to format the time string using dateutil parser.
-
-        Args:
-            time_str (str): The original time string.
+    @property
+    def time(self):
+        """Time of the packet, formatted for display
 
         Returns:
-            str: The formatted time string in 'YYYY-MM-DD HH:MM:SS' format.
+            str: The time in 'YYYY-MM-DD HH:MM:SS' format, in the time zone
+            of the capture
         """
-        try:
-            parsed_date = parser.parse(time_str)
-            return parsed_date.strftime("%Y-%m-%d %H:%M:%S")
-        except (ValueError, TypeError) as e:
-            print(f"Error parsing date: {e}")
-            return "Invalid date format"
+        return format_timestamp(self.timestamp, self.utc_offset)
 
     def get_formatted_protocol(self):
         """Get the formatted protocol
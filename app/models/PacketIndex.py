@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+
+# Rapport maximal entre l'étendue des numéros de trame et le nombre de paquets
+# pour utiliser un tableau direct plutôt qu'un dictionnaire
+DENSE_SPAN_RATIO = 4
+
+
+class PacketIndex:
+    """An index of the rows of a capture by frame number and by time
+
+    Frame numbers are mapped to rows by a direct lookup array when they are
+    dense enough (tshark numbers the frames from 1 without gaps), by a
+    dictionary otherwise; when a number appears several times, its first row
+    is kept. Times are kept sorted, so a time range is found by binary search.
+    When the capture is already in time order, which is the usual case, the
+    time column of the table is used as is, without copy.
+
+    The distinct frame numbers are also kept sorted with their first rows:
+    it is the order of the keyset pagination of the API.
+
+    Attributes:
+        first_frame (int): The smallest frame number, for the lookup array
+        rows_by_frame (np.ndarray | Dict[int, int]): The row of each frame
+            number, -1 in the lookup array for the missing numbers
+        frames (np.ndarray): The distinct frame numbers, sorted
+        frame_rows (np.ndarray): The first row of each of these frame numbers
+        frame_positions (np.ndarray): The position of each row in frames, -1
+            for the rows left out of frame_rows
+        order (np.ndarray): The rows sorted by time, packets without a time
+            last, None when the rows are already in time order
+        times (np.ndarray): The times of the rows in time order, in seconds
+            since the epoch
+    """
+
+    def __init__(self, first_frame, rows_by_frame, frames, frame_rows, order, times):
+        """Create an index from its arrays
+
+        Args:
+            first_frame (int): The smallest frame number
+            rows_by_frame (np.ndarray | Dict[int, int]): The row of each frame
+            frames (np.ndarray): The sorted frame numbers
+            frame_rows (np.ndarray): The first row of each frame number
+            order (np.ndarray): The rows in time order, None if already sorted
+            times (np.ndarray): The sorted times
+        """
+        self.first_frame = first_frame
+        self.rows_by_frame = rows_by_frame
+        self.frames = frames
+        self.frame_rows = frame_rows
+        self.frame_positions = np.full(len(times), -1, dtype=np.int64)
+        self.frame_positions[frame_rows] = np.arange(len(frame_rows))
+        self.order = order
+        self.times = times
+
+    @staticmethod
+    def from_table(table):
+        """Build the index of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+
+        Returns:
+            PacketIndex: The index
+        """
+        frames = table.numeric("frame_number")
+        rows = np.flatnonzero(np.isfinite(frames) & (frames == np.floor(frames)))
+        # Première ligne de chaque numéro de trame
+        numbers, first = np.unique(frames[rows].astype(np.int64), return_index=True)
+        frame_rows = rows[first]
+        first_frame = int(numbers[0]) if len(numbers) else 0
+        span = int(numbers[-1]) - first_frame + 1 if len(numbers) else 0
+        if span <= DENSE_SPAN_RATIO * max(len(numbers), 1):
+            rows_by_frame = np.full(span, -1, dtype=np.int64)
+            rows_by_frame[numbers - first_frame] = frame_rows
+        else:
+            rows_by_frame = dict(zip(numbers.tolist(), frame_rows.tolist()))
+
+        epoch = table.epoch
+        if np.all(epoch[1:] >= epoch[:-1]):
+            # Capture déjà dans l'ordre chronologique (et sans heure manquante)
+            return PacketIndex(
+                first_frame, rows_by_frame, numbers, frame_rows, None, epoch
+            )
+        order = np.argsort(epoch, kind="stable")
+        return PacketIndex(
+            first_frame, rows_by_frame, numbers, frame_rows, order, epoch[order]
+        )
+
+    def row(self, frame_number):
+        """Get the row of a frame number
+
+        Args:
+            frame_number (int | float | str): The frame number, as converted by
+                to_number (a string is not a number and matches no frame)
+
+        Returns:
+            int: The first row with this frame number, None if there is none
+        """
+        if isinstance(frame_number, str):
+            return None
+        if not math.isfinite(frame_number) or frame_number != math.floor(frame_number):
+            return None
+        frame_number = int(frame_number)
+        if isinstance(self.rows_by_frame, dict):
+            return self.rows_by_frame.get(frame_number)
+        offset = frame_number - self.first_frame
+        if not 0 <= offset < len(self.rows_by_frame):
+            return None
+        row = int(self.rows_by_frame[offset])
+        return row if row >= 0 else None
+
+    def in_frame_order(self, rows):
+        """Sort rows by frame number, for keyset pagination
+
+        Args:
+            rows (np.ndarray): The rows, None for every row
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The frame numbers, sorted, and their
+            rows; the rows without a frame number, or whose frame number
+            already appears in an earlier row, are left out
+        """
+        if rows is None:
+            return self.frames, self.frame_rows
+        positions = self.frame_positions[rows]
+        positions = np.sort(positions[positions >= 0])
+        return self.frames[positions], self.frame_rows[positions]
+
+    def bounds(self, start, end, end_included=True):
+        """Get the positions of a time range in time order
+
+        Args:
+            start (float): The start, in seconds since the epoch, included
+            end (float): The end, in seconds since the epoch
+            end_included (bool): Whether the packets sent at the end are
+                included
+
+        Returns:
+            Tuple[int, int]: The first position and the position after the last
+        """
+        first = int(np.searchsorted(self.times, start, side="left"))
+        last = int(
+            np.searchsorted(self.times, end, side="right" if end_included else "left")
+        )
+        return first, max(first, last)
+
+    def rows_between(self, start, end, end_included=True):
+        """Get the rows sent during a time range
+
+        Args:
+            start (float): The start, in seconds since the epoch, included
+            end (float): The end, in seconds since the epoch
+            end_included (bool): Whether the packets sent at the end are
+                included
+
+        Returns:
+            np.ndarray: The rows, in time order (a view of the index when the
+            capture is not in time order)
+        """
+        first, last = self.bounds(start, end, end_included)
+        if self.order is None:
+            return np.arange(first, last)
+        return self.order[first:last]
+
+    def times_between(self, start, end, end_included=True):
+        """Get the times of the packets sent during a time range
+
+        Args:
+            start (float): The start, in seconds since the epoch, included
+            end (float): The end, in seconds since the epoch
+            end_included (bool): Whether the packets sent at the end are
+                included
+
+        Returns:
+            np.ndarray: The sorted times, a view of the index
+        """
+        first, last = self.bounds(start, end, end_included)
+        return self.times[first:last]
@@ -0,0 +1,228 @@
+import math
+from functools import reduce
+
+import numpy as np
+
+from app.models.Packet import Packet, parse_frame_time, to_number
+from app.models.GeoNetworking import GeoNetworking
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.SpatialIndex import POSITIONS
+
+# Classes sélectionnées par le filtre « type »
+TYPES = {"packet": Packet, "geo": GeoNetworking, "cam": CAM, "denm": DENM}
+# Attributs comparés par chaque filtre d'adresse MAC ou de station
+MAC_ATTRIBUTES = {
+    "mac": ("src_mac", "dst_mac"),
+    "src_mac": ("src_mac",),
+    "dst_mac": ("dst_mac",),
+}
+STATION_ATTRIBUTES = ("stationID", "originating_station_id")
+# Nombre de requêtes dont les lignes sont gardées (pages suivantes)
+CACHED_QUERIES = 32
+
+
+class PacketQuery:
+    """The filters of a request of the packet API
+
+    Every filter is answered by an index of the capture: the type by the
+    type column, the MAC addresses and stations by the inverted indexes of
+    the table, the time range by the packet index and the bounding box by
+    the spatial index. The rows of the filters are then intersected.
+
+    Attributes:
+        packet_type (type): The packet class, subclasses included
+        macs (Dict[str, str]): The MAC address of each MAC filter of
+            MAC_ATTRIBUTES ("mac" for the source or destination address)
+        station (int): The station ID, of the GeoNetworking header or
+            originating a DENM
+        start (float): The start of the time range, in seconds since the epoch
+        end (float): The end of the time range, in seconds since the epoch
+        bbox (Tuple[float, float, float, float]): The minimum longitude,
+            minimum latitude, maximum longitude and maximum latitude
+        positions (str): The position of the bounding box filter, a key of
+            POSITIONS
+    """
+
+    def __init__(
+        self,
+        packet_type=Packet,
+        macs=None,
+        station=None,
+        start=None,
+        end=None,
+        bbox=None,
+        positions="source",
+    ):
+        """Create a query
+
+        Args:
+            packet_type (type): The packet class, every packet by default
+            macs (Dict[str, str]): The MAC addresses, by filter
+            station (int): The station ID
+            start (float): The start of the time range, included
+            end (float): The end of the time range, included
+            bbox (Tuple[float, float, float, float]): The bounding box, bounds
+                included; the minimum longitude is greater than the maximum
+                when the box crosses the antimeridian
+            positions (str): The position compared to the bounding box
+        """
+        self.packet_type = packet_type
+        self.macs = macs or {}
+        self.station = station
+        self.start = start
+        self.end = end
+        self.bbox = bbox
+        self.positions = positions
+
+    @staticmethod
+    def from_args(args, packet_type=None, packets=None):
+        """Create a query from the arguments of a request
+
+        The start and end are epochs or dates. A date without a time zone,
+        such as the ``time`` of the packets in the API, is a wall-clock time
+        of the capture; a date with an offset ("2024-06-12T10:00:10Z",
+        "...+02:00") or an epoch is absolute.
+
+        Args:
+            args (Mapping[str, str]): The arguments: type, mac, src_mac,
+                dst_mac, station, start and end, bbox
+                ("min_lon,min_lat,max_lon,max_lat") and positions
+            packet_type (type): The packet class of the endpoint, the type
+                argument is used if None
+            packets (Packets): The capture queried, giving the time zone of
+                the dates without one (local time of the server if None)
+
+        Returns:
+            PacketQuery: The query
+
+        Raises:
+            ValueError: If an argument is not valid
+        """
+        if packet_type is None:
+            name = args.get("type", "packet").lower()
+            if name not in TYPES:
+                raise ValueError(f"Unknown packet type: {name}")
+            packet_type = TYPES[name]
+
+        macs = {
+            name: args[name].lower() for name in MAC_ATTRIBUTES if args.get(name)
+        }
+
+        station = None
+        if args.get("station"):
+            station = to_number(args["station"])
+            if isinstance(station, str):
+                raise ValueError(f"Invalid station ID: {station}")
+
+        start, end = (_time(args, name, packets) for name in ("start", "end"))
+
+        bbox = None
+        if args.get("bbox"):
+            try:
+                bbox = tuple(float(value) for value in args["bbox"].split(","))
+            except ValueError:
+                bbox = ()
+            if len(bbox) != 4 or not all(math.isfinite(value) for value in bbox):
+                raise ValueError("The bbox must be min_lon,min_lat,max_lon,max_lat")
+            if not -90 <= bbox[1] <= bbox[3] <= 90:
+                raise ValueError("The bbox latitudes must be ordered, within ±90")
+
+        positions = args.get("positions", "source")
+        if positions not in POSITIONS:
+            raise ValueError(f"Unknown positions: {positions}")
+
+        return PacketQuery(packet_type, macs, station, start, end, bbox, positions)
+
+    def key(self):
+        """Get a hashable key of the query, for the caches
+
+        Returns:
+            tuple: The key
+        """
+        return (
+            self.packet_type,
+            tuple(sorted(self.macs.items())),
+            self.station,
+            self.start,
+            self.end,
+            self.bbox,
+            self.positions if self.bbox else None,
+        )
+
+    def rows(self, packets):
+        """Find the rows matching the query
+
+        Args:
+            packets (Packets): The packets of the capture
+
+        Returns:
+            np.ndarray: The rows, in table order, None when there is no filter
+        """
+        table = packets.table
+        selections = []
+        if self.packet_type is not Packet:
+            selections.append(np.flatnonzero(table.type_mask(self.packet_type)))
+        for name, mac in self.macs.items():
+            selections.append(_value_rows(table, MAC_ATTRIBUTES[name], mac))
+        if self.station is not None:
+            selections.append(_value_rows(table, STATION_ATTRIBUTES, self.station))
+        if self.start is not None or self.end is not None:
+            start = -math.inf if self.start is None else self.start
+            end = math.inf if self.end is None else self.end
+            selections.append(np.sort(packets.packet_index.rows_between(start, end)))
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            index = packets.spatial_index(self.positions)
+            selections.append(index.in_box(min_lat, min_lon, max_lat, max_lon))
+
+        if not selections:
+            return None
+        # Intersection en commençant par les plus petites sélections
+        selections.sort(key=len)
+        return reduce(
+            lambda rows, other: np.intersect1d(rows, other, assume_unique=True),
+            selections,
+        )
+
+
+def _value_rows(table, names, value):
+    """Get the rows where one of some attributes equals a value
+
+    Args:
+        table (PacketTable): The packets
+        names (Tuple[str, ...]): The attribute names
+        value: The value
+
+    Returns:
+        np.ndarray: The rows, in table order
+    """
+    return reduce(np.union1d, (table.value_rows(name, value) for name in names))
+
+
+def _time(args, name, packets=None):
+    """Read a time argument of a request
+
+    Args:
+        args (Mapping[str, str]): The arguments
+        name (str): The argument name
+        packets (Packets): The capture giving the time zone of the dates
+            without one, the local time zone of the server if None
+
+    Returns:
+        float: The time in seconds since the epoch, None if absent
+
+    Raises:
+        ValueError: If the time cannot be parsed
+    """
+    value = args.get(name)
+    if not value:
+        return None
+    if packets is None:
+        time = parse_frame_time(value)
+    else:
+        # Date sans zone : heure de la capture, comme le champ « time »
+        time = packets.to_timestamp(value)
+    if math.isnan(time):
+        raise ValueError(f"Invalid time for {name}: {value}")
+    return time
@@ -0,0 +1,636 @@
+import numpy as np
+
+from app.models.Packet import Packet
+from app.models.GeoNetworking import GeoNetworking
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.utils import geodesy
+
+# Types de paquets, dans l'ordre de leur code dans la colonne "type"
+PACKET_TYPES = (Packet, GeoNetworking, CAM, DENM)
+
+# Encodages des colonnes d'attributs
+INT = "int"  # Entiers
+INT_STR = "int_str"  # Entiers conservés en chaînes par le modèle (ex: "42")
+FLOAT = "float"  # Réels
+DICTIONARY = "dictionary"  # Codes vers un dictionnaire de valeurs
+
+# Nombre de paquets matérialisés à la fois lors d'un parcours
+BATCH_SIZE = 1024
+
+# Facteur des positions ITS/GeoNetworking (dixièmes de microdegré)
+POSITION_SCALE = 1e7
+
+
+class PacketTable:
+    """A struct-of-arrays representation of a collection of packets
+
+    Every attribute of the model classes is stored as a NumPy column with one
+    row per packet. Packet objects are only built for the rows that are read.
+
+    Queries are boolean masks over the rows (``type_mask``, ``value_mask``,
+    ``time_mask``, ``radius_mask``) combined with ``&`` and ``|``, then
+    counted with ``count`` or materialized with ``select``.
+
+    Attributes:
+        types (np.ndarray): The code of the class of each packet, in PACKET_TYPES
+        columns (Dict[str, np.ndarray]): The attribute columns, by attribute name
+        encodings (Dict[str, str]): The encoding of each attribute column
+        dictionaries (Dict[str, list]): The values of the dictionary-encoded columns
+        attributes (List[List[str]]): The attributes of each packet class, by type code
+    """
+
+    def __init__(self, types, columns, encodings, dictionaries, attributes):
+        """Create a table from its columns
+
+        Args:
+            types (np.ndarray): The code of the class of each packet
+            columns (Dict[str, np.ndarray]): The attribute columns
+            encodings (Dict[str, str]): The encoding of each attribute column
+            dictionaries (Dict[str, list]): The values of the dictionary-encoded columns
+            attributes (List[List[str]]): The attributes of each packet class
+        """
+        self.types = types
+        self.columns = columns
+        self.encodings = encodings
+        self.dictionaries = dictionaries
+        self.attributes = attributes
+        # Colonnes dérivées et index des dictionnaires, calculés à la demande
+        self._cache = {}
+
+    @staticmethod
+    def from_packets(packets):
+        """Build a table from packet objects
+
+        Args:
+            packets (List[Packet]): The packets
+
+        Returns:
+            PacketTable: The table
+        """
+        count = len(packets)
+        types = np.fromiter(
+            (PACKET_TYPES.index(type(packet)) for packet in packets),
+            dtype=np.uint8,
+            count=count,
+        )
+
+        attributes = [
+            packet_type.attribute_names() if (types == code).any() else []
+            for code, packet_type in enumerate(PACKET_TYPES)
+        ]
+
+        columns, encodings, dictionaries = {}, {}, {}
+        names = []
+        for type_attributes in attributes:
+            names += [name for name in type_attributes if name not in names]
+        for name in names:
+            codes = [c for c, attrs in enumerate(attributes) if name in attrs]
+            rows = np.flatnonzero(np.isin(types, codes))
+            values = [getattr(packets[row], name) for row in rows]
+            column, encoding, dictionary = _encode(values)
+            full = np.zeros(count, dtype=column.dtype)
+            if encoding == DICTIONARY:
+                full[:] = -1
+            full[rows] = column
+            columns[name], encodings[name] = full, encoding
+            if dictionary is not None:
+                dictionaries[name] = dictionary
+
+        return PacketTable(types, columns, encodings, dictionaries, attributes)
+
+    @property
+    def epoch(self):
+        """Time of each packet
+
+        Returns:
+            np.ndarray: The seconds since the epoch
+        """
+        if "timestamp" not in self.columns:
+            return np.full(len(self), np.nan)
+        return self.columns["timestamp"]
+
+    def type_mask(self, packet_type):
+        """Select the packets of a class, subclasses included (like isinstance)
+
+        Args:
+            packet_type (type): The packet class
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        return self._codes_mask(
+            [issubclass(table_type, packet_type) for table_type in PACKET_TYPES]
+        )
+
+    def type_counts(self):
+        """Count the packets of each exact class
+
+        Returns:
+            Dict[type, int]: The number of packets, by class of PACKET_TYPES
+        """
+        counts = np.bincount(self.types, minlength=len(PACKET_TYPES))
+        return dict(zip(PACKET_TYPES, counts.tolist()))
+
+    def categories(self, packet_types):
+        """Get the category of each packet, for a list of classes
+
+        Args:
+            packet_types (Tuple[type, ...]): The classes, subclasses included
+                (like isinstance); the first matching class wins
+
+        Returns:
+            np.ndarray: The index of the class of each packet in the list,
+            ``len(packet_types)`` for the packets of none of them
+        """
+        category_of_type = np.array(
+            [
+                next(
+                    (
+                        index
+                        for index, packet_type in enumerate(packet_types)
+                        if issubclass(table_type, packet_type)
+                    ),
+                    len(packet_types),
+                )
+                for table_type in PACKET_TYPES
+            ],
+            dtype=np.int64,
+        )
+        return category_of_type[self.types]
+
+    def groups(self, name):
+        """Group the packets by the value of an attribute
+
+        Args:
+            name (str): The attribute name
+
+        Returns:
+            Tuple[np.ndarray, list]: The group of each packet, and the value of
+            each group in order of first appearance in the table (None for the
+            packets without the attribute)
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.int64), []
+        if name not in self.columns:
+            return np.zeros(len(self), dtype=np.int64), [None]
+        column = self.columns[name]
+        if self.encodings[name] != DICTIONARY:
+            # Les lignes sans l'attribut forment un groupe à part
+            column = np.where(self.has_mask(name), column, column.min() - 1)
+        _, first, codes = np.unique(column, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        values = self._decode(name, column[first[order]])
+        if self.encodings[name] != DICTIONARY:
+            missing = ~self.has_mask(name)[first[order]]
+            values = [None if absent else v for v, absent in zip(values, missing)]
+        return rank[codes.reshape(-1)], values
+
+    def has_mask(self, name):
+        """Select the packets whose class has an attribute
+
+        Args:
+            name (str): The attribute name
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        return self._codes_mask([name in names for names in self.attributes])
+
+    def _codes_mask(self, selected):
+        """Select the packets whose type code is selected
+
+        Args:
+            selected (List[bool]): Whether each type code is selected
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        if all(selected):
+            return np.ones(len(self), dtype=bool)
+        if selected.count(True) == 1:
+            return self.types == selected.index(True)
+        return np.array(selected, dtype=bool)[self.types]
+
+    def value_mask(self, name, value):
+        """Select the packets whose attribute equals a value
+
+        Args:
+            name (str): The attribute name
+            value: The value
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        if name not in self.columns:
+            return np.zeros(len(self), dtype=bool)
+        column = self.columns[name]
+        encoding = self.encodings[name]
+        if encoding == DICTIONARY:
+            code = self._dictionary_index(name).get(value)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            return column == code
+        if encoding == INT_STR:
+            if not isinstance(value, str) or not _is_int_str(value):
+                return np.zeros(len(self), dtype=bool)
+            value = int(value)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return np.zeros(len(self), dtype=bool)
+        return (column == value) & self.has_mask(name)
+
+    def value_rows(self, name, value):
+        """Get the rows whose attribute equals a value, from an inverted index
+
+        The index of an attribute is built on first use, then a value is found
+        in constant time.
+
+        Args:
+            name (str): The attribute name
+            value: The value, as in the packet objects
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        key = ("postings", name)
+        if key not in self._cache:
+            groups, values = self.groups(name)
+            order = np.argsort(groups, kind="stable")
+            bounds = np.searchsorted(groups[order], np.arange(len(values) + 1))
+            self._cache[key] = {
+                group_value: order[bounds[group] : bounds[group + 1]]
+                for group, group_value in enumerate(values)
+                if group_value is not None
+            }
+        return self._cache[key].get(value, np.array([], dtype=np.int64))
+
+    def time_mask(self, start, end):
+        """Select the packets sent between two times, bounds included
+
+        Args:
+            start (float): The start, in seconds since the epoch
+            end (float): The end, in seconds since the epoch
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        epoch = self.epoch
+        return (epoch >= start) & (epoch <= end)
+
+    def radius_mask(self, latitude, longitude, radius):
+        """Select the packets sent from within a radius of a point
+
+        The source position of the GeoNetworking header is used, like
+        GeoNetworking.is_within_radius. Packets without position are excluded.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees
+            longitude (float): The longitude of the point, in degrees
+            radius (float): The radius, in kilometers
+
+        Returns:
+            np.ndarray: The boolean mask of the rows
+        """
+        latitudes = self.degrees("src_pos_lat")
+        longitudes = self.degrees("src_pos_long")
+
+        # Préfiltre : bande de latitude trouvée par dichotomie dans l'ordre trié,
+        # puis bande de longitude, la distance n'est calculée que pour les
+        # paquets candidats
+        margin, longitude_margin = geodesy.bounding_margin(latitude, radius)
+        order, sorted_latitudes = self._sorted("src_pos_lat")
+        start = np.searchsorted(sorted_latitudes, latitude - margin, side="left")
+        end = np.searchsorted(sorted_latitudes, latitude + margin, side="right")
+        candidates = order[start:end]
+        if longitude_margin < np.inf:
+            delta = np.abs(longitudes[candidates] - longitude)
+            delta = np.minimum(delta, 360.0 - delta)
+            candidates = candidates[delta <= longitude_margin]
+
+        distance = geodesy.one_to_many(
+            latitude, longitude, latitudes[candidates], longitudes[candidates]
+        )
+
+        mask = np.zeros(len(self), dtype=bool)
+        mask[candidates[distance <= radius]] = True
+        return mask
+
+    def count(self, mask):
+        """Count the selected packets
+
+        Args:
+            mask (np.ndarray): The boolean mask of the rows
+
+        Returns:
+            int: The number of packets
+        """
+        return int(np.count_nonzero(mask))
+
+    def select(self, mask):
+        """Materialize the selected packets
+
+        Args:
+            mask (np.ndarray): The boolean mask of the rows
+
+        Returns:
+            List[Packet]: The packets, in table order
+        """
+        return self.materialize(np.flatnonzero(mask))
+
+    def asof_join(self, left_rows, left_key, right_rows, right_key):
+        """Match each left row with the right row of the same key closest in time
+
+        The right rows are sorted by key then time, and each left row is
+        searched by binary search in the times of its key. As with a scan of
+        the right rows in table order keeping the strictly smaller time
+        difference, the first right row wins a tie. Rows without a time or a
+        numeric key are never matched.
+
+        Args:
+            left_rows (np.ndarray): The rows to match, e.g. the DENMs
+            left_key (str): The attribute of the left rows to join on
+            right_rows (np.ndarray): The candidate rows, e.g. the CAMs
+            right_key (str): The attribute of the right rows to join on
+
+        Returns:
+            np.ndarray: The matched right row of each left row, -1 if none
+        """
+        left_keys = self.numeric(left_key)[left_rows]
+        left_times = self.epoch[left_rows]
+        right_keys = self.numeric(right_key)[right_rows]
+        right_times = self.epoch[right_rows]
+        valid = np.isfinite(right_keys) & np.isfinite(right_times)
+        right_rows = np.asarray(right_rows)[valid]
+        right_keys, right_times = right_keys[valid], right_times[valid]
+        matches = np.full(len(left_rows), -1, dtype=np.int64)
+        if not len(right_rows):
+            return matches
+
+        # Tri stable par clé puis temps : à temps égal, l'ordre de la table
+        order = np.lexsort((right_times, right_keys))
+        right_rows = right_rows[order]
+        right_keys, right_times = right_keys[order], right_times[order]
+        starts = np.flatnonzero(np.diff(right_keys)) + 1
+        starts = np.concatenate(([0], starts, [len(right_keys)]))
+        group_keys = right_keys[starts[:-1]]
+
+        # Lignes de gauche regroupées par clé, via la clé de chaque groupe
+        groups = np.searchsorted(group_keys, left_keys)
+        searchable = np.isfinite(left_times) & (groups < len(group_keys))
+        searchable[searchable] = (
+            group_keys[groups[searchable]] == left_keys[searchable]
+        )
+        selected = np.flatnonzero(searchable)
+        selected = selected[np.argsort(groups[selected], kind="stable")]
+        bounds = np.flatnonzero(np.diff(groups[selected])) + 1
+
+        for rows_of_key in np.split(selected, bounds) if len(selected) else []:
+            group = groups[rows_of_key[0]]
+            times = right_times[starts[group] : starts[group + 1]]
+            rows = right_rows[starts[group] : starts[group + 1]]
+            time = left_times[rows_of_key]
+            last = len(times) - 1
+
+            # Plus proche avant (dernier temps < time) et après (premier >= time),
+            # chacun au début de sa série de temps égaux
+            after = np.searchsorted(times, time, side="left")
+            before = np.searchsorted(times, times[np.maximum(after - 1, 0)], "left")
+            after_gap = np.abs(time - times[np.minimum(after, last)])
+            after_gap[after > last] = np.inf
+            before_gap = np.abs(time - times[before])
+            before_gap[after == 0] = np.inf
+            after_row = rows[np.minimum(after, last)]
+            before_row = rows[before]
+            use_after = (after_gap < before_gap) | (
+                (after_gap == before_gap) & (after_row < before_row)
+            )
+            matches[rows_of_key] = np.where(use_after, after_row, before_row)
+        return matches
+
+    def numeric(self, name):
+        """Get an attribute column as floats
+
+        Args:
+            name (str): The attribute name
+
+        Returns:
+            np.ndarray: The values, NaN for the packets without a numeric value
+        """
+        key = ("numeric", name)
+        if key not in self._cache:
+            if name not in self.columns:
+                values = np.full(len(self), np.nan)
+            elif self.encodings[name] == DICTIONARY:
+                lookup = [_to_float(value) for value in self.dictionaries[name]]
+                lookup = np.array(lookup + [np.nan], dtype=np.float64)
+                values = lookup[self.columns[name]]
+            else:
+                values = np.where(
+                    self.has_mask(name), self.columns[name].astype(np.float64), np.nan
+                )
+            self._cache[key] = values
+        return self._cache[key]
+
+    def degrees(self, name):
+        """Get a position column (latitude or longitude) in degrees
+
+        Args:
+            name (str): The attribute name, e.g. "latitude" or "src_pos_lat"
+
+        Returns:
+            np.ndarray: The positions in degrees, NaN for the packets without one
+        """
+        key = ("degrees", name)
+        if key not in self._cache:
+            self._cache[key] = self.numeric(name) / POSITION_SCALE
+        return self._cache[key]
+
+    def _sorted(self, name):
+        """Get the rows sorted by a position column, NaN last
+
+        Args:
+            name (str): The attribute name
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The rows in sorted order and the
+            sorted positions, in degrees
+        """
+        key = ("sorted", name)
+        if key not in self._cache:
+            values = self.degrees(name)
+            order = np.argsort(values, kind="stable")
+            self._cache[key] = order, values[order]
+        return self._cache[key]
+
+    def _dictionary_index(self, name):
+        """Get the code of each value of a dictionary-encoded column
+
+        Args:
+            name (str): The attribute name
+
+        Returns:
+            Dict[Any, int]: The codes, by value
+        """
+        key = ("index", name)
+        if key not in self._cache:
+            self._cache[key] = {
+                value: code for code, value in enumerate(self.dictionaries[name])
+            }
+        return self._cache[key]
+
+    def __len__(self):
+        """Number of packets in the table
+
+        Returns:
+            int: The number of packets
+        """
+        return len(self.types)
+
+    def __getitem__(self, index):
+        """Materialize a packet or a slice of packets
+
+        Args:
+            index (int | slice): The row or the rows
+
+        Returns:
+            Packet | List[Packet]: The packet, or the list of packets of the slice
+        """
+        if isinstance(index, slice):
+            return self.materialize(np.arange(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PacketTable index out of range")
+        return self.materialize(np.array([index]))[0]
+
+    def __iter__(self):
+        """Iterate over the packets, materialized batch by batch
+
+        Yields:
+            Packet: The next packet
+        """
+        for start in range(0, len(self), BATCH_SIZE):
+            yield from self[start : start + BATCH_SIZE]
+
+    def materialize(self, rows):
+        """Build the packet objects of some rows
+
+        Args:
+            rows (np.ndarray): The rows
+
+        Returns:
+            List[Packet]: The packets, in the order of the rows
+        """
+        types = self.types[rows].tolist()
+        values = {}
+        for name in {n for code in set(types) for n in self.attributes[code]}:
+            values[name] = self._decode(name, self.columns[name][rows])
+
+        packets = []
+        for i, code in enumerate(types):
+            packet_type = PACKET_TYPES[code]
+            packet = packet_type.__new__(packet_type)
+            for name in self.attributes[code]:
+                setattr(packet, name, values[name][i])
+            packets.append(packet)
+        return packets
+
+    def values(self, name, rows):
+        """Get the values of an attribute for some rows
+
+        Args:
+            name (str): The attribute name
+            rows (np.ndarray): The rows, whose classes must have the attribute
+
+        Returns:
+            list: The values, as in the packet objects
+        """
+        return self._decode(name, self.columns[name][rows])
+
+    def _decode(self, name, column):
+        """Convert a slice of a column back to the values of the model
+
+        Args:
+            name (str): The attribute name
+            column (np.ndarray): The slice of the column
+
+        Returns:
+            list: The values
+        """
+        encoding = self.encodings[name]
+        if encoding == INT_STR:
+            return [str(value) for value in column.tolist()]
+        if encoding == DICTIONARY:
+            dictionary = self.dictionaries[name]
+            return [dictionary[code] if code >= 0 else None for code in column.tolist()]
+        return column.tolist()
+
+
+def _encode(values):
+    """Choose the encoding of an attribute column and encode its values
+
+    Args:
+        values (list): The values of the attribute
+
+    Returns:
+        Tuple[np.ndarray, str, list]: The column, its encoding and the dictionary
+        of values (None if the column is not dictionary-encoded)
+    """
+    if all(type(value) is int for value in values):
+        try:
+            return np.array(values, dtype=np.int64), INT, None
+        except OverflowError:
+            pass
+    if all(type(value) is float for value in values):
+        return np.array(values, dtype=np.float64), FLOAT, None
+    if all(type(value) is str and _is_int_str(value) for value in values):
+        try:
+            column = np.array([int(value) for value in values], dtype=np.int64)
+            return column, INT_STR, None
+        except OverflowError:
+            pass
+
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(value, len(index)) for value in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, DICTIONARY, list(index)
+
+
+def _is_int_str(value):
+    """Check whether a string is the canonical representation of an integer
+
+    Args:
+        value (str): The string
+
+    Returns:
+        bool: True if str(int(value)) == value
+    """
+    digits = value[1:] if value.startswith("-") else value
+    return (
+        digits.isascii()
+        and digits.isdigit()
+        and (digits == "0" or not digits.startswith("0"))
+        and value != "-0"
+    )
+
+
+def _to_float(value):
+    """Convert a value of a dictionary to a float
+
+    Args:
+        value: The value
+
+    Returns:
+        float: The value, NaN if it is not a number
+    """
+    if isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
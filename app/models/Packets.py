@@ -1,72 +1,460 @@
+import calendar
 import json
+import math
 import os
 from datetime import datetime, timedelta
+import threading
 import time
+import warnings
 import requests
 from dateutil import parser
-import copy
+from dateutil.parser import UnknownTimezoneWarning
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
-import re
 from typing import List
 from itertools import groupby
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 from app.models.GeoNetworking import GeoNetworking
-from app.models.Packet import Packet
+from app.models.Packet import (
+    Packet,
+    format_timestamp,
+    parse_frame_time,
+    to_number,
+    wall_clock_time,
+)
 from app.models.DENM import DENM
 from app.models.CAM import CAM
-from haversine import haversine, Unit
-from math import radians, cos, sin, sqrt, atan2
+from app.models.PacketTable import BATCH_SIZE, PACKET_TYPES, PacketTable
+from app.models.StationIndex import StationIndex
+from app.models.CamIndex import CamIndex
+from app.models.PacketIndex import PacketIndex
+from app.models.PacketQuery import CACHED_QUERIES
+from app.models.SearchIndex import SearchIndex
+from app.models.SpatialIndex import POSITIONS, SpatialIndex
+from app.models.DenmPropagation import DenmPropagation
+from app.models.TimeRollups import TimeRollups
+from app.models.TrafficSummary import TrafficSummary
+from app.services.json_stream import (
+    CHUNK_SIZE,
+    iter_array_items,
+    item_offsets,
+    split_array,
+)
+from app.services import sidecar
+from app.utils import downsampling, geodesy
+
+# Taille des blocs lus pour décoder une page de paquets (64 Kio)
+PAGE_CHUNK_SIZE = 64 << 10
+
+# Structures dérivées des paquets, construites à la demande
+DERIVED_ATTRIBUTES = (
+    "_station_index",
+    "_cam_index",
+    "_denm_propagation",
+    "_closest_cams",
+    "_rollups",
+    "_packet_index",
+    "_spatial_indexes",
+    "_search_index",
+    "_traffic",
+    "_queries",
+    "_offsets",
+)
 
 
 class Packets:
     """
     A class to represent a collection of packets
 
+    The packets are read from a tshark -T json export, or from a tshark
+    -T fields export (.tsv) limited to the fields returned by ``tshark_fields``.
+    The first load writes a columnar sidecar next to the export (see
+    ``app.services.sidecar``), later loads memory-map it instead of parsing.
+
+    The queries (counts, filters) run on the columns of a PacketTable. Packet
+    objects are only built for the rows they return, and the full list of
+    packets is only built when ``packets`` is read. Pages of packets can also
+    be read without loading the file, from an index of the byte offset of each
+    packet (see ``read_packets``).
+
     Attributes:
         file_path (str): The path to the JSON file
         packets (List[Packet]): The list of packets
+        table (PacketTable): The columns of the packets
+        offsets (np.ndarray): The byte offset of each packet in the file
     """
 
-    def __init__(self, file_path: str):
+    # Types de paquets, du plus général au plus spécifique
+    PACKET_TYPES = PACKET_TYPES
+
+    def __init__(
+        self,
+        file_path: str,
+        load: bool = True,
+        workers: int = 1,
+        use_sidecar: bool = True,
+    ):
         """Create a collection of packets from a JSON file
 
         Args:
             file_path (str): The path to the JSON file
+            load (bool): Whether to load every packet in memory. When False, the
+                packets can still be read one at a time with ``iter_packets``.
+            workers (int): The number of processes used to decode the file
+            use_sidecar (bool): Whether to read and write the columnar sidecar
 
         Raises:
             FileNotFoundError: If the file is not found
-            ValueError: If the file is not a JSON file
+            ValueError: If the file is not a JSON or TSV file
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"The file {file_path} was not found.")
-        if not file_path.endswith(".json"):
-            raise ValueError("The file must be a JSON file.")
+        if not file_path.endswith((".json", ".tsv")):
+            raise ValueError("The file must be a JSON or TSV file.")
 
         self.file_path = file_path
-
-        self.packets: List[Packet] = []
-        self.load_packets()
-
-    def load_packets(self):
+        self.use_sidecar = use_sidecar
+
+        self._packets: List[Packet] = []
+        self._table = None
+        self._station_index = None
+        self._cam_index = None
+        self._denm_propagation = None
+        self._closest_cams = {}
+        self._rollups = None
+        self._packet_index = None
+        self._spatial_indexes = {}
+        self._search_index = None
+        self._traffic = None
+        self._queries = OrderedDict()
+        self._offsets = None
+        # Appelé après la construction d'une structure dérivée (nom de la
+        # structure), le cache des captures mesure alors à nouveau la collection
+        self.on_build = None
+        # Verrous de construction des structures dérivées, un par attribut :
+        # les graphiques du tableau de bord sont calculés en parallèle
+        self._build_locks = {}
+        self._build_locks_lock = threading.Lock()
+        if load:
+            self.load_packets(workers)
+
+    def load_packets(self, workers: int = 1):
         """
         Load packets from a JSON file
+
+        When the sidecar of the file is up to date, the packets are built from
+        its memory-mapped columns instead of parsing the file.
+
+        Args:
+            workers (int): The number of processes used to decode the file.
+                The packets are identical and in the same order for any value.
         """
+        if self.use_sidecar and not self._packets:
+            table = sidecar.load_table(self.file_path)
+            if table is not None:
+                # Les objets Packet sont construits à la demande
+                self._packets, self._table = None, table
+                return
+
         try:
-            with open(self.file_path, "r") as file:
-                data = json.load(file)
-                for packet_data in data:
-                    packet = self.determine_packet_type(
-                        packet_data["_source"]["layers"]
-                    )
-                    if packet:
-                        self.packets.append(packet)
+            packets = None
+            if workers > 1 and self.file_path.endswith(".json"):
+                packets = self._load_parallel(workers)
+            if packets is None:
+                packets = self.iter_packets()
+            for packet in packets:
+                self.packets.append(packet)
         except FileNotFoundError:
             print(f"Error: The file {self.file_path} was not found.")
+            return
         except json.JSONDecodeError:
             print("Error: Failed to decode JSON.")
+            return
+
+        self._table = None
+        if self.use_sidecar and self._packets:
+            sidecar.save_table(self.file_path, self.table)
+
+    @property
+    def packets(self):
+        """The list of packets, built from the table on first access
+
+        Returns:
+            List[Packet]: The packets
+        """
+        return self._build("_packets", lambda: list(self._table))
+
+    @packets.setter
+    def packets(self, packets):
+        self._packets, self._table = packets, None
+        self._station_index = self._cam_index = self._denm_propagation = None
+        self._closest_cams, self._rollups = {}, None
+        self._packet_index, self._spatial_indexes = None, {}
+        self._search_index, self._traffic = None, None
+        self._queries = OrderedDict()
+
+    @property
+    def table(self):
+        """The columns of the packets, built from the list on first access
+
+        Returns:
+            PacketTable: The table
+        """
+        return self._build("_table", lambda: PacketTable.from_packets(self._packets))
+
+    def _build_lock(self, key):
+        """Get the lock guarding the construction of a derived structure
+
+        Args:
+            key (Hashable): The structure, e.g. its attribute name
+
+        Returns:
+            threading.Lock: The lock
+        """
+        with self._build_locks_lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def _build(self, attribute: str, build):
+        """Get a derived structure, building it once on first access
+
+        Concurrent accesses wait for the thread building the structure instead
+        of building it again.
+
+        Args:
+            attribute (str): The attribute holding the structure, e.g.
+                "_station_index"
+            build (Callable[[], Any]): Builds the structure
+
+        Returns:
+            Any: The structure
+        """
+        value = getattr(self, attribute)
+        built = False
+        if value is None:
+            with self._build_lock(attribute):
+                value = getattr(self, attribute)
+                if value is None:
+                    value = build()
+                    setattr(self, attribute, value)
+                    built = True
+            if built:
+                self._built(attribute)
+        return value
+
+    def _built(self, name: str):
+        """Report that a derived structure was built, see ``on_build``
+
+        Args:
+            name (str): The structure, a key of ``derived_structures``
+        """
+        if self.on_build is not None:
+            self.on_build(name)
+
+    def derived_structures(self):
+        """Get the structures built from the packets so far
+
+        Returns:
+            dict: The structures by attribute name, the caches of the table
+            under "table_cache"
+        """
+        structures = {
+            name: getattr(self, name)
+            for name in DERIVED_ATTRIBUTES
+            if getattr(self, name) is not None
+        }
+        if self._table is not None:
+            structures["table_cache"] = self._table._cache
+        return structures
+
+    @property
+    def station_index(self):
+        """The station behind each MAC address, built on first access
+
+        Returns:
+            StationIndex: The index
+        """
+        return self._build("_station_index", lambda: StationIndex.from_table(self.table))
+
+    @property
+    def cam_index(self):
+        """The CAM positions by station type and time, built on first access
+
+        Returns:
+            CamIndex: The index
+        """
+        return self._build("_cam_index", lambda: CamIndex.from_table(self.table))
+
+    @property
+    def packet_index(self):
+        """The rows by frame number and by time, built on first access
+
+        Returns:
+            PacketIndex: The index
+        """
+        return self._build("_packet_index", lambda: PacketIndex.from_table(self.table))
+
+    def spatial_index(self, positions: str = "source"):
+        """The grid of a position of the packets, built on first access
+
+        Args:
+            positions (str): "source" for the GeoNetworking source positions,
+                "reference" for the CAM and DENM reference positions
+
+        Returns:
+            SpatialIndex: The index
+        """
+        if positions not in self._spatial_indexes:
+            lat_name, lon_name = POSITIONS[positions]
+            with self._build_lock(("_spatial_indexes", positions)):
+                if positions not in self._spatial_indexes:
+                    self._spatial_indexes[positions] = SpatialIndex.from_table(
+                        self.table, lat_name, lon_name
+                    )
+            self._built("_spatial_indexes")
+        return self._spatial_indexes[positions]
+
+    @property
+    def search_index(self):
+        """The full-text index of the packet summaries, built on first access
+
+        Returns:
+            SearchIndex: The index
+        """
+        return self._build("_search_index", lambda: SearchIndex.from_table(self.table))
+
+    @property
+    def traffic(self):
+        """The packet counts by class and by MAC address, built on first access
+
+        Returns:
+            TrafficSummary: The summary
+        """
+        return self._build("_traffic", lambda: TrafficSummary.from_table(self.table))
+
+    @property
+    def rollups(self):
+        """The packet counts and bytes per time bucket, built on first access
+
+        Returns:
+            TimeRollups: The rollups
+        """
+        return self._build("_rollups", lambda: TimeRollups.from_table(self.table))
+
+    @property
+    def denm_propagation(self):
+        """The receptions of each DENM, built on first access
+
+        Returns:
+            DenmPropagation: The model
+        """
+        return self._build(
+            "_denm_propagation",
+            lambda: DenmPropagation.from_table(self.table, self.station_index),
+        )
+
+    def iter_packets(self):
+        """Read the packets from the file one at a time.
+
+        The tshark export is decoded incrementally, so only one packet is held
+        in memory besides the objects kept by the caller.
+
+        Yields:
+            Packet: The next packet of the file
+
+        Raises:
+            FileNotFoundError: If the file is not found
+            json.JSONDecodeError: If the file is not a valid JSON array
+        """
+        if self.file_path.endswith(".tsv"):
+            yield from self._iter_fields()
+            return
+        with open(self.file_path, "rb") as file:
+            for _, packet_data in iter_array_items(file):
+                packet = self.determine_packet_type(packet_data["_source"]["layers"])
+                if packet:
+                    yield packet
+
+    def _iter_fields(self):
+        """Read the packets from a tshark -T fields export, one row at a time.
+
+        The first line holds the field names (tshark option -E header=y).
+
+        Yields:
+            Packet: The next packet of the file
+        """
+        with open(self.file_path, "r") as file:
+            names = file.readline().rstrip("\n").split("\t")
+            for line in file:
+                fields = dict(zip(names, line.rstrip("\n").split("\t")))
+                packet = self.determine_packet_type_fields(fields)
+                if packet:
+                    yield packet
+
+    @staticmethod
+    def tshark_fields():
+        """Get the tshark fields read by the model classes.
+
+        This is the projection passed to tshark -T fields with -e options.
 
-    def determine_packet_type(self, packet_dict):
+        Returns:
+            List[str]: The tshark field names, without duplicates
+        """
+        fields = []
+        for packet_type in Packets.PACKET_TYPES:
+            for field in packet_type.tshark_fields():
+                if field not in fields:
+                    fields.append(field)
+        return fields
+
+    def _load_parallel(self, workers: int):
+        """Decode the JSON file in a pool of processes.
+
+        The file is split into byte ranges aligned on packets, each range is
+        decoded by a worker and the results are concatenated in file order.
+
+        Args:
+            workers (int): The number of processes
+
+        Returns:
+            List[Packet]: The packets, or None if the file could not be split
+            or a range could not be decoded
+        """
+        # Plusieurs tranches par processus pour équilibrer la charge
+        ranges = split_array(self.file_path, workers * 4)
+        if len(ranges) < 2:
+            return None
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _decode_range,
+                    [self.file_path] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                )
+            )
+
+        # Tranche non décodable : la découpe est tombée au milieu d'un paquet
+        if None in results:
+            print("Warning: Could not split the JSON file, decoding it serially.")
+            return None
+        # Chaque tranche doit s'arrêter exactement au début de la suivante
+        for (_, next_offset), (next_start, _) in zip(results, ranges[1:]):
+            if next_offset != next_start:
+                print("Warning: Could not split the JSON file, decoding it serially.")
+                return None
+        if results[-1][1] is not None:
+            return None
+
+        packets = []
+        for chunk, _ in results:
+            packets.extend(chunk)
+        return packets
+
+    @staticmethod
+    def determine_packet_type(packet_dict):
         """Determines the type of packet based on the protocol.
 
         Args:
@@ -86,13 +474,32 @@ class Packets:
                 return GeoNetworking.from_dict(packet_dict)
         return Packet.from_dict(packet_dict)
 
+    @staticmethod
+    def determine_packet_type_fields(fields):
+        """Determines the type of packet from a row of a tshark -T fields export.
+
+        Args:
+            fields (dict): The values of the row, by tshark field name
+
+        Returns:
+            Packet: The packet object
+        """
+        if "eth:ethertype:gnw:btpb:its" in fields["frame.protocols"]:
+            if fields.get("cam.generationDeltaTime"):
+                return CAM.from_fields(fields)
+            elif fields.get("denm.detectionTime"):
+                return DENM.from_fields(fields)
+            else:
+                return GeoNetworking.from_fields(fields)
+        return Packet.from_fields(fields)
+
     def __str__(self):
         """String representation of the packets collection.
 
         Returns:
             str: The string representation of the packets collection
         """
-        return f"Packets Collection: {len(self.packets)} packets loaded from {self.file_path}"
+        return f"Packets Collection: {len(self.table)} packets loaded from {self.file_path}"
 
     def summary(self):
         """Summarizes the packets.
@@ -111,7 +518,7 @@ class Packets:
         Returns:
             int: The number of packets of the specified type
         """
-        return sum(isinstance(packet, packet_type) for packet in self.packets)
+        return self.traffic.count(packet_type)
 
     def statistics(self):
         """Generates statistics about the packets, including the total number of packets and the number of each type.
@@ -119,13 +526,13 @@ class Packets:
         Returns:
             dict: The statistics
         """
+        counts = self.traffic.type_counts
         stats = {
-            "total_packets": len(self.packets),
-            "total_cam": self.count_type(CAM),
-            "total_denm": self.count_type(DENM),
-            "total_geo": self.count_type(GeoNetworking),
-            "total_other": self.count_type(Packet)
-            - (self.count_type(CAM) + self.count_type(DENM)),
+            "total_packets": len(self.table),
+            "total_cam": counts[CAM],
+            "total_denm": counts[DENM],
+            "total_geo": counts[GeoNetworking] + counts[CAM] + counts[DENM],
+            "total_other": counts[Packet] + counts[GeoNetworking],
         }
         return stats
 
@@ -141,8 +548,157 @@ class Packets:
         """
         start = (page - 1) * per_page
         end = start + per_page
+        if self._packets is None:
+            return self.table[max(start, 0) : max(end, 0)]
         return self.packets[start:end]
 
+    @property
+    def offsets(self):
+        """The byte offset of each packet in the file (np.ndarray of uint64)
+
+        Read from the offset index next to the file, memory-mapped, or found by
+        scanning the file once and written there.
+        """
+        return self._build("_offsets", self._scan_offsets)
+
+    def _scan_offsets(self, exact: bool = False):
+        """Read or build the offset index of the file
+
+        Args:
+            exact (bool): Whether to decode every packet of a JSON file to find
+                the offsets, instead of searching the start of the packets
+
+        Returns:
+            np.ndarray: The byte offset of each packet, in file order
+        """
+        offsets = None
+        if self.use_sidecar and not exact:
+            offsets = sidecar.load_offsets(self.file_path)
+        if offsets is None:
+            if self.file_path.endswith(".tsv"):
+                offsets = _line_offsets(self.file_path)
+            else:
+                offsets = [] if exact else item_offsets(self.file_path)
+                # Le premier et le dernier paquet sont vérifiés en les décodant ;
+                # sans objet « _index » (autre version de tshark), on décode tout
+                if (
+                    not offsets
+                    or self._read_items(offsets, 0, 1) is None
+                    or self._read_items(offsets, len(offsets) - 1, len(offsets))
+                    is None
+                ):
+                    offsets = [offset for offset, _ in self._iter_items()]
+            offsets = np.asarray(offsets, np.uint64)
+            if self.use_sidecar:
+                sidecar.save_offsets(self.file_path, offsets)
+        return offsets
+
+    def _iter_items(self):
+        """Decode the items of the JSON file one at a time
+
+        Yields:
+            Tuple[int, dict]: The offset of the item and the item
+        """
+        with open(self.file_path, "rb") as file:
+            yield from iter_array_items(file)
+
+    def count_packets(self):
+        """Count the packets of the file from its offset index
+
+        Returns:
+            int: The number of packets
+        """
+        return len(self.offsets)
+
+    def read_packets(self, page: int, per_page: int):
+        """Read a page of packets from the file, without loading the others.
+
+        The file is read from the offset of the first packet of the page and
+        only ``per_page`` packets are decoded, so a page costs the same for any
+        file size. Unlike ``get_packets``, the packets do not need to be loaded.
+
+        Args:
+            page (int): The page number
+            per_page (int): The number of packets per page
+
+        Returns:
+            List[Packet]: The list of packets for the specified page
+
+        Raises:
+            json.JSONDecodeError: If the file is not a valid JSON array
+        """
+        start = (page - 1) * per_page
+        if start < 0 or per_page < 1 or start >= len(self.offsets):
+            return []
+        stop = min(start + per_page, len(self.offsets))
+        if self.file_path.endswith(".tsv"):
+            return self._read_fields(self.offsets[start:stop])
+
+        packets = self._read_items(self.offsets, start, stop)
+        if packets is None:
+            # Un objet « _index » manquant ou imbriqué a trompé la recherche :
+            # l'index est reconstruit en décodant le fichier entier
+            print(f"Warning: Rebuilding the offset index of {self.file_path}.")
+            with self._build_lock("_offsets"):
+                self._offsets = self._scan_offsets(exact=True)
+            if start >= len(self._offsets):
+                return []
+            stop = min(start + per_page, len(self._offsets))
+            packets = self._read_items(self._offsets, start, stop) or []
+        return packets
+
+    def _read_items(self, offsets, start: int, stop: int):
+        """Decode consecutive packets of the JSON file
+
+        The packet following the last one is decoded too: its offset must be
+        the next one of the index, so that no packet is missing between pages.
+
+        Args:
+            offsets (Sequence[int]): The offset index
+            start (int): The index of the first packet
+            stop (int): The index after the last packet
+
+        Returns:
+            List[Packet]: The packets, or None if the offset index does not
+            match the file
+        """
+        expected = [int(offset) for offset in offsets[start : stop + 1]]
+        packets = []
+        with open(self.file_path, "rb") as file:
+            if start:
+                file.seek(expected[0])
+            items = iter_array_items(file, PAGE_CHUNK_SIZE, inside=bool(start))
+            try:
+                for index, (offset, packet_data) in enumerate(items):
+                    if index == len(expected) or offset != expected[index]:
+                        return None
+                    if index == stop - start:
+                        return packets
+                    layers = packet_data["_source"]["layers"]
+                    packets.append(self.determine_packet_type(layers))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                return None
+        return packets if len(packets) == len(expected) else None
+
+    def _read_fields(self, offsets):
+        """Decode consecutive rows of the tshark -T fields export
+
+        Args:
+            offsets (np.ndarray): The offsets of the rows, consecutive in the file
+
+        Returns:
+            List[Packet]: The packets
+        """
+        packets = []
+        with open(self.file_path, "rb") as file:
+            names = file.readline().decode("utf-8").rstrip("\r\n").split("\t")
+            file.seek(int(offsets[0]))
+            for _ in offsets:
+                line = file.readline().decode("utf-8").rstrip("\r\n")
+                fields = dict(zip(names, line.split("\t")))
+                packets.append(self.determine_packet_type_fields(fields))
+        return packets
+
     def get_packet(self, frame_number: int):
         """Get a packet by frame number.
 
@@ -152,39 +708,183 @@ class Packets:
         Returns:
             Packet: The packet with the specified frame number
         """
-        for packet in self.packets:
-            if packet.frame_number == frame_number:
-                return packet
-        return None
+        row = self.packet_index.row(to_number(frame_number))
+        return None if row is None else self._packet_at(row)
+
+    def _packet_at(self, row: int):
+        """Get the packet of a row, from the list if it is loaded
+
+        Args:
+            row (int): The row
+
+        Returns:
+            Packet: The packet
+        """
+        if self._packets is None:
+            return self.table[row]
+        return self.packets[row]
+
+    def _packets_at(self, rows):
+        """Get the packets of some rows, from the list if it is loaded
+
+        Args:
+            rows (np.ndarray): The rows
+
+        Returns:
+            List[Packet]: The packets
+        """
+        if self._packets is None:
+            return self.table.materialize(rows)
+        return [self._packets[row] for row in rows.tolist()]
+
+    def _rows_by_time(self, start_time, end_time):
+        """Get the rows whose ``time`` field is within a range
+
+        Args:
+            start_time (datetime | str): The first time, included
+            end_time (datetime | str): The last time, included
+
+        Returns:
+            np.ndarray: The rows, in capture order
+        """
+        start, end = self.to_timestamp(start_time), self.to_timestamp(end_time)
+        if math.isnan(start) or math.isnan(end):
+            return np.array([], dtype=np.int64)
+        # Le champ « time » est tronqué à la seconde : [début, fin + 1 s[
+        rows = self.packet_index.rows_between(
+            math.ceil(start), math.floor(end) + 1, end_included=False
+        )
+        return np.sort(rows)
 
     def get_packet_by_time(self, time: datetime):
         """Get a packet by time.
 
         Args:
-            time (datetime): The time
+            time (datetime | str): The time, compared to the ``time`` field of
+                the packets (wall-clock time of the capture, to the second)
 
         Returns:
-            Packet: The packet with the specified time
+            Packet: The first packet with the specified time
         """
-        for packet in self.packets:
-            if packet.time == time:
-                return packet
-        return None
+        rows = self._rows_by_time(time, time)
+        return self._packet_at(int(rows[0])) if len(rows) else None
 
-    def search_packets(self, search_term: str):
+    def search_packets(self, search_term: str, page: int = None, per_page: int = 50):
         """Search for packets by a search term.
 
+        The term is a regular expression matched against the summary of each
+        packet, or ``field:value`` to find the packets with a MAC address
+        (mac), a protocol layer (protocol), a station ID (station) or a
+        sequence number (seq). The results of the last searches are kept, so
+        the following pages cost only their packets.
+
         Args:
             search_term (str): The search term
+            page (int): The page number, every result if None
+            per_page (int): The number of packets per page
 
         Returns:
             List[Packet]: The list of packets that match the search term
         """
-        return [
-            packet
-            for packet in self.packets
-            if re.search(search_term, packet.summary())
-        ]
+        rows = self._search_rows(search_term)
+        if page is not None:
+            start = max((page - 1) * per_page, 0)
+            rows = rows[start : start + per_page]
+        return self._packets_at(rows)
+
+    def query_packets(self, query, after: int = None, limit: int = 100):
+        """Get a page of the packets matching a query, by frame number
+
+        The pages are keyset pages: the next page starts after the last frame
+        number of the previous one, so a page costs its packets whatever its
+        position, even when packets are added between the requests. The rows
+        of the last queries are kept, so the following pages are only a
+        binary search.
+
+        Args:
+            query (PacketQuery): The filters
+            after (int): The last frame number of the previous page, None for
+                the first page
+            limit (int): The maximum number of packets
+
+        Returns:
+            Tuple[List[Packet], int, int]: The packets, the cursor of the next
+            page (None on the last page) and the number of matching packets
+        """
+        frames, rows = self._query_rows(query)
+        start = 0 if after is None else int(np.searchsorted(frames, after, "right"))
+        end = start + limit
+        cursor = int(frames[end - 1]) if end < len(frames) else None
+        page = rows[start:end]
+        return self._packets_at(page), cursor, len(frames)
+
+    def iter_query(self, query, batch_size: int = BATCH_SIZE):
+        """Iterate over the packets matching a query, by frame number
+
+        Only one batch of packets is built at a time, so the memory used does
+        not depend on the number of packets.
+
+        Args:
+            query (PacketQuery): The filters
+            batch_size (int): The number of packets of each batch
+
+        Yields:
+            List[Packet]: The next batch of packets
+        """
+        _, rows = self._query_rows(query)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            yield self._packets_at(batch)
+
+    def _query_rows(self, query):
+        """Get the rows matching a query, in frame number order
+
+        Args:
+            query (PacketQuery): The filters
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The frame numbers and the rows
+        """
+        key = query.key()
+        with self._build_lock("_queries"):
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+        result = self.packet_index.in_frame_order(query.rows(self))
+        with self._build_lock("_queries"):
+            self._queries[key] = result
+            if len(self._queries) > CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        self._built("_queries")
+        return result
+
+    def count_search_results(self, search_term: str):
+        """Count the packets matching a search term.
+
+        Args:
+            search_term (str): The search term, see ``search_packets``
+
+        Returns:
+            int: The number of packets
+        """
+        return len(self._search_rows(search_term))
+
+    def _search_rows(self, search_term: str):
+        """Get the rows matching a search term, see ``search_packets``
+
+        Args:
+            search_term (str): The search term
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        index = self.search_index
+        cached = search_term in index
+        rows = index.search(search_term)
+        if not cached:
+            # L'index garde le résultat (et l'index inversé du champ cherché)
+            self._built("_search_index")
+        return rows
 
     def get_packet_types(self):
         """Get the unique packet types.
@@ -192,16 +892,16 @@ class Packets:
         Returns:
             List[str]: The list of unique packet types
         """
-        return list(set([type(packet).__name__ for packet in self.packets]))
+        counts = self.traffic.type_counts
+        return [packet_type.__name__ for packet_type in counts if counts[packet_type]]
 
     def get_time_range(self):
         """Get the time range of the packets.
 
         Returns:
-            Tuple[datetime, datetime]: The time range
+            Tuple[str, str]: The time range, formatted for display
         """
-        times = [packet.time for packet in self.packets]
-        return min(times), max(times)
+        return self.get_first_last_time()
 
     def get_packets_by_type(self, packet_type):
         """Get packets by type.
@@ -212,21 +912,21 @@ class Packets:
         Returns:
             List[Packet]: The list of packets of the specified type
         """
-        return [packet for packet in self.packets if isinstance(packet, packet_type)]
+        return self.table.select(self.table.type_mask(packet_type))
 
     def get_packets_by_time_range(self, start_time: datetime, end_time: datetime):
         """Get packets within a time range.
 
         Args:
-            start_time (datetime): The start time
-            end_time (datetime): The end time
+            start_time (datetime | str): The start time, included
+            end_time (datetime | str): The end time, included, compared like
+                ``start_time`` to the ``time`` field of the packets
 
         Returns:
-            List[Packet]: The list of packets within the time range
+            List[Packet]: The list of packets within the time range, in capture
+            order
         """
-        return [
-            packet for packet in self.packets if start_time <= packet.time <= end_time
-        ]
+        return self._packets_at(self._rows_by_time(start_time, end_time))
 
     def get_packets_by_src_mac(self, src_mac: str):
         """Get packets by source MAC address.
@@ -237,7 +937,7 @@ class Packets:
         Returns:
             List[Packet]: The list of packets with the specified source MAC address
         """
-        return [packet for packet in self.packets if packet.src_mac == src_mac]
+        return self.table.select(self.table.value_mask("src_mac", src_mac))
 
     def get_packets_by_dst_mac(self, dst_mac: str):
         """Get packets by destination MAC address.
@@ -248,24 +948,76 @@ class Packets:
         Returns:
             List[Packet]: The list of packets with the specified destination MAC address
         """
-        return [packet for packet in self.packets if packet.dst_mac == dst_mac]
-
-    def get_packets_by_location(self, latitude: float, longitude: float, radius: float):
+        return self.table.select(self.table.value_mask("dst_mac", dst_mac))
+
+    def get_packets_by_location(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        positions: str = "source",
+    ):
         """Get packets by location.
 
         Args:
-            latitude (float): The latitude
-            longitude (float): The longitude
-            radius (float): The radius
+            latitude (float): The latitude, in degrees
+            longitude (float): The longitude, in degrees
+            radius (float): The radius, in kilometers
+            positions (str): The position compared, see ``spatial_index``
 
         Returns:
-            List[Packet]: The list of packets within the specified location
+            List[Packet]: The packets whose position is within the radius, the
+            GeoNetworking packets sent from within it by default
         """
-        return [
-            packet
-            for packet in self.packets
-            if packet.is_within_radius(latitude, longitude, radius)
-        ]
+        rows = self.spatial_index(positions).within(latitude, longitude, radius)
+        return self.table.materialize(rows)
+
+    def get_packets_in_area(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        positions: str = "source",
+    ):
+        """Get packets by bounding box.
+
+        Args:
+            min_lat (float): The southern bound, in degrees
+            min_lon (float): The western bound, in degrees
+            max_lat (float): The northern bound, in degrees
+            max_lon (float): The eastern bound, in degrees
+            positions (str): The position compared, see ``spatial_index``
+
+        Returns:
+            List[Packet]: The packets whose position is inside the box
+        """
+        index = self.spatial_index(positions)
+        return self.table.materialize(index.in_box(min_lat, min_lon, max_lat, max_lon))
+
+    def get_nearest_packets(
+        self,
+        latitude: float,
+        longitude: float,
+        count: int,
+        positions: str = "source",
+    ):
+        """Get the packets closest to a point.
+
+        Args:
+            latitude (float): The latitude, in degrees
+            longitude (float): The longitude, in degrees
+            count (int): The number of packets
+            positions (str): The position compared, see ``spatial_index``
+
+        Returns:
+            List[Tuple[Packet, float]]: The packets and their distances in
+            kilometers, closest first
+        """
+        rows, distances = self.spatial_index(positions).nearest(
+            latitude, longitude, count
+        )
+        return list(zip(self.table.materialize(rows), distances.tolist()))
 
     def round_time(self, dt, interval):
         """Round time to the nearest interval.
@@ -280,56 +1032,65 @@ class Packets:
         new_minute = (dt.minute // interval) * interval
         return dt.replace(minute=new_minute, second=0, microsecond=0)
 
-    def time_series_data(self):
+    def time_series_data(
+        self,
+        start_time=None,
+        end_time=None,
+        points=None,
+        max_points=None,
+        method=downsampling.LTTB,
+    ):
         """Generates time series data for the packets.
 
+        The counts are read from the rollups: the cost is the number of
+        points returned, not the number of packets. With ``max_points``, the
+        series are then downsampled for the charts, keeping their peaks.
+
+        Args:
+            start_time (datetime | float): The start of the range, from the first
+                packet if None
+            end_time (datetime | float): The end of the range, to the last
+                packet if None
+            points (int): The number of points wanted, the coarsest resolution
+                giving at least as many points is used; 1 minute if None
+            max_points (int): The number of points to keep for each series,
+                all the points if None
+            method (str): The downsampling method, downsampling.LTTB or
+                downsampling.MINMAX
+
         Returns:
             dict: The time series data for the packets
         """
-        # Deux formats de date à essayer
-        formats = ["%Y-%m-%d %H:%M:%S", "%b %d, %Y %H:%M:%S.%f000 %Z"]
-        # Format de sortie des dates
-        output_format = "%Y-%m-%d %H:%M:%S"
-        # Regroupez les paquets par intervalles de temps prédéfinis (par exemple, toutes les 15 minutes)
-        grouped_data = defaultdict(lambda: {"CAM": 0, "DENM": 0, "Autres": 0})
-
-        for packet in self.packets:
-            parsed_time = None
-            for fmt in formats:
-                try:
-                    # Essayer de convertir la chaîne de caractères en datetime
-                    parsed_time = datetime.strptime(packet.time, fmt)
-                    break  # Si la conversion réussit, sortir de la boucle
-                except ValueError:
-                    continue  # Si la conversion échoue, essayer le format suivant
-
-            if parsed_time is None:
-                try:
-                    parsed_time = parser.parse(packet.time)
-                except (ValueError, TypeError) as e:
-                    print(f"Error parsing date: {e}")
-                    continue  # Passer au paquet suivant en cas d'erreur
-
-            rounded_time = self.round_time(parsed_time, 1)
-            rounded_time_str = rounded_time.strftime(output_format)
-
-            if isinstance(packet, CAM):
-                grouped_data[rounded_time_str]["CAM"] += 1
-            elif isinstance(packet, DENM):
-                grouped_data[rounded_time_str]["DENM"] += 1
-            else:
-                grouped_data[rounded_time_str]["Autres"] += 1
+        start = None if start_time is None else self.to_timestamp(start_time)
+        end = None if end_time is None else self.to_timestamp(end_time)
+        series = self.rollups.query(start, end, points)
+
+        # Libellé local de chaque seau : deux seaux de même libellé (passage à
+        # l'heure d'hiver) sont regroupés
+        grouped_data = defaultdict(lambda: [0, 0, 0, None])
+        counts = zip(
+            series["CAM"]["counts"],
+            series["DENM"]["counts"],
+            series["Autres"]["counts"],
+        )
+        labels = self.format_times(series["times"])
+        for bucket, label, (cam, denm, other) in zip(series["times"], labels, counts):
+            group = grouped_data[label]
+            group[0] += cam
+            group[1] += denm
+            group[2] += other
+            if group[3] is None:
+                group[3] = bucket
 
         times = sorted(grouped_data.keys())
-        cam_counts = [grouped_data[time]["CAM"] for time in times]
-        denm_counts = [grouped_data[time]["DENM"] for time in times]
-        other_counts = [grouped_data[time]["Autres"] for time in times]
-
+        columns = [[grouped_data[time][column] for time in times] for column in range(4)]
+        kept = downsampling.downsample(columns[3], columns[:3], max_points, method)
+        kept = kept.tolist()
         return {
-            "times": times,
-            "cam_counts": cam_counts,
-            "denm_counts": denm_counts,
-            "other_counts": other_counts,
+            "times": [times[index] for index in kept],
+            "cam_counts": [columns[0][index] for index in kept],
+            "denm_counts": [columns[1][index] for index in kept],
+            "other_counts": [columns[2][index] for index in kept],
         }
 
     def get_src_traffic(self):
@@ -338,12 +1099,7 @@ class Packets:
         Returns:
             dict: The source traffic
         """
-        src_traffic = {}
-        for packet in self.packets:
-            if packet.src_mac not in src_traffic:
-                src_traffic[packet.src_mac] = 0
-            src_traffic[packet.src_mac] += 1
-        return src_traffic
+        return self.traffic.src_traffic()
 
     def get_dst_traffic(self):
         """Get the destination traffic.
@@ -351,12 +1107,7 @@ class Packets:
         Returns:
             dict: The destination traffic
         """
-        dst_traffic = {}
-        for packet in self.packets:
-            if packet.dst_mac not in dst_traffic:
-                dst_traffic[packet.dst_mac] = 0
-            dst_traffic[packet.dst_mac] += 1
-        return dst_traffic
+        return self.traffic.dst_traffic()
 
     def get_traffic_details(self):
         """Get the traffic details.
@@ -364,32 +1115,80 @@ class Packets:
         Returns:
             dict: The traffic details
         """
-        traffic_details = {}
-        for packet in self.packets:
-            if packet.src_mac not in traffic_details:
-                traffic_details[packet.src_mac] = {
-                    "total_packets": 0,
-                    "cam_packets": 0,
-                    "denm_packets": 0,
-                    "other_packets": 0,
-                }
-            traffic_details[packet.src_mac]["total_packets"] += 1
-            if isinstance(packet, CAM):
-                traffic_details[packet.src_mac]["cam_packets"] += 1
-            elif isinstance(packet, DENM):
-                traffic_details[packet.src_mac]["denm_packets"] += 1
-            else:
-                traffic_details[packet.src_mac]["other_packets"] += 1
-        return traffic_details
+        return self.traffic.traffic_details()
 
     def get_first_last_time(self):
         """Get the first and last time of the packets.
 
         Returns:
-            Tuple[int, int]: The first and last time
+            Tuple[str, str]: The first and last time, formatted for display
+        """
+        epoch = self.table.epoch
+        first, last = self.format_times([np.nanmin(epoch), np.nanmax(epoch)])
+        return first, last
+
+    def format_times(self, epochs):
+        """Format times for display, in the time zone of the capture
+
+        The UTC offset of each time is the one of the last packet sent at or
+        before it (of the first packet for the earlier times), so the labels
+        follow the daylight saving time changes of the capture.
+
+        Args:
+            epochs (Sequence[float]): The seconds since the epoch
+
+        Returns:
+            List[str]: The times in 'YYYY-MM-DD HH:MM:SS' format
+        """
+        epochs = np.asarray(epochs, dtype=np.float64)
+        offsets = self._utc_offsets(epochs)
+        return [
+            format_timestamp(epoch, offset)
+            for epoch, offset in zip(epochs.tolist(), offsets)
+        ]
+
+    def wall_clock_epoch(self, moment):
+        """Convert a naive wall-clock time of the capture to seconds since the epoch
+
+        The inverse of format_times: the time is read with the UTC offset of
+        the capture at that time, in the local time zone of the server if the
+        offset is unknown.
+
+        Args:
+            moment (datetime): The naive wall-clock time
+
+        Returns:
+            float: The seconds since the epoch
+        """
+        wall_clock = calendar.timegm(moment.timetuple()) + moment.microsecond / 1e6
+        # Décalage au temps lu en UTC, puis au temps obtenu (changement d'heure)
+        offset = self._utc_offsets([wall_clock])[0]
+        if offset is not None:
+            offset = self._utc_offsets([wall_clock - offset])[0]
+        if offset is None:
+            return time.mktime(moment.timetuple()) + moment.microsecond / 1e6
+        return wall_clock - offset
+
+    def _utc_offsets(self, epochs):
+        """Get the UTC offset of the capture at some times
+
+        The offset of a time is the one of the last packet sent at or before
+        it, of the first packet for the earlier times.
+
+        Args:
+            epochs (Sequence[float]): The seconds since the epoch
+
+        Returns:
+            list: The offsets in seconds, None where unknown
         """
-        times = [packet.time for packet in self.packets]
-        return min(times), max(times)
+        epochs = np.asarray(epochs, dtype=np.float64)
+        if not len(self.table) or "utc_offset" not in self.table.columns:
+            return [None] * len(epochs)
+        index = self.packet_index
+        positions = np.searchsorted(index.times, epochs, side="right") - 1
+        positions = np.clip(positions, 0, len(index.times) - 1)
+        rows = positions if index.order is None else index.order[positions]
+        return self.table.values("utc_offset", rows)
 
     def get_first_position(self):
         """Get the first position of the packets.
@@ -397,23 +1196,17 @@ class Packets:
         Returns:
             dict: (latitude, longitude) of the first position
         """
-        for packet in self.packets:
-            if isinstance(packet, GeoNetworking):
-                return {
-                    "latitude": float(packet.src_pos_lat) / 1e7,
-                    "longitude": float(packet.src_pos_long) / 1e7,
-                }
-            elif isinstance(packet, CAM):
-                return {
-                    "latitude": float(packet.latitude) / 1e7,
-                    "longitude": float(packet.longitude) / 1e7,
-                }
-            elif isinstance(packet, DENM):
-                return {
-                    "latitude": float(packet.latitude) / 1e7,
-                    "longitude": float(packet.longitude) / 1e7,
-                }
-        return None
+        # Les CAM et DENM sont des paquets GeoNetworking : position de la source
+        rows = np.flatnonzero(self.table.type_mask(GeoNetworking))
+        latitudes = self.table.degrees("src_pos_lat")[rows]
+        longitudes = self.table.degrees("src_pos_long")[rows]
+        valid = np.flatnonzero(np.isfinite(latitudes) & np.isfinite(longitudes))
+        if not len(valid):
+            return None
+        return {
+            "latitude": float(latitudes[valid[0]]),
+            "longitude": float(longitudes[valid[0]]),
+        }
 
     def parse_time(self, time_str):
         """Parse a time string.
@@ -441,118 +1234,141 @@ class Packets:
                 f"Time data '{time_str}' does not match any expected format"
             ) from e
 
-    def get_denm_cam_association(self, filter_stations=None):
-        cams = defaultdict(list)
-        for packet in self.packets:
-            if isinstance(packet, CAM):
-                packet_time = self.parse_time(packet.time)
-                packet.latitude = float(packet.latitude) / 1e7
-                packet.longitude = float(packet.longitude) / 1e7
-                cams[packet.station_type].append((packet, packet_time))
+    def to_timestamp(self, time):
+        """Convert a time to seconds since the epoch, the unit of Packet.timestamp
 
-        denm_cam_data = defaultdict(list)
-        packets_by_station = defaultdict(lambda: defaultdict(list))
+        Args:
+            time (datetime | float | str): The time, naive datetimes and strings
+                without time zone being wall-clock times of the capture, like
+                the ``time`` field of the packets
 
-        for packet in self.packets:
-            if isinstance(packet, DENM):
-                if (
-                    filter_stations
-                    and packet.originating_station_id not in filter_stations
-                ):
-                    continue  # Skip this packet if it's not from a filtered station
-                key = (packet.originating_station_id, packet.sequence_number)
-                packets_by_station[packet.originating_station_id][
-                    packet.sequence_number
-                ].append(packet)
-
-        for station_id, sequences in packets_by_station.items():
-            for sequence_number, packets in sequences.items():
-                filtered_packets = {}
-                for packet in packets:
-                    if packet.seq_num not in filtered_packets:
-                        filtered_packets[packet.seq_num] = packet
-
-                rhl_seen = set()  # Track RHL values to ensure we only count unique hops
-                hop_count = 0
-                passage_details = defaultdict(int)
-                passage_path = []
-
-                for packet in filtered_packets.values():
-                    denm_time = self.parse_time(packet.time)
-                    denm_pos = (
-                        float(packet.latitude) / 1e7,
-                        float(packet.longitude) / 1e7,
-                    )
+        Returns:
+            float: The seconds since the epoch, NaN if the time could not be parsed
+        """
+        if isinstance(time, str):
+            try:
+                return float(time)
+            except ValueError:
+                pass
+            try:
+                with warnings.catch_warnings():
+                    # Nom de zone inconnu (ex: CEST) ignoré, comme pour frame.time
+                    warnings.simplefilter("ignore", UnknownTimezoneWarning)
+                    time = parser.parse(time)
+            except (ValueError, OverflowError):
+                return math.nan
+        if not isinstance(time, datetime):
+            return float(time)
+        if time.tzinfo is None:
+            return self.wall_clock_epoch(time)
+        return time.timestamp()
+
+    def get_denm_cam_association(self, filter_stations=None, window: float = 60):
+        """Associate each DENM hop with the closest CAM of the same station type
+
+        Args:
+            filter_stations (List[int]): The originating stations to keep, all
+                stations if None
+            window (float): The maximum time between the DENM and the CAM, in
+                seconds
 
-                    # Use a bounding box to limit the CAMs considered
-                    time_window_start = denm_time - timedelta(seconds=60)
-                    time_window_end = denm_time + timedelta(seconds=60)
-                    closest_cam = None
-                    min_distance = float("inf")
-
-                    for cam, cam_time in cams.get(packet.station_type, []):
-                        if not (time_window_start <= cam_time <= time_window_end):
-                            continue
-                        cam_pos = (cam.latitude, cam.longitude)
-                        distance = haversine(denm_pos, cam_pos)
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_cam = cam
-
-                    if closest_cam and packet.rhl not in rhl_seen:
-                        rhl_seen.add(packet.rhl)
-                        hop_count += 1
-
-                        # Collect passage details
-                        station_id_from_mac = self.get_station_by_mac(packet.src_mac)
-                        if station_id_from_mac:
-                            passage_details[station_id_from_mac] += 1
-                            passage_path.append(station_id_from_mac)
-
-                        key = (
-                            f"{packet.originating_station_id}-{packet.sequence_number}"
-                        )
-                        denm_cam_data[key].append(
-                            {
-                                "time": denm_time,
-                                "rhl": packet.rhl,
-                                "position": (
-                                    closest_cam.latitude,
-                                    closest_cam.longitude,
-                                ),
-                                "hop_count": hop_count,
-                                "passage_details": passage_details,
-                                "passage_path": passage_path,
-                            }
-                        )
+        Returns:
+            Dict[str, List[dict]]: The hops of each DENM, by
+            "originating station-sequence number"
+        """
+        denm_cam_data = defaultdict(list)
+        if filter_stations:
+            filter_stations = {to_number(station) for station in filter_stations}
+
+        messages = zip(self.denm_propagation, self._closest_cam_positions(window))
+        for message, closest_positions in messages:
+            if filter_stations and message.station_id not in filter_stations:
+                continue  # Skip this DENM if it's not from a filtered station
+
+            rhl_seen = set()  # Track RHL values to ensure we only count unique hops
+            hop_count = 0
+            passage_details = defaultdict(int)
+            passage_path = []
+            key = f"{message.station_id}-{message.sequence_number}"
+
+            for reception, closest_pos in zip(message.unique, closest_positions):
+                if closest_pos and reception.rhl not in rhl_seen:
+                    rhl_seen.add(reception.rhl)
+                    hop_count += 1
+
+                    # Collect passage details
+                    if reception.relay is not None:
+                        # Identifiants en texte, comme exportés par tshark
+                        passage_details[str(reception.relay)] += 1
+                        passage_path.append(str(reception.relay))
+
+                    denm_cam_data[key].append(
+                        {
+                            "time": wall_clock_time(
+                                reception.time, reception.utc_offset
+                            ),
+                            "rhl": (
+                                None if reception.rhl is None else str(reception.rhl)
+                            ),
+                            "position": closest_pos,
+                            "hop_count": hop_count,
+                            "passage_details": passage_details,
+                            "passage_path": passage_path,
+                        }
+                    )
 
         return denm_cam_data
 
+    def _closest_cam_positions(self, window):
+        """Position of the closest CAM of each distinct reception of each DENM
+
+        Computed once per window, the DENM map reuses it on every visit.
+
+        Args:
+            window (float): The maximum time between the DENM and the CAM, in
+                seconds
+
+        Returns:
+            List[List[Tuple[float, float]]]: The positions of the receptions in
+            ``DenmMessage.unique`` of each DENM, None without a CAM in the window
+        """
+        if window not in self._closest_cams:
+            # CAM la plus proche dans la fenêtre de temps, via l'index
+            self._closest_cams[window] = [
+                [
+                    self.cam_index.nearest(
+                        reception.station_type,
+                        reception.time,
+                        reception.position,
+                        window,
+                    )
+                    for reception in message.unique
+                ]
+                for message in self.denm_propagation
+            ]
+            self._built("_closest_cams")
+        return self._closest_cams[window]
+
     def get_denm_stations(self):
         """Get the stations that have sent DENM packets.
 
         Returns:
             List[str]: The list of stations that have sent DENM packets
         """
-        stations = set()
-        for packet in self.packets:
-            if isinstance(packet, DENM):
-                stations.add(packet.originating_station_id)
-        return list(stations)
+        return self.denm_propagation.stations()
 
-    def get_station_by_mac(self, mac_address):
+    def get_station_by_mac(self, mac_address, time=None):
         """Get the station ID by MAC address.
 
         Args:
             mac_address (str): The MAC address
+            time (float): The time the address was used, in seconds since the
+                epoch. Needed when the address was used by several stations.
 
         Returns:
-            str: The station ID
+            int: The station ID, None if no CAM was sent from the address
         """
-        for packet in self.packets:
-            if isinstance(packet, CAM) and packet.src_mac == mac_address:
-                return packet.stationID
-        return None
+        return self.station_index.station(mac_address, time)
 
     def get_reception_distribution(self):
         """Get the reception distribution.
@@ -560,43 +1376,7 @@ class Packets:
         Returns:
             defaultdict: The reception distribution
         """
-        hops_data = defaultdict(list)
-
-        # Collect packets by station and sequence number
-        packets_by_station = defaultdict(lambda: defaultdict(list))
-        for packet in self.packets:
-            if isinstance(packet, DENM):
-                key = (packet.originating_station_id, packet.sequence_number)
-                packets_by_station[packet.originating_station_id][
-                    packet.sequence_number
-                ].append(packet)
-
-        # Calculate the number of hops for each packet and store passage details
-        for station_id, sequences in packets_by_station.items():
-            for sequence_number, packets in sequences.items():
-                # Filter to include only the first occurrence of each packet by seq_num
-                filtered_packets = {}
-                for packet in packets:
-                    if packet.seq_num not in filtered_packets:
-                        filtered_packets[packet.seq_num] = packet
-
-                # Calculate hop count
-                hop_count = (
-                    len(filtered_packets) - 1
-                )  # Number of hops is the number of unique seq_num minus one
-                passage_details = defaultdict(int)
-
-                # Accumulate passage details for each packet in the sequence
-                for packet in filtered_packets.values():
-                    station_id_from_mac = self.get_station_by_mac(packet.src_mac)
-                    if station_id_from_mac:
-                        passage_details[station_id_from_mac] += 1
-
-                hops_data[station_id].append(
-                    {"hop_count": hop_count, "passage_details": passage_details}
-                )
-
-        return hops_data
+        return self.denm_propagation.reception_distribution()
 
     def get_repetition_distribution(self):
         """Get the repetition distribution.
@@ -604,35 +1384,7 @@ class Packets:
         Returns:
             defaultdict: The repetition distribution
         """
-        hops_data = defaultdict(list)
-
-        # Collect packets by station and sequence number
-        packets_by_station = defaultdict(lambda: defaultdict(list))
-        for packet in self.packets:
-            if isinstance(packet, DENM):
-                key = (packet.originating_station_id, packet.sequence_number)
-                packets_by_station[packet.originating_station_id][
-                    packet.sequence_number
-                ].append(packet)
-
-        # Calculate the number of hops for each packet and store passage details
-        for station_id, sequences in packets_by_station.items():
-            for seq_num, packets in sequences.items():
-                hop_count = (
-                    len(packets) - 1
-                )  # Number of hops is the number of appearances minus one
-                passage_details = defaultdict(int)
-                for packet in packets:
-                    # Get the station ID using the MAC address of the packet
-                    station_id = self.get_station_by_mac(packet.src_mac)
-                    if station_id:
-                        passage_details[station_id] += 1
-
-                hops_data[station_id].append(
-                    {"hop_count": hop_count, "passage_details": passage_details}
-                )
-
-        return hops_data
+        return self.denm_propagation.repetition_distribution()
 
     def get_hops_distribution(self):
         """Get the hops distribution.
@@ -640,46 +1392,7 @@ class Packets:
         Returns:
             defaultdict: The hops distribution
         """
-        hops_data = defaultdict(list)
-
-        # Collect packets by station and sequence number
-        packets_by_station = defaultdict(lambda: defaultdict(list))
-        for packet in self.packets:
-            if isinstance(packet, DENM):
-                key = (packet.originating_station_id, packet.sequence_number)
-                packets_by_station[packet.originating_station_id][
-                    packet.sequence_number
-                ].append(packet)
-
-        # Calculate the number of hops for each packet and store passage details
-        for station_id, sequences in packets_by_station.items():
-            for sequence_number, packets in sequences.items():
-                # Track RHL values to ensure we only count unique hops
-                rhl_seen = set()
-                hop_count = 0
-                passage_details = defaultdict(int)
-                passage_path = []
-
-                for packet in packets:
-                    if packet.rhl not in rhl_seen:
-                        rhl_seen.add(packet.rhl)
-                        hop_count += 1
-
-                        # Collect passage details
-                        station_id_from_mac = self.get_station_by_mac(packet.src_mac)
-                        if station_id_from_mac:
-                            passage_details[station_id_from_mac] += 1
-                            passage_path.append(station_id_from_mac)
-
-                hops_data[station_id].append(
-                    {
-                        "hop_count": hop_count,
-                        "passage_details": passage_details,
-                        "passage_path": passage_path,
-                    }
-                )
-
-        return hops_data
+        return self.denm_propagation.hops_distribution()
 
     def get_weather_data(self):
         """Get the weather data.
@@ -696,7 +1409,7 @@ class Packets:
                 lon = float(packet.longitude) / 1e7
 
                 # Convert time to the required format
-                time = datetime.strptime(packet.time, "%b %d, %Y %H:%M:%S.%f000 %Z")
+                time = wall_clock_time(packet.timestamp, packet.utc_offset)
                 start_date = time.strftime("%Y-%m-%d")
                 end_date = (time + timedelta(days=1)).strftime(
                     "%Y-%m-%d"
@@ -727,109 +1440,83 @@ class Packets:
 
     @staticmethod
     def calculate_distance(lat1, lon1, lat2, lon2):
-        # Calcul de la distance en utilisant la formule de Haversine
-        R = 6373000.0  # Rayon de la Terre en mètres
-
-        lat1, lon1, lat2, lon2 = (
-            radians(lat1),
-            radians(lon1),
-            radians(lat2),
-            radians(lon2),
-        )
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
+        """Calculate the distance between two points
+
+        Args:
+            lat1 (float): The latitude of the first point, in degrees
+            lon1 (float): The longitude of the first point, in degrees
+            lat2 (float): The latitude of the second point, in degrees
+            lon2 (float): The longitude of the second point, in degrees
 
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
+        Returns:
+            float: The distance, in meters
+        """
+        return geodesy.distance(lat1, lon1, lat2, lon2) * 1000
 
-        distance = R * c
-        return distance
+    def asof_join(self, left_type, left_key, right_type, right_key):
+        """Match each packet of a type with the closest packet in time of another
 
-    def get_furthest_station_distance(self):
-        packets = copy.deepcopy(
-            self.packets
-        )  # Deep copy the packets to avoid mutation issues
-        cams = defaultdict(list)
-        for packet in packets:
-            if isinstance(packet, CAM):
-                packet_time = self.parse_time(packet.time)
-                packet.latitude = float(packet.latitude) / 1e7
-                packet.longitude = float(packet.longitude) / 1e7
-                cams[packet.stationID].append((packet, packet_time))
+        An as-of join on the columns: the packets of ``right_type`` are sorted
+        by key and time, and each packet of ``left_type`` is matched with the
+        one of the same key closest in time by binary search (the first one
+        in the capture on a tie).
+
+        Args:
+            left_type (type): The class of the packets to match, e.g. DENM
+            left_key (str): The attribute of the left packets to join on
+            right_type (type): The class of the candidates, e.g. CAM
+            right_key (str): The attribute of the candidates to join on
 
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The rows of the left packets, in
+            capture order, and the row of the packet matched with each, -1 if
+            there is none
+        """
+        table = self.table
+        left_rows = np.flatnonzero(table.type_mask(left_type))
+        right_rows = np.flatnonzero(table.type_mask(right_type))
+        return left_rows, table.asof_join(left_rows, left_key, right_rows, right_key)
+
+    def _denm_cam_distances(self):
+        """Distance between each DENM and the closest CAM in time of its station
+
+        Returns:
+            Tuple[list, List[float]]: The originating station of each DENM
+            with a CAM, in capture order, and the distance in meters
+        """
+        denm_rows, cam_rows = self.asof_join(
+            DENM, "originating_station_id", CAM, "stationID"
+        )
+        matched = cam_rows >= 0
+        denm_rows, cam_rows = denm_rows[matched], cam_rows[matched]
+
+        table = self.table
+        latitude, longitude = table.degrees("latitude"), table.degrees("longitude")
+        distances = geodesy.pairwise(
+            latitude[denm_rows],
+            longitude[denm_rows],
+            latitude[cam_rows],
+            longitude[cam_rows],
+        )
+        distances = (distances * 1000).tolist()
+        return table.values("originating_station_id", denm_rows), distances
+
+    def get_furthest_station_distance(self):
         furthest_distances = defaultdict(list)
-        for packet in packets:
-            if isinstance(packet, DENM):
-                source_id = packet.originating_station_id
-                denm_pos = (float(packet.latitude) / 1e7, float(packet.longitude) / 1e7)
-                denm_time = self.parse_time(packet.time)
-                min_time_diff = float("inf")
-                closest_cam = None
-
-                for cam, cam_time in cams[source_id]:
-                    time_diff = abs((denm_time - cam_time).total_seconds())
-                    if time_diff < min_time_diff:
-                        min_time_diff = time_diff
-                        closest_cam = cam
-
-                if closest_cam:
-                    cam_pos = (closest_cam.latitude, closest_cam.longitude)
-                    distance = self.calculate_distance(
-                        denm_pos[0], denm_pos[1], cam_pos[0], cam_pos[1]
-                    )
-                    furthest_distances[source_id].append(distance)
+        for source_id, distance in zip(*self._denm_cam_distances()):
+            furthest_distances[source_id].append(distance)
 
         max_distances = {
             station: int(round(max(distances))) if distances else 0
             for station, distances in furthest_distances.items()
         }
-        print("Max Distances (rounded and converted to int):", max_distances)
         return max_distances
 
     def get_distance_distribution(self):
-        packets = copy.deepcopy(
-            self.packets
-        )  # Deep copy the packets to avoid mutation issues
-        cams = defaultdict(list)
-        for packet in packets:
-            if isinstance(packet, CAM):
-                packet_time = self.parse_time(packet.time)
-                packet.latitude = float(packet.latitude) / 1e7
-                packet.longitude = float(packet.longitude) / 1e7
-                cams[packet.stationID].append((packet, packet_time))
-
-        distances = []
-        packet_info = []  # To store additional packet information
-        for packet in packets:
-            if isinstance(packet, DENM):
-                source_id = packet.originating_station_id
-                denm_pos = (float(packet.latitude) / 1e7, float(packet.longitude) / 1e7)
-                denm_time = self.parse_time(packet.time)
-                min_time_diff = float("inf")
-                closest_cam = None
-
-                for cam, cam_time in cams[source_id]:
-                    time_diff = abs((denm_time - cam_time).total_seconds())
-                    if time_diff < min_time_diff:
-                        min_time_diff = time_diff
-                        closest_cam = cam
-
-                if closest_cam:
-                    cam_pos = (closest_cam.latitude, closest_cam.longitude)
-                    distance = self.calculate_distance(
-                        denm_pos[0], denm_pos[1], cam_pos[0], cam_pos[1]
-                    )
-                    distances.append(distance)
-                    packet_info.append(
-                        {
-                            "distance": distance,
-                            "station_id": source_id,
-                            "denm_pos": denm_pos,
-                            "denm_time": denm_time,
-                        }
-                    )
-
-        print("Distances:", distances)  # Debugging line
+        stations, distances = self._denm_cam_distances()
+        if not distances:
+            # Aucun DENM associé à un CAM : distribution vide
+            return {}
 
         # Calculate the distribution as percentages
         total_distances = len(distances)
@@ -840,9 +1527,7 @@ class Packets:
             range(0, int(max(distances)) + 200, 200)
         )  # Example: 0-200m, 200-400m, etc.
 
-        for info in packet_info:
-            distance = info["distance"]
-            station_id = info["station_id"]
+        for distance, station_id in zip(distances, stations):
             for i in range(len(bin_edges) - 1):
                 if bin_edges[i] <= distance < bin_edges[i + 1]:
                     bin_key = f"{bin_edges[i]}-{bin_edges[i+1]}"
@@ -854,15 +1539,60 @@ class Packets:
         for bin_key, data in distance_distribution.items():
             data["percentage"] = (data["count"] / total_distances) * 100
 
-        print("Distance Distribution:", distance_distribution)  # Debugging line
         return distance_distribution
 
-    def test(self):
-        """
-        Test the class methods
-        """
-        print("Get Furthest Station Distance : ")
-        print(self.get_furthest_station_distance())
-        print("Get Distance Distribution : ")
-        print(self.get_distance_distribution())
-        return self.get_furthest_station_distance()
+
+def _line_offsets(file_path: str):
+    """Find the offset of every row of a tshark -T fields export.
+
+    Args:
+        file_path (str): The path to the TSV file
+
+    Returns:
+        np.ndarray: The offsets of the lines following the header, in file order
+    """
+    chunks = []
+    position = 0
+    with open(file_path, "rb") as file:
+        while True:
+            block = file.read(CHUNK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, np.uint8) == ord("\n"))
+            chunks.append(newlines.astype(np.uint64) + np.uint64(position + 1))
+            position += len(block)
+    offsets = np.concatenate(chunks) if chunks else np.empty(0, np.uint64)
+    # Pas de ligne après le dernier saut de ligne
+    return offsets[offsets < position]
+
+
+def _decode_range(file_path: str, start: int, end: int):
+    """Decode the packets of a byte range of a JSON file (process pool worker).
+
+    Args:
+        file_path (str): The path to the JSON file
+        start (int): The offset of the first packet of the range
+        end (int): The offset at which the range ends
+
+    Returns:
+        Tuple[List[Packet], int]: The packets and the offset of the first packet
+        after the range, or None if the range ends with the array. None instead
+        of the tuple if the range could not be decoded, the file is then
+        decoded serially.
+    """
+    packets = []
+    try:
+        with open(file_path, "rb") as file:
+            file.seek(start)
+            for offset, packet_data in iter_array_items(file, inside=True):
+                if offset >= end:
+                    return packets, offset
+                layers = packet_data["_source"]["layers"]
+                packet = Packets.determine_packet_type(layers)
+                if packet:
+                    packets.append(packet)
+    except (ValueError, KeyError, TypeError):
+        # Découpe au milieu d'un paquet (json.JSONDecodeError est une ValueError)
+        # ou paquet invalide : le décodage séquentiel décide
+        return None
+    return packets, None
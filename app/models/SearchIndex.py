@@ -0,0 +1,378 @@
+import re
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from app.models.Packet import to_number
+
+# Nombre de paquets par bloc de l'index de n-grammes
+BLOCK_SIZE = 256
+# Nombre de bits de l'empreinte des trigrammes de chaque bloc
+NGRAM_BITS = 4096
+# Nombre de recherches dont les résultats sont gardés (pagination, frappe)
+CACHED_SEARCHES = 32
+# Caractères spéciaux des expressions régulières
+REGEX_CHARACTERS = set(".^$*+?{}[]\\|()")
+# Champs des recherches « champ:valeur » et attributs correspondants
+FIELDS = {
+    "mac": ("src_mac", "dst_mac"),
+    "protocol": ("protocol",),
+    "station": ("stationID", "originating_station_id"),
+    "seq": ("seq_num", "sequence_number"),
+}
+
+
+class SearchIndex:
+    """A full-text index of the summaries of the packets of a capture
+
+    The summaries are built once and kept in one UTF-8 buffer, one line per
+    packet. Every block of BLOCK_SIZE packets has a fingerprint of the
+    trigrams of its summaries, so a term is only looked for in the blocks
+    holding all its trigrams. A plain term is found with ``bytes.find`` in
+    these blocks; a regular expression is only run on the summaries holding
+    a literal that every match must contain, when one can be extracted.
+
+    Terms of the form ``field:value`` with a field of FIELDS are answered by
+    an inverted index of the values of the field (MAC addresses, protocol
+    names, station IDs and sequence numbers), built on first use.
+
+    Attributes:
+        text (bytes): The summaries, separated by newlines
+        starts (np.ndarray): The offset of each summary in the text, followed
+            by the length of the text plus one
+        ngrams (np.ndarray): The trigram fingerprint of each block
+    """
+
+    def __init__(self, table, text, starts, ngrams):
+        """Create an index from its text
+
+        Args:
+            table (PacketTable): The packets, for the field searches
+            text (bytes): The summaries
+            starts (np.ndarray): The offset of each summary
+            ngrams (np.ndarray): The fingerprint of each block
+        """
+        self.table = table
+        self.text = text
+        self.starts = starts
+        self.ngrams = ngrams
+        self._fields = {}
+        self._results = OrderedDict()
+
+    @staticmethod
+    def from_table(table):
+        """Build the index of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+
+        Returns:
+            SearchIndex: The index
+        """
+        lines = [packet.summary().encode("utf-8") for packet in table]
+        text = b"\n".join(lines)
+        lengths = np.array([len(line) + 1 for line in lines], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths)))
+
+        # Trigrammes des lignes de chaque bloc
+        data = np.frombuffer(text, dtype=np.uint8)
+        blocks = (len(lines) + BLOCK_SIZE - 1) // BLOCK_SIZE
+        ngrams = np.zeros((blocks, NGRAM_BITS), dtype=bool)
+        for block in range(blocks):
+            start = starts[block * BLOCK_SIZE]
+            end = starts[min((block + 1) * BLOCK_SIZE, len(lines))]
+            ngrams[block, _hashes(data[start:end])] = True
+        return SearchIndex(table, text, starts, ngrams)
+
+    def __len__(self):
+        """Number of packets in the index
+
+        Returns:
+            int: The number of packets
+        """
+        return len(self.starts) - 1
+
+    def __contains__(self, term):
+        """Whether the result of a search term is kept by the index
+
+        Args:
+            term (str): The search term
+
+        Returns:
+            bool: True if searching the term again costs nothing
+        """
+        return term in self._results
+
+    def search(self, term):
+        """Find the packets whose summary matches a regular expression
+
+        The result is the same as ``re.search(term, packet.summary())`` for
+        every packet, except for the ``field:value`` searches.
+
+        Args:
+            term (str): The regular expression, a plain term or field:value
+
+        Returns:
+            np.ndarray: The rows, in table order
+
+        Raises:
+            re.error: If the term is not a valid regular expression
+        """
+        if term in self._results:
+            self._results.move_to_end(term)
+            return self._results[term]
+
+        field, _, value = term.partition(":")
+        if field in FIELDS and value:
+            rows = self._search_field(field, value)
+        elif not REGEX_CHARACTERS.intersection(term):
+            rows = self._search_literal(term)
+        else:
+            rows = self._search_regex(re.compile(term), _required_literal(term))
+
+        self._results[term] = rows
+        if len(self._results) > CACHED_SEARCHES:
+            self._results.popitem(last=False)
+        return rows
+
+    def _search_literal(self, term):
+        """Find the packets whose summary contains a string
+
+        Args:
+            term (str): The string
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        needle = term.encode("utf-8")
+        if not needle:
+            return np.arange(len(self))
+        if b"\n" in needle:
+            # Aucun résumé ne contient de saut de ligne
+            return np.array([], dtype=np.int64)
+        offsets = []
+        for start, end in self._candidate_ranges(needle):
+            position = self.text.find(needle, start, end)
+            while position >= 0:
+                offsets.append(position)
+                # Ligne suivante : un paquet n'est compté qu'une fois
+                position = self.text.find(b"\n", position, end)
+                if position < 0:
+                    break
+                position = self.text.find(needle, position + 1, end)
+        return np.searchsorted(self.starts, offsets, side="right") - 1
+
+    def _search_regex(self, pattern, literal):
+        """Find the packets whose summary matches a regular expression
+
+        Args:
+            pattern (re.Pattern): The compiled expression
+            literal (str): A string every match contains, may be empty
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        if len(literal) >= 3:
+            rows = self._search_literal(literal)
+        else:
+            rows = range(len(self))
+        starts = self.starts.tolist()
+        matches = [
+            row
+            for row in rows
+            if pattern.search(
+                self.text[starts[row] : starts[row + 1] - 1].decode("utf-8")
+            )
+        ]
+        return np.array(matches, dtype=np.int64)
+
+    def _candidate_ranges(self, needle):
+        """Get the parts of the text whose blocks hold every trigram of a term
+
+        Args:
+            needle (bytes): The term, in UTF-8
+
+        Returns:
+            List[Tuple[int, int]]: The start and end offsets of the parts
+        """
+        blocks = np.arange(len(self.ngrams))
+        if len(needle) >= 3:
+            hashes = _hashes(np.frombuffer(needle, dtype=np.uint8))
+            blocks = np.flatnonzero(self.ngrams[:, hashes].all(axis=1))
+        if not len(blocks):
+            return []
+        # Blocs consécutifs fusionnés en une seule plage
+        breaks = np.flatnonzero(np.diff(blocks) > 1) + 1
+        firsts = blocks[np.concatenate(([0], breaks))]
+        lasts = blocks[np.concatenate((breaks - 1, [len(blocks) - 1]))]
+        ends = np.minimum((lasts + 1) * BLOCK_SIZE, len(self))
+        return [
+            (int(self.starts[first * BLOCK_SIZE]), int(self.starts[end] - 1))
+            for first, end in zip(firsts.tolist(), ends.tolist())
+        ]
+
+    def _search_field(self, field, value):
+        """Find the packets with a value in a field of FIELDS
+
+        Args:
+            field (str): The field, e.g. "mac"
+            value (str): The value, a MAC address, a protocol name (one layer
+                of the protocol stack) or a number
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        if field not in self._fields:
+            self._fields[field] = self._field_postings(field)
+        return self._fields[field].get(_token(field, value), np.array([], np.int64))
+
+    def _field_postings(self, field):
+        """Build the inverted index of a field of FIELDS
+
+        Args:
+            field (str): The field
+
+        Returns:
+            Dict[str, np.ndarray]: The rows of each value, in table order
+        """
+        postings = defaultdict(set)
+        for name in FIELDS[field]:
+            if name not in self.table.columns:
+                continue
+            rows = np.flatnonzero(self.table.has_mask(name))
+            for row, value in zip(rows.tolist(), self.table.values(name, rows)):
+                if value is None:
+                    continue
+                values = value.split(":") if field == "protocol" else [value]
+                for item in values:
+                    postings[_token(field, item)].add(row)
+        return {
+            token: np.array(sorted(rows), dtype=np.int64)
+            for token, rows in postings.items()
+        }
+
+
+def _hashes(data):
+    """Hash the trigrams of a byte string into the fingerprint bits
+
+    Args:
+        data (np.ndarray): The bytes
+
+    Returns:
+        np.ndarray: The bit of each trigram
+    """
+    codes = (
+        (data[:-2].astype(np.uint32) << 16)
+        | (data[1:-1].astype(np.uint32) << 8)
+        | data[2:].astype(np.uint32)
+    )
+    return (codes * np.uint32(2654435761)) >> np.uint32(20)
+
+
+def _token(field, value):
+    """Normalize a value of a field of FIELDS
+
+    Args:
+        field (str): The field
+        value: The value
+
+    Returns:
+        str: The token
+    """
+    if field in ("station", "seq"):
+        return str(to_number(value) if isinstance(value, str) else value)
+    return str(value).lower()
+
+
+def _required_literal(pattern):
+    """Find a string contained in every match of a regular expression
+
+    Only the characters outside groups and classes, not followed by an
+    optional quantifier, are used; expressions with alternatives or flags
+    have no such string here.
+
+    Args:
+        pattern (str): The regular expression
+
+    Returns:
+        str: The longest such string, empty if none was found
+    """
+    if "|" in pattern or "(?" in pattern or re.search(r"\\[xuUN0-9]", pattern):
+        return ""
+    runs, run = [], ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if escaped.isalnum():
+                # Classe (\d, \w...), ancre ou référence arrière
+                runs.append(run)
+                run = ""
+                continue
+            char = escaped
+        elif char in "([":
+            runs.append(run)
+            run = ""
+            i = _skip_group(pattern, i)
+            continue
+        elif char in ".^$)]*+?}":
+            runs.append(run)
+            run = ""
+            i += 1
+            continue
+        elif char == "{":
+            runs.append(run)
+            run = ""
+            i = pattern.find("}", i) + 1 or len(pattern)
+            continue
+        else:
+            i += 1
+        if i < len(pattern) and pattern[i] in "*?{":
+            # Caractère facultatif : la chaîne s'arrête avant lui
+            runs.append(run)
+            run = ""
+            continue
+        if i < len(pattern) and pattern[i] == "+":
+            runs.append(run + char)
+            run = ""
+            continue
+        run += char
+    runs.append(run)
+    return max(runs, key=len)
+
+
+def _skip_group(pattern, i):
+    """Find the end of the group or class opening at a position
+
+    Args:
+        pattern (str): The regular expression
+        i (int): The position of "(" or "["
+
+    Returns:
+        int: The position after the closing ")" or "]"
+    """
+    if pattern[i] == "[":
+        i += 1
+        if i < len(pattern) and pattern[i] == "^":
+            i += 1
+        if i < len(pattern) and pattern[i] == "]":
+            i += 1
+        while i < len(pattern) and pattern[i] != "]":
+            i += 2 if pattern[i] == "\\" else 1
+        i += 1
+    else:
+        depth = 0
+        while i < len(pattern):
+            if pattern[i] == "\\":
+                i += 2
+                continue
+            if pattern[i] == "[":
+                i = _skip_group(pattern, i)
+                continue
+            depth += {"(": 1, ")": -1}.get(pattern[i], 0)
+            i += 1
+            if depth == 0:
+                break
+    return i
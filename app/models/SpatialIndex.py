@@ -0,0 +1,250 @@
+import math
+
+import numpy as np
+
+from app.utils import geodesy
+
+# Côté des cellules de la grille (en kilomètres, le long d'un méridien)
+CELL_SIZE_KM = 0.5
+# Colonnes de latitude et de longitude de chaque position indexée : position
+# source de l'en-tête GeoNetworking, position de référence des CAM et DENM
+POSITIONS = {
+    "source": ("src_pos_lat", "src_pos_long"),
+    "reference": ("latitude", "longitude"),
+}
+# Demi-circonférence terrestre : aucune distance ne la dépasse
+MAX_DISTANCE_KM = math.pi * geodesy.EARTH_RADIUS_KM
+
+
+class SpatialIndex:
+    """A uniform grid over the positions of a capture
+
+    The positions are split into cells of ``cell_size`` degrees of latitude
+    and longitude, numbered row by row, and stored sorted by cell. The cells
+    of one row of the grid overlapping a query are therefore a contiguous
+    range of the positions, found by binary search, and the exact distance
+    or bounds are only checked on the positions of these cells. Rows of the
+    grid outside the extent of the positions are never searched.
+
+    Attributes:
+        cell_size (float): The side of the cells, in degrees
+        codes (np.ndarray): The cell of each position, sorted
+        rows (np.ndarray): The row of each position in the table
+        lat (np.ndarray): The latitude of each position, in degrees
+        lon (np.ndarray): The longitude of each position, in degrees
+    """
+
+    def __init__(self, cell_size, codes, rows, lat, lon):
+        """Create an index from its sorted positions
+
+        Args:
+            cell_size (float): The side of the cells, in degrees
+            codes (np.ndarray): The cell of each position, sorted
+            rows (np.ndarray): The row of each position
+            lat (np.ndarray): The latitudes, in degrees
+            lon (np.ndarray): The longitudes, in degrees
+        """
+        self.cell_size = cell_size
+        self.codes = codes
+        self.rows = rows
+        self.lat = lat
+        self.lon = lon
+        self.columns = math.floor(360 / cell_size) + 1
+        cell_i = codes // self.columns
+        self.first_row = int(cell_i[0]) if len(codes) else 0
+        self.last_row = int(cell_i[-1]) if len(codes) else -1
+
+    @staticmethod
+    def from_table(table, lat_name, lon_name, cell_size_km: float = CELL_SIZE_KM):
+        """Build the index of a position of the packets
+
+        Args:
+            table (PacketTable): The packets of the capture
+            lat_name (str): The latitude attribute, e.g. "src_pos_lat"
+            lon_name (str): The longitude attribute, e.g. "src_pos_long"
+            cell_size_km (float): The side of the cells, in kilometers
+
+        Returns:
+            SpatialIndex: The index, without the packets lacking the position
+        """
+        cell_size = math.degrees(cell_size_km / geodesy.EARTH_RADIUS_KM)
+        lat, lon = table.degrees(lat_name), table.degrees(lon_name)
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        codes = _codes(lat[rows], lon[rows], cell_size)
+        # Tri stable : l'ordre du tableau est conservé dans chaque cellule
+        order = np.argsort(codes, kind="stable")
+        rows = rows[order]
+        return SpatialIndex(cell_size, codes[order], rows, lat[rows], lon[rows])
+
+    def __len__(self):
+        """Number of positions in the index
+
+        Returns:
+            int: The number of positions
+        """
+        return len(self.rows)
+
+    def within(self, latitude, longitude, radius):
+        """Find the positions within a radius of a point
+
+        Args:
+            latitude (float): The latitude of the point, in degrees
+            longitude (float): The longitude of the point, in degrees
+            radius (float): The radius, in kilometers
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        candidates, distances = self._around(latitude, longitude, radius)
+        return np.sort(self.rows[candidates[distances <= radius]])
+
+    def in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Find the positions inside a bounding box, bounds included
+
+        Args:
+            min_lat (float): The southern bound, in degrees
+            min_lon (float): The western bound, in degrees
+            max_lat (float): The northern bound, in degrees
+            max_lon (float): The eastern bound, in degrees; smaller than the
+                western bound when the box crosses the antimeridian
+
+        Returns:
+            np.ndarray: The rows, in table order
+        """
+        if min_lon <= max_lon:
+            spans = [(min_lon, max_lon)]
+        else:
+            spans = [(min_lon, 180.0), (-180.0, max_lon)]
+        candidates = self._candidates(min_lat, max_lat, spans)
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat)
+        if min_lon <= max_lon:
+            inside &= (lon >= min_lon) & (lon <= max_lon)
+        else:
+            inside &= (lon >= min_lon) | (lon <= max_lon)
+        return np.sort(self.rows[candidates[inside]])
+
+    def nearest(self, latitude, longitude, count):
+        """Find the positions closest to a point
+
+        The search radius starts at one cell and doubles until it holds
+        enough positions, so only the cells around the point are read.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees
+            longitude (float): The longitude of the point, in degrees
+            count (int): The number of positions wanted
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The rows and their distances in
+            kilometers, closest first, the first row in table order winning a
+            tie
+        """
+        count = min(count, len(self))
+        radius = geodesy.EARTH_RADIUS_KM * math.radians(self.cell_size)
+        while True:
+            candidates, distances = self._around(latitude, longitude, radius)
+            close = distances <= radius
+            if np.count_nonzero(close) >= count or radius >= MAX_DISTANCE_KM:
+                break
+            radius *= 2
+        rows, distances = self.rows[candidates[close]], distances[close]
+        order = np.lexsort((rows, distances))[:count]
+        return rows[order], distances[order]
+
+    def _around(self, latitude, longitude, radius):
+        """Get the positions of the cells around a point, with their distances
+
+        Args:
+            latitude (float): The latitude of the point, in degrees
+            longitude (float): The longitude of the point, in degrees
+            radius (float): The radius, in kilometers
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The positions in the index and their
+            distances to the point, in kilometers
+        """
+        margin, longitude_margin = geodesy.bounding_margin(latitude, radius)
+        if longitude_margin >= 180:
+            spans = [(-180.0, 180.0)]
+        else:
+            west, east = longitude - longitude_margin, longitude + longitude_margin
+            spans = [(max(west, -180.0), min(east, 180.0))]
+            # Morceaux de l'autre côté de l'antiméridien
+            if west < -180:
+                spans.append((west + 360, 180.0))
+            if east > 180:
+                spans.append((-180.0, east - 360))
+        candidates = self._candidates(latitude - margin, latitude + margin, spans)
+        distances = geodesy.one_to_many(
+            latitude, longitude, self.lat[candidates], self.lon[candidates]
+        )
+        return candidates, distances
+
+    def _candidates(self, min_lat, max_lat, spans):
+        """Get the positions of the cells overlapping a box
+
+        Args:
+            min_lat (float): The southern bound, in degrees
+            max_lat (float): The northern bound, in degrees
+            spans (List[Tuple[float, float]]): The longitude ranges of the box,
+                each within [-180, 180]
+
+        Returns:
+            np.ndarray: The positions in the index, by cell
+        """
+        first_row = max(_cell(min_lat, 90, self.cell_size), self.first_row)
+        last_row = min(_cell(max_lat, 90, self.cell_size), self.last_row)
+        if first_row > last_row:
+            return np.array([], dtype=np.int64)
+        grid_rows = np.arange(first_row, last_row + 1, dtype=np.int64)
+
+        starts, ends = [], []
+        for west, east in spans:
+            first_column = _cell(west, 180, self.cell_size)
+            last_column = _cell(east, 180, self.cell_size)
+            # Une tranche contiguë des positions par rangée de la grille
+            starts.append(
+                np.searchsorted(self.codes, grid_rows * self.columns + first_column)
+            )
+            ends.append(
+                np.searchsorted(
+                    self.codes, grid_rows * self.columns + last_column, side="right"
+                )
+            )
+        starts, ends = np.concatenate(starts), np.concatenate(ends)
+        counts = ends - starts
+        offsets = np.arange(counts.sum())
+        offsets -= np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets
+
+
+def _cell(value, offset, cell_size):
+    """Get the grid row or column of a latitude or longitude
+
+    Args:
+        value (float): The latitude or longitude, in degrees
+        offset (float): 90 for a latitude, 180 for a longitude
+        cell_size (float): The side of the cells, in degrees
+
+    Returns:
+        int: The row or column
+    """
+    return math.floor((min(max(value, -offset), offset) + offset) / cell_size)
+
+
+def _codes(lat, lon, cell_size):
+    """Get the cell of some positions
+
+    Args:
+        lat (np.ndarray): The latitudes, in degrees
+        lon (np.ndarray): The longitudes, in degrees
+        cell_size (float): The side of the cells, in degrees
+
+    Returns:
+        np.ndarray: The cell numbers, row by row
+    """
+    columns = math.floor(360 / cell_size) + 1
+    cell_i = np.floor((np.clip(lat, -90, 90) + 90) / cell_size).astype(np.int64)
+    cell_j = np.floor((np.clip(lon, -180, 180) + 180) / cell_size).astype(np.int64)
+    return cell_i * columns + cell_j
@@ -0,0 +1,101 @@
+from collections import defaultdict
+
+import numpy as np
+
+from app.models.CAM import CAM
+
+
+class StationIndex:
+    """An index of the station behind each source MAC address
+
+    Built in one pass over the CAMs of a capture: every (MAC, station ID)
+    pair seen is stored with the time of its first and last CAM. A station
+    that changes its MAC address (pseudonym change) appears under each of its
+    addresses, and an address reused by another station later in the capture
+    has one interval per station.
+
+    Attributes:
+        intervals (Dict[str, List[list]]): The [station ID, first seen, last
+            seen] intervals of each MAC address, in order of their first CAM
+            in the capture
+    """
+
+    def __init__(self, intervals):
+        """Create an index from its intervals
+
+        Args:
+            intervals (Dict[str, List[list]]): The intervals of each MAC address
+        """
+        self.intervals = intervals
+
+    @staticmethod
+    def from_table(table):
+        """Build the index of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+
+        Returns:
+            StationIndex: The index
+        """
+        rows = np.flatnonzero(table.type_mask(CAM))
+        macs = table.values("src_mac", rows)
+        stations = table.values("stationID", rows)
+        times = table.epoch[rows].tolist()
+
+        intervals = defaultdict(list)
+        by_pair = {}
+        for mac, station, time in zip(macs, stations, times):
+            interval = by_pair.get((mac, station))
+            if interval is None:
+                interval = by_pair[mac, station] = [station, time, time]
+                intervals[mac].append(interval)
+            elif time < interval[1]:
+                interval[1] = time
+            elif time > interval[2]:
+                interval[2] = time
+        return StationIndex(dict(intervals))
+
+    def station(self, mac_address, time=None):
+        """Get the station that used a MAC address
+
+        Without a time, or when only one station used the address, this is the
+        station of the first CAM sent from the address. Otherwise it is the
+        station that used the address at that time, or the closest in time.
+
+        Args:
+            mac_address (str): The MAC address
+            time (float): The time, in seconds since the epoch
+
+        Returns:
+            int: The station ID, None if no CAM was sent from the address
+        """
+        intervals = self.intervals.get(mac_address)
+        if not intervals:
+            return None
+        if time is None or len(intervals) == 1:
+            return intervals[0][0]
+
+        def distance(interval):
+            _, first_seen, last_seen = interval
+            return max(first_seen - time, time - last_seen, 0.0)
+
+        return min(intervals, key=distance)[0]
+
+    def mac_addresses(self, station_id):
+        """Get the MAC addresses used by a station
+
+        Args:
+            station_id (int): The station ID
+
+        Returns:
+            List[Tuple[str, float, float]]: The MAC addresses with the time of
+            their first and last CAM, in order of first use
+        """
+        used = [
+            (mac, first_seen, last_seen)
+            for mac, intervals in self.intervals.items()
+            for station, first_seen, last_seen in intervals
+            if station == station_id
+        ]
+        return sorted(used, key=lambda entry: entry[1])
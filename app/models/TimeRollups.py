@@ -0,0 +1,159 @@
+import numpy as np
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+
+# Résolutions des agrégats, en secondes, de la plus fine à la plus grossière
+RESOLUTIONS = (1, 10, 60, 900)
+
+# Résolution utilisée quand aucun nombre de points n'est demandé
+DEFAULT_RESOLUTION = 60
+
+# Catégories comptées séparément, dans l'ordre des colonnes des agrégats
+CATEGORIES = ("CAM", "DENM", "Autres")
+
+
+class TimeRollups:
+    """Packet counts and bytes per time bucket, at several resolutions
+
+    Each level stores only its non-empty buckets: the start of each bucket
+    (seconds since the epoch, a multiple of the resolution), and the number
+    of packets and the sum of their frame lengths for each category of
+    CATEGORIES. The 1 s level is built in one vectorized pass over the
+    packets, the coarser levels from the 1 s level, so a query costs the
+    number of buckets it returns, not the number of packets.
+
+    Attributes:
+        levels (Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]): The
+            bucket starts, counts and bytes of each resolution; counts and
+            bytes have one column per category
+    """
+
+    def __init__(self, levels):
+        """Create rollups from their levels
+
+        Args:
+            levels (Dict[int, tuple]): The buckets of each resolution
+        """
+        self.levels = levels
+
+    @staticmethod
+    def from_table(table):
+        """Build the rollups of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+
+        Returns:
+            TimeRollups: The rollups
+        """
+        epoch = table.epoch
+        valid = np.isfinite(epoch)
+        seconds = np.floor(epoch[valid]).astype(np.int64)
+        # Catégorie de chaque paquet : CAM, DENM ou autre
+        categories = table.categories((CAM, DENM))[valid]
+        frame_len = np.nan_to_num(table.numeric("frame_len")[valid])
+
+        starts, buckets = np.unique(seconds, return_inverse=True)
+        cells = buckets * len(CATEGORIES) + categories
+        size = len(starts) * len(CATEGORIES)
+        counts = np.bincount(cells, minlength=size).reshape(-1, len(CATEGORIES))
+        sizes = np.bincount(cells, weights=frame_len, minlength=size)
+        sizes = sizes.astype(np.int64).reshape(-1, len(CATEGORIES))
+
+        levels = {RESOLUTIONS[0]: (starts, counts, sizes)}
+        for resolution in RESOLUTIONS[1:]:
+            # Les secondes sont triées : chaque seau grossier est une tranche
+            keys = starts // resolution * resolution
+            first = np.flatnonzero(np.diff(keys)) + 1
+            first = np.concatenate(([0], first)) if len(keys) else first
+            levels[resolution] = (
+                keys[first],
+                _sum_slices(counts, first),
+                _sum_slices(sizes, first),
+            )
+        return TimeRollups(levels)
+
+    def resolution_for(self, start=None, end=None, points=None):
+        """Choose the coarsest resolution giving enough points over a range
+
+        Args:
+            start (float): The start of the range, in seconds since the epoch,
+                the first packet if None
+            end (float): The end of the range, the last packet if None
+            points (int): The number of points wanted, DEFAULT_RESOLUTION is
+                used if None
+
+        Returns:
+            int: The resolution, in seconds
+        """
+        if points is None:
+            return DEFAULT_RESOLUTION
+        first, last = self._bounds()
+        start = first if start is None else start
+        end = last if end is None else end
+        span = max(end - start, 0)
+        adequate = [r for r in RESOLUTIONS if span / r >= points]
+        return adequate[-1] if adequate else RESOLUTIONS[0]
+
+    def query(self, start=None, end=None, points=None, resolution=None):
+        """Get the buckets of a time range
+
+        Args:
+            start (float): The start of the range, in seconds since the epoch,
+                from the first packet if None
+            end (float): The end of the range, included, to the last packet if
+                None
+            points (int): The number of points wanted, see ``resolution_for``
+            resolution (int): The resolution, one of RESOLUTIONS, instead of
+                choosing it from ``points``
+
+        Returns:
+            dict: The resolution in seconds, the start of each non-empty bucket
+            in seconds since the epoch, and the counts and bytes of each
+            bucket, by category
+        """
+        if resolution is None:
+            resolution = self.resolution_for(start, end, points)
+        starts, counts, sizes = self.levels[resolution]
+        first = 0
+        last = len(starts)
+        if start is not None:
+            first = np.searchsorted(starts, start // resolution * resolution, "left")
+        if end is not None:
+            last = np.searchsorted(starts, end, side="right")
+
+        result = {"resolution": resolution, "times": starts[first:last].tolist()}
+        for column, category in enumerate(CATEGORIES):
+            result[category] = {
+                "counts": counts[first:last, column].tolist(),
+                "bytes": sizes[first:last, column].tolist(),
+            }
+        return result
+
+    def _bounds(self):
+        """Get the first and last second with packets
+
+        Returns:
+            Tuple[int, int]: The bounds, in seconds since the epoch (0, 0 if
+            no packet has a time)
+        """
+        starts = self.levels[RESOLUTIONS[0]][0]
+        if not len(starts):
+            return 0, 0
+        return int(starts[0]), int(starts[-1])
+
+
+def _sum_slices(values, first):
+    """Sum the consecutive rows of a 2-D array by slice
+
+    Args:
+        values (np.ndarray): The rows, one column per category
+        first (np.ndarray): The first row of each slice
+
+    Returns:
+        np.ndarray: The sum of the rows of each slice
+    """
+    if not len(first):
+        return values[:0]
+    return np.add.reduceat(values, first, axis=0)
@@ -0,0 +1,149 @@
+import numpy as np
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.PacketTable import PACKET_TYPES
+
+# Catégories comptées séparément pour chaque adresse source
+CATEGORIES = (CAM, DENM)
+
+
+class TrafficSummary:
+    """Packet counts and bytes by class and by MAC address, built in one pass
+
+    The dashboard counters, the source and destination charts and the MAC
+    address chart are all read from this summary, so each capture is only
+    aggregated once whatever the number of charts.
+
+    Attributes:
+        type_counts (Dict[type, int]): The number of packets of each exact
+            class of PACKET_TYPES
+        type_bytes (Dict[type, int]): The sum of their frame lengths
+        sources (List): The source MAC addresses, in order of first packet
+        source_counts (np.ndarray): The number of CAMs, DENMs and other packets
+            sent from each source address, one row per address
+        source_bytes (np.ndarray): The bytes sent from each source address
+        destinations (List): The destination MAC addresses, in order of first
+            packet
+        destination_counts (np.ndarray): The number of packets sent to each
+            destination address
+        destination_bytes (np.ndarray): The bytes sent to each destination
+    """
+
+    def __init__(self, type_counts, type_bytes, sources, destinations):
+        """Create a summary from its counters
+
+        Args:
+            type_counts (Dict[type, int]): The packets of each class
+            type_bytes (Dict[type, int]): The bytes of each class
+            sources (Tuple[list, np.ndarray, np.ndarray]): The source
+                addresses, their counts by category and their bytes
+            destinations (Tuple[list, np.ndarray, np.ndarray]): The
+                destination addresses, their counts and their bytes
+        """
+        self.type_counts = type_counts
+        self.type_bytes = type_bytes
+        self.sources, self.source_counts, self.source_bytes = sources
+        (
+            self.destinations,
+            self.destination_counts,
+            self.destination_bytes,
+        ) = destinations
+
+    @staticmethod
+    def from_table(table):
+        """Aggregate the packets of a capture
+
+        Args:
+            table (PacketTable): The packets of the capture
+
+        Returns:
+            TrafficSummary: The summary
+        """
+        frame_len = np.nan_to_num(table.numeric("frame_len"))
+        types = np.asarray(table.types, dtype=np.int64)
+        type_counts = np.bincount(types, minlength=len(PACKET_TYPES))
+        type_bytes = np.bincount(
+            types, weights=frame_len, minlength=len(PACKET_TYPES)
+        )
+
+        # Compteurs par adresse source et catégorie, en une seule passe
+        sources, source_values = table.groups("src_mac")
+        width = len(CATEGORIES) + 1
+        cells = sources * width + table.categories(CATEGORIES)
+        source_counts = np.bincount(cells, minlength=len(source_values) * width)
+        source_bytes = np.bincount(
+            sources, weights=frame_len, minlength=len(source_values)
+        )
+
+        destinations, destination_values = table.groups("dst_mac")
+        destination_counts = np.bincount(
+            destinations, minlength=len(destination_values)
+        )
+        destination_bytes = np.bincount(
+            destinations, weights=frame_len, minlength=len(destination_values)
+        )
+
+        return TrafficSummary(
+            dict(zip(PACKET_TYPES, type_counts.tolist())),
+            dict(zip(PACKET_TYPES, type_bytes.astype(np.int64).tolist())),
+            (
+                source_values,
+                source_counts.reshape(-1, width),
+                source_bytes.astype(np.int64),
+            ),
+            (
+                destination_values,
+                destination_counts,
+                destination_bytes.astype(np.int64),
+            ),
+        )
+
+    def count(self, packet_type):
+        """Count the packets of a class, subclasses included (like isinstance)
+
+        Args:
+            packet_type (type): The packet class
+
+        Returns:
+            int: The number of packets
+        """
+        return sum(
+            count
+            for table_type, count in self.type_counts.items()
+            if issubclass(table_type, packet_type)
+        )
+
+    def src_traffic(self):
+        """Count the packets sent from each source address
+
+        Returns:
+            dict: The number of packets, by source address
+        """
+        return dict(zip(self.sources, self.source_counts.sum(axis=1).tolist()))
+
+    def dst_traffic(self):
+        """Count the packets sent to each destination address
+
+        Returns:
+            dict: The number of packets, by destination address
+        """
+        return dict(zip(self.destinations, self.destination_counts.tolist()))
+
+    def traffic_details(self):
+        """Count the packets sent from each source address, by category
+
+        Returns:
+            dict: The total, CAM, DENM and other packets, by source address
+        """
+        return {
+            source: {
+                "total_packets": cam + denm + other,
+                "cam_packets": cam,
+                "denm_packets": denm,
+                "other_packets": other,
+            }
+            for source, (cam, denm, other) in zip(
+                self.sources, self.source_counts.tolist()
+            )
+        }
@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.CAM import CAM
+from app.routes.api.query import packet_response
 
 cam_blueprint = Blueprint('cam', __name__)
 
-@cam_blueprint.route('/')
-def get_cam_data():
-    return jsonify({"message": "Data from CAM"})
+@cam_blueprint.route('/<int:frame_number>')
+def get_cam_data(frame_number):
+    """Get a CAM of a capture by frame number, see packet_response"""
+    return packet_response(frame_number, CAM)
@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.DENM import DENM
+from app.routes.api.query import packet_response
 
 denm_blueprint = Blueprint('denm', __name__)
 
-@denm_blueprint.route('/')
-def get_denm_data():
-    return jsonify({"message": "Data from DENM"})
+@denm_blueprint.route('/<int:frame_number>')
+def get_denm_data(frame_number):
+    """Get a DENM of a capture by frame number, see packet_response"""
+    return packet_response(frame_number, DENM)
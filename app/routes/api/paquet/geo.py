@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.GeoNetworking import GeoNetworking
+from app.routes.api.query import packet_response
 
 geo_blueprint = Blueprint('geo', __name__)
 
-@geo_blueprint.route('/')
-def get_geo_data():
-    return jsonify({"message": "Data from GEO"})
+@geo_blueprint.route('/<int:frame_number>')
+def get_geo_data(frame_number):
+    """Get a GeoNetworking packet of a capture by frame number, see packet_response"""
+    return packet_response(frame_number, GeoNetworking)
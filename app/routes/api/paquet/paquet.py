@@ -1,9 +1,12 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.routes.api.query import packet_response
 
 paquet_blueprint = Blueprint('paquet', __name__)
 
-@paquet_blueprint.route('/')
-def get_paquet_data():
-    return jsonify({"message": "Data from Paquet"})
+@paquet_blueprint.route('/<int:frame_number>')
+def get_paquet_data(frame_number):
+    """Get a packet of a capture by frame number, see packet_response"""
+    return packet_response(frame_number)
 
 
@@ -1,7 +1,17 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.CAM import CAM
+from app.routes.api.query import export_response, packets_response
 
 cam_paq_blueprint = Blueprint('cam_paq', __name__)
 
 @cam_paq_blueprint.route('/')
 def get_cam_paq_data():
-    return jsonify({"message": "Data from CAM Paquets"})
+    """Get a page of the CAMs of a capture, see packets_response"""
+    return packets_response(CAM)
+
+
+@cam_paq_blueprint.route('/export')
+def export_cam_paq_data():
+    """Stream the CAMs of a capture, see export_response"""
+    return export_response(CAM)
@@ -1,7 +1,17 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.DENM import DENM
+from app.routes.api.query import export_response, packets_response
 
 denm_paq_blueprint = Blueprint('denm_paq', __name__, url_prefix='/denm')
 
 @denm_paq_blueprint.route('/')
 def get_denm_paq_data():
-    return jsonify({"message": "Data from DENM Paquets"})
+    """Get a page of the DENMs of a capture, see packets_response"""
+    return packets_response(DENM)
+
+
+@denm_paq_blueprint.route('/export')
+def export_denm_paq_data():
+    """Stream the DENMs of a capture, see export_response"""
+    return export_response(DENM)
@@ -1,7 +1,18 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+
+from app.models.GeoNetworking import GeoNetworking
+from app.routes.api.query import export_response, packets_response
 
 geo_paq_blueprint = Blueprint('geo_paq', __name__, url_prefix='/geo')
 
 @geo_paq_blueprint.route('/')
 def get_geo_paq_data():
-    return jsonify({"message": "Data from GEO Paquets"})
+    """Get a page of the GeoNetworking packets of a capture, CAMs and DENMs
+    included, see packets_response"""
+    return packets_response(GeoNetworking)
+
+
+@geo_paq_blueprint.route('/export')
+def export_geo_paq_data():
+    """Stream the GeoNetworking packets of a capture, see export_response"""
+    return export_response(GeoNetworking)
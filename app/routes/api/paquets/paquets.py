@@ -1,7 +1,58 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, abort, current_app, request, session
+
+from app.extensions import chart_cache
+from app.routes.api.query import capture_path, export_response, packets_response
+from app.services.charts import CHARTS, chart_key, chart_payload
 
 paquets_blueprint = Blueprint('paquets', __name__, url_prefix='/paquets')
 
 @paquets_blueprint.route('/')
 def get_paquets_data():
-    return jsonify({"message": "General data from all Paquets"})
+    """Get a page of the packets of a capture, see packets_response"""
+    return packets_response()
+
+
+@paquets_blueprint.route("/export")
+def export_paquets_data():
+    """Stream the packets of a capture, see export_response"""
+    return export_response()
+
+
+@paquets_blueprint.route("/charts/<name>")
+def get_chart_data(name):
+    """Get the data of a dashboard chart, as JSON
+
+    The capture is the ``file`` query argument, the last used file if absent.
+    The data is computed once per capture and cached; its ETag only depends
+    on the capture and the chart, so a request with a matching If-None-Match
+    header is answered with 304 without loading the capture.
+
+    Args:
+        name (str): The chart, a key of CHARTS
+    """
+    if name not in CHARTS:
+        abort(404, description="Unknown chart.")
+    file_path = capture_path(request.args.get("file") or session.get("last_used_file"))
+    config = current_app.config
+
+    try:
+        key = chart_key(file_path, name, config)
+    except FileNotFoundError:
+        abort(404, description="File not found.")
+    etag = chart_cache.etag(key)
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        compute = chart_payload(file_path, name, config, current_app.json)
+        try:
+            payload = chart_cache.get(key, compute)
+        except FileNotFoundError:
+            abort(404, description="File not found.")
+        except ValueError as e:
+            abort(400, description=str(e))
+        response = current_app.response_class(payload, mimetype="application/json")
+
+    response.set_etag(etag)
+    # Toujours revalidé : la capture peut être réécrite sous le même nom
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,213 @@
+import os
+
+from flask import abort, current_app, jsonify, request, session, url_for
+
+from app.models.Packet import Packet
+from app.models.PacketQuery import PacketQuery
+from app.routes.views.views import load_packets
+from app.services import export
+
+# Clés de to_dict pouvant être demandées avec « fields »
+FIELDS = set(export.columns(Packet))
+
+
+def capture_path(filename):
+    """Get the path to a capture of the data directory
+
+    Args:
+        filename (str): The name of the export, None for none
+
+    Returns:
+        str: The path to the export
+
+    Raises:
+        NotFound: If no file is given or the name is not a plain file name
+    """
+    if not filename or os.path.basename(filename) != filename:
+        abort(404, description="File not found.")
+    return os.path.join(current_app.root_path, "data/json", filename)
+
+
+def request_capture():
+    """Get the packets of the capture of the current request
+
+    The capture is the ``file`` query argument, the last used file if absent.
+    It is read from the capture cache.
+
+    Returns:
+        Packets: The packets
+
+    Raises:
+        NotFound: If the file is not found
+        BadRequest: If the file is not a JSON or TSV file
+    """
+    file_path = capture_path(request.args.get("file") or session.get("last_used_file"))
+    try:
+        return load_packets(file_path)
+    except FileNotFoundError:
+        abort(404, description="File not found.")
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+def request_query(packet_type=None, packets=None):
+    """Get the filters of the current request
+
+    Args:
+        packet_type (type): The packet class of the endpoint, from the type
+            argument if None
+        packets (Packets): The capture queried, whose clock gives the time
+            zone of the start and end dates without one
+
+    Returns:
+        PacketQuery: The filters
+
+    Raises:
+        BadRequest: If an argument is not valid
+    """
+    try:
+        return PacketQuery.from_args(request.args, packet_type, packets)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+
+def request_fields():
+    """Get the fields of the packets requested with the ``fields`` argument
+
+    Returns:
+        List[str]: The keys of to_dict to keep, None for every key
+
+    Raises:
+        BadRequest: If a field is unknown
+    """
+    if not request.args.get("fields"):
+        return None
+    fields = [field.strip() for field in request.args["fields"].split(",")]
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def int_argument(name, default=None):
+    """Read an integer argument of the current request
+
+    Args:
+        name (str): The argument name
+        default (int): The value when the argument is absent
+
+    Returns:
+        int: The value
+
+    Raises:
+        BadRequest: If the argument is not an integer
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, description=f"{name} must be an integer.")
+
+
+def packets_response(packet_type=None):
+    """Answer a request for a page of packets
+
+    The arguments are the filters of PacketQuery.from_args, ``fields``,
+    ``limit`` (capped at API_MAX_PAGE_SIZE) and ``after``, the cursor of the
+    page: the ``next_cursor`` of the previous page.
+
+    Args:
+        packet_type (type): The packet class of the endpoint, from the type
+            argument if None
+
+    Returns:
+        Response: The packets, the number of matching packets and the cursor
+        and URL of the next page (None on the last page), as JSON
+    """
+    capture = request_capture()
+    query = request_query(packet_type, capture)
+    fields = request_fields()
+    after = int_argument("after")
+    limit = int_argument("limit", current_app.config["API_PAGE_SIZE"])
+    if limit < 1:
+        abort(400, description="limit must be a positive integer.")
+    limit = min(limit, current_app.config["API_MAX_PAGE_SIZE"])
+
+    packets, cursor, total = capture.query_packets(query, after, limit)
+    next_url = None
+    if cursor is not None:
+        args = request.args.to_dict()
+        args["after"] = cursor
+        next_url = url_for(request.endpoint, **(request.view_args or {}), **args)
+    return jsonify(
+        {
+            "packets": [export.project(packet, fields) for packet in packets],
+            "total": total,
+            "limit": limit,
+            "next_cursor": cursor,
+            "next": next_url,
+        }
+    )
+
+
+def packet_response(frame_number, packet_type=Packet):
+    """Answer a request for one packet
+
+    Args:
+        frame_number (int): The frame number of the packet
+        packet_type (type): The packet class of the endpoint
+
+    Returns:
+        Response: The packet, restricted to the ``fields`` argument, as JSON
+
+    Raises:
+        NotFound: If there is no packet of the class with this frame number
+    """
+    fields = request_fields()
+    packet = request_capture().get_packet(frame_number)
+    if not isinstance(packet, packet_type):
+        abort(404, description="Packet not found.")
+    return jsonify(export.project(packet, fields))
+
+
+def export_response(packet_type=None):
+    """Stream the packets matching the filters of the current request
+
+    The arguments are the filters of PacketQuery.from_args, ``fields`` and
+    ``format`` ("ndjson", the default, or "csv"). The packets are encoded
+    batch by batch while the response is sent, and compressed on the fly
+    when the client accepts gzip, so the memory used does not depend on the
+    number of packets.
+
+    Args:
+        packet_type (type): The packet class of the endpoint, from the type
+            argument if None
+
+    Returns:
+        Response: The streamed export, as an attachment
+    """
+    packets = request_capture()
+    query = request_query(packet_type, packets)
+    fields = request_fields()
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in export.FORMATS:
+        abort(400, description=f"Unknown format: {export_format}")
+
+    batches = packets.iter_query(query)
+    if export_format == "csv":
+        fields = fields or export.columns(query.packet_type)
+        chunks = export.iter_csv(batches, fields)
+    else:
+        chunks = export.iter_ndjson(batches, fields)
+    mimetype, extension = export.FORMATS[export_format]
+    filename = os.path.splitext(os.path.basename(packets.file_path))[0]
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+    if request.accept_encodings["gzip"]:
+        chunks = export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return current_app.response_class(chunks, mimetype=mimetype, headers=headers)
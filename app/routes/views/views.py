@@ -15,15 +15,73 @@ from flask_socketio import SocketIO
 import os
 import json
 import subprocess
+import threading
+from collections import OrderedDict
 from app.models.Packets import Packets
 from app.models.Packet import Packet
 from app.models.DENM import DENM
 from app.models.CAM import CAM
+from app.services.PCAPtoJSON import convert
+from app.extensions import capture_cache
+from app.services.charts import prefetch_charts
 
 
 # Créer un blueprint pour les vues
 views_blueprint = Blueprint("views", __name__)
 
+# Collections lues page par page (non chargées), par clé du cache des captures
+PAGE_READERS = 16
+_page_readers = OrderedDict()
+_page_readers_lock = threading.Lock()
+
+
+def load_packets(file_path):
+    """Get the packets of a capture from the capture cache
+
+    Args:
+        file_path (str): The path to the export
+
+    Returns:
+        Packets: The collection, loaded if it was not cached
+
+    Raises:
+        FileNotFoundError: If the file is not found
+        ValueError: If the file is not a JSON or TSV file
+    """
+    workers = current_app.config["PACKETS_WORKERS"]
+    return capture_cache.get(file_path, lambda: Packets(file_path, workers=workers))
+
+
+def open_packets(file_path):
+    """Get a collection of a capture reading its packets page by page
+
+    The collection is not loaded: its offset index is read once (see
+    ``Packets.read_packets``) and the collection is kept for the next pages,
+    under the key of the capture cache, so a rewritten capture is reopened.
+
+    Args:
+        file_path (str): The path to the export
+
+    Returns:
+        Packets: The collection
+
+    Raises:
+        FileNotFoundError: If the file is not found
+        ValueError: If the file is not a JSON or TSV file
+    """
+    key = capture_cache.key(file_path)
+    with _page_readers_lock:
+        packets = _page_readers.get(key)
+        if packets is not None:
+            _page_readers.move_to_end(key)
+            return packets
+    packets = Packets(file_path, load=False)
+    with _page_readers_lock:
+        _page_readers[key] = packets
+        while len(_page_readers) > PAGE_READERS:
+            _page_readers.popitem(last=False)
+    return packets
+
 
 @views_blueprint.route("/")
 def index():
@@ -31,9 +89,9 @@ def index():
     data_dir = os.path.join(current_app.root_path, "data/json")
 
     try:
-        # Liste tous les fichiers .json et les trier par date de modification, les plus récents d'abord
+        # Liste tous les exports (.json et .tsv) et les trier par date de modification, les plus récents d'abord
         files = sorted(
-            (f for f in os.listdir(data_dir) if f.endswith(".json")),
+            (f for f in os.listdir(data_dir) if f.endswith((".json", ".tsv"))),
             key=lambda f: os.path.getmtime(os.path.join(data_dir, f)),
             reverse=True,
         )
@@ -69,18 +127,17 @@ def packets(filename):
     file_path = os.path.join(data_dir, filename)
 
     try:
-        packets_collection = Packets(file_path)
+        # Seule la page est décodée, grâce à l'index des offsets des paquets
+        packets_collection = open_packets(file_path)
+        total_packets = packets_collection.count_packets()
+        packets_page = packets_collection.read_packets(page, per_page)
         session["last_used_file"] = filename  # Update the last used file in the session
     except FileNotFoundError:
         abort(404, description="File not found.")
     except ValueError as e:
         abort(400, description=str(e))
 
-    total_packets = len(packets_collection.packets)
     total_pages = (total_packets + per_page - 1) // per_page
-    start_index = (page - 1) * per_page
-    end_index = start_index + per_page
-    packets_page = packets_collection.packets[start_index:end_index]
 
     pagination = {
         "total": total_packets,
@@ -106,17 +163,13 @@ def dashboard():
     file_path = os.path.join(data_dir, filename)
 
     try:
-        packets_collection = Packets(file_path)
+        # Les graphiques sont calculés en parallèle pendant l'affichage de la
+        # page, qui récupère leurs données auprès de l'API
+        prefetch_charts(file_path, current_app.config, current_app.json)
     except FileNotFoundError:
         abort(404, description="File not found.")
-    except ValueError as e:
-        abort(400, description=str(e))
-
-    # print(packets_collection.time_series_data())
-    # packets_collection.test()
-    # print(packets_collection.test())
 
-    return render_template("dashboard.html", packets=packets_collection, file=filename)
+    return render_template("dashboard.html", file=filename)
 
 
 # DENMmap
@@ -131,7 +184,7 @@ def DENMmap():
     file_path = os.path.join(data_dir, filename)
 
     try:
-        packets_collection = Packets(file_path)
+        packets_collection = load_packets(file_path)
     except FileNotFoundError:
         abort(404, description="File not found.")
     except ValueError as e:
@@ -168,7 +221,7 @@ def upload_file():
     pcap_files = []
 
     for file in files:
-        if file.filename.endswith(".pcap"):
+        if file.filename.endswith((".pcap", ".pcapng")):
             filename = os.path.join(pcap_folder, file.filename)
             file.save(filename)
             pcap_files.append(filename)
@@ -187,18 +240,52 @@ def upload_file():
             check=True,
         )
 
-        with open(json_output, "w") as json_file:
-            subprocess.run(
-                [
-                    os.path.join("/Applications/Wireshark.app/Contents/MacOS/tshark"),
-                    "-r",
-                    combined_pcap,
-                    "-T",
-                    "json",
-                ],
-                stdout=json_file,
-                check=True,
-            )
+        if current_app.config["PCAP_CONVERTER"] == "native":
+            # Lecture directe du pcap, tshark ne traite que les trames non supportées
+            convert(combined_pcap, json_output, current_app.config["TSHARK_PATH"])
+        elif current_app.config["PCAP_CONVERTER"] == "fields":
+            # Export limité aux champs lus par les modèles
+            json_output = os.path.join(json_folder, "combined.tsv")
+            fields = []
+            for field in Packets.tshark_fields():
+                fields += ["-e", field]
+            with open(json_output, "w") as tsv_file:
+                subprocess.run(
+                    [
+                        current_app.config["TSHARK_PATH"] or "tshark",
+                        "-r",
+                        combined_pcap,
+                        "-T",
+                        "fields",
+                        "-E",
+                        "header=y",
+                        "-E",
+                        "separator=/t",
+                        "-E",
+                        "occurrence=f",
+                    ]
+                    + fields,
+                    stdout=tsv_file,
+                    check=True,
+                )
+        else:
+            with open(json_output, "w") as json_file:
+                subprocess.run(
+                    [
+                        os.path.join(
+                            "/Applications/Wireshark.app/Contents/MacOS/tshark"
+                        ),
+                        "-r",
+                        combined_pcap,
+                        "-T",
+                        "json",
+                    ],
+                    stdout=json_file,
+                    check=True,
+                )
+
+        # L'export combiné vient d'être réécrit
+        capture_cache.invalidate(json_output)
 
         return redirect(
             url_for("views.packets", filename=os.path.basename(json_output))
@@ -218,7 +305,7 @@ def deadzone():
     file_path = os.path.join(data_dir, filename)
 
     try:
-        packets_collection = Packets(file_path)
+        packets_collection = load_packets(file_path)
     except FileNotFoundError:
         abort(404, description="File not found.")
     except ValueError as e:
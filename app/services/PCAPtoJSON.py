@@ -0,0 +1,555 @@
+import json
+import struct
+import subprocess
+import time
+
+from app.services.json_stream import iter_array_items
+
+# Nombres magiques des formats de capture
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000),  # pcap, microsecondes, little endian
+    b"\xa1\xb2\xc3\xd4": (">", 1000),  # pcap, microsecondes, big endian
+    b"\x4d\x3c\xb2\xa1": ("<", 1),  # pcap, nanosecondes, little endian
+    b"\xa1\xb2\x3c\x4d": (">", 1),  # pcap, nanosecondes, big endian
+}
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+LINKTYPE_ETHERNET = 1
+
+ETHERTYPE_GEONETWORKING = 0x8947
+ETHERTYPE_NAMES = {0x0800: "ip", 0x0806: "arp", 0x86DD: "ipv6"}
+
+# En-têtes GeoNetworking (ETSI EN 302 636-4-1)
+GN_NH_COMMON_HEADER = 1
+GN_CH_NH_BTP_B = 2
+GN_HT_GEOBROADCAST = 4
+GN_HT_TSB = 5
+GN_HST_SHB = 0
+
+# Messages ITS (ETSI TS 102 894-2)
+ITS_MESSAGE_DENM = 1
+ITS_MESSAGE_CAM = 2
+
+# Paquets que le lecteur natif ne sait pas décoder, à demander à tshark
+TSHARK_FALLBACK_FILTER = "!(btpb && its) || ieee1609dot2"
+
+MONTHS = (
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+
+
+class BitReader:
+    """A reader for the unaligned PER (UPER) encoding of the ITS messages
+
+    Attributes:
+        value (int): The payload as a big-endian integer
+        size (int): The number of bits of the payload
+        position (int): The number of bits already read
+    """
+
+    def __init__(self, data: bytes, position: int = 0):
+        """Create a reader over a payload
+
+        Args:
+            data (bytes): The payload
+            position (int): The number of bits to skip
+        """
+        self.value = int.from_bytes(data, "big")
+        self.size = len(data) * 8
+        self.position = position
+
+    def read(self, bits: int, minimum: int = 0):
+        """Read a constrained whole number
+
+        Args:
+            bits (int): The number of bits of the field
+            minimum (int): The lower bound of the constraint
+
+        Returns:
+            int: The value of the field
+
+        Raises:
+            ValueError: If the payload is too short
+        """
+        end = self.position + bits
+        if end > self.size:
+            raise ValueError("Truncated UPER payload")
+        raw = (self.value >> (self.size - end)) & ((1 << bits) - 1)
+        self.position = end
+        return raw + minimum
+
+    def flags(self, count: int):
+        """Read an extension bit or a bitmap of optional fields
+
+        Args:
+            count (int): The number of bits
+
+        Returns:
+            List[bool]: The flags
+        """
+        return [bool(self.read(1)) for _ in range(count)]
+
+
+def iter_records(file):
+    """Read the frames of a pcap or pcapng file
+
+    Args:
+        file (BinaryIO): The capture file opened in binary mode
+
+    Yields:
+        Tuple[int, int, int, int, bytes]: The link type, the timestamp in
+        seconds, the nanoseconds, the original length and the captured bytes
+
+    Raises:
+        ValueError: If the file is neither a pcap nor a pcapng file
+    """
+    magic = file.read(4)
+    if magic in PCAP_MAGIC:
+        yield from _iter_pcap(file, magic)
+    elif magic == struct.pack("<I", PCAPNG_SECTION_HEADER):
+        yield from _iter_pcapng(file, magic)
+    else:
+        raise ValueError("The file must be a pcap or pcapng file.")
+
+
+def _iter_pcap(file, magic):
+    """Read the frames of a pcap file, after its magic number"""
+    endian, scale = PCAP_MAGIC[magic]
+    header = file.read(20)
+    linktype = struct.unpack(endian + "HHiIII", header)[5] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+    while True:
+        data = file.read(16)
+        if len(data) < 16:
+            return
+        seconds, fraction, captured, original = record.unpack(data)
+        yield linktype, seconds, fraction * scale, original, file.read(captured)
+
+
+def _iter_pcapng(file, magic):
+    """Read the Enhanced and Simple Packet Blocks of a pcapng file"""
+    endian = "<"
+    interfaces = []  # (linktype, unités par seconde, décalage en secondes)
+    block_type = struct.unpack("<I", magic)[0]
+    while True:
+        length_bytes = file.read(4)
+        if len(length_bytes) < 4:
+            return
+        if block_type == PCAPNG_SECTION_HEADER:
+            byte_order = file.read(4)
+            magic_value = struct.unpack("<I", byte_order)[0]
+            endian = "<" if magic_value == PCAPNG_BYTE_ORDER_MAGIC else ">"
+            length = struct.unpack(endian + "I", length_bytes)[0]
+            body = byte_order + file.read(length - 12)
+            interfaces = []
+        else:
+            length = struct.unpack(endian + "I", length_bytes)[0]
+            body = file.read(length - 8)
+
+        if block_type == 1:  # Interface Description Block
+            linktype = struct.unpack(endian + "H", body[:2])[0]
+            resolution, offset = _interface_options(body[8:-4], endian)
+            interfaces.append((linktype, resolution, offset))
+        elif block_type == 6:  # Enhanced Packet Block
+            interface, high, low, captured, original = struct.unpack(
+                endian + "IIIII", body[:20]
+            )
+            linktype, resolution, offset = interfaces[interface]
+            units = (high << 32) | low
+            seconds, rest = divmod(units, resolution)
+            yield (
+                linktype,
+                seconds + offset,
+                rest * 1_000_000_000 // resolution,
+                original,
+                body[20 : 20 + captured],
+            )
+        elif block_type == 3:  # Simple Packet Block
+            original = struct.unpack(endian + "I", body[:4])[0]
+            linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+            yield linktype, 0, 0, original, body[4:-4][:original]
+
+        block_type_bytes = file.read(4)
+        if len(block_type_bytes) < 4:
+            return
+        block_type = struct.unpack(endian + "I", block_type_bytes)[0]
+
+
+def _interface_options(options, endian):
+    """Read the timestamp resolution and offset of an Interface Description Block
+
+    Returns:
+        Tuple[int, int]: The number of timestamp units per second and the
+        offset in seconds
+    """
+    resolution, offset = 1_000_000, 0
+    position = 0
+    while position + 4 <= len(options):
+        code, length = struct.unpack(endian + "HH", options[position : position + 4])
+        value = options[position + 4 : position + 4 + length]
+        if code == 0:
+            break
+        if code == 9 and value:  # if_tsresol
+            exponent = value[0] & 0x7F
+            resolution = 2**exponent if value[0] & 0x80 else 10**exponent
+        elif code == 14 and length == 8:  # if_tsoffset
+            offset = struct.unpack(endian + "q", value)[0]
+        position += 4 + length + (-length % 4)
+    return resolution, offset
+
+
+def format_mac(data: bytes):
+    """Format a MAC address like tshark
+
+    Args:
+        data (bytes): The 6 bytes of the address
+
+    Returns:
+        str: The address, e.g. 'ff:ff:ff:ff:ff:ff'
+    """
+    return ":".join(f"{byte:02x}" for byte in data)
+
+
+def format_frame_time(seconds: int, nanoseconds: int):
+    """Format a timestamp like the frame.time field of tshark (local time)
+
+    Args:
+        seconds (int): The seconds since the epoch
+        nanoseconds (int): The nanoseconds
+
+    Returns:
+        str: The time, e.g. 'Jun 12, 2024 10:15:23.123456000 CEST'
+    """
+    local = time.localtime(seconds)
+    return (
+        f"{MONTHS[local.tm_mon - 1]} {local.tm_mday:2d}, {local.tm_year} "
+        f"{local.tm_hour:02d}:{local.tm_min:02d}:{local.tm_sec:02d}.{nanoseconds:09d} "
+        f"{local.tm_zone}"
+    )
+
+
+def decode_frame(number, linktype, seconds, nanoseconds, original, data):
+    """Decode a frame into the layers of a tshark JSON export
+
+    Only the fields read by the model classes are produced.
+
+    Args:
+        number (int): The frame number
+        linktype (int): The link type of the capture
+        seconds (int): The timestamp in seconds
+        nanoseconds (int): The nanoseconds of the timestamp
+        original (int): The original length of the frame
+        data (bytes): The captured bytes
+
+    Returns:
+        Tuple[dict, bool]: The layers and True if tshark is needed to dissect the frame
+    """
+    frame = {
+        "frame.time": format_frame_time(seconds, nanoseconds),
+        "frame.time_epoch": f"{seconds}.{nanoseconds:09d}",
+        "frame.number": str(number),
+        "frame.len": str(original),
+        "frame.protocols": "eth:ethertype",
+    }
+    layers = {"frame": frame}
+    if linktype != LINKTYPE_ETHERNET or len(data) < 14:
+        frame["frame.protocols"] = ""
+        return layers, True
+
+    eth_type = struct.unpack(">H", data[12:14])[0]
+    layers["eth"] = {
+        "eth.dst": format_mac(data[0:6]),
+        "eth.src": format_mac(data[6:12]),
+        "eth.type": f"0x{eth_type:04x}",
+    }
+    if eth_type != ETHERTYPE_GEONETWORKING:
+        if eth_type in ETHERTYPE_NAMES:
+            frame["frame.protocols"] += ":" + ETHERTYPE_NAMES[eth_type]
+        return layers, True
+
+    frame["frame.protocols"] += ":gnw"
+    try:
+        complete = _decode_geonetworking(data, 14, layers)
+    except (ValueError, struct.error, IndexError):
+        return layers, True
+    if complete:
+        frame["frame.protocols"] += ":btpb:its"
+    return layers, not complete
+
+
+def _decode_geonetworking(data, offset, layers):
+    """Decode the GeoNetworking, BTP-B and ITS layers of a frame
+
+    Returns:
+        bool: False if the frame uses headers the reader does not support
+    """
+    version_nh, _, lifetime, rhl = data[offset : offset + 4]
+    if version_nh & 0x0F != GN_NH_COMMON_HEADER:
+        return False  # Paquet sécurisé ou en-tête inconnu
+    basic = {
+        "geonw.bh.version": str(version_nh >> 4),
+        "geonw.bh.nh": str(version_nh & 0x0F),
+        "geonw.bh.lt": f"0x{lifetime:02x}",
+        "geonw.bh.rhl": str(rhl),
+    }
+    offset += 4
+
+    nh, ht_hst, _, _, payload_length = struct.unpack(
+        ">BBBBH", data[offset : offset + 6]
+    )
+    header_type, header_subtype = ht_hst >> 4, ht_hst & 0x0F
+    common = {
+        "geonw.ch.nh": str(nh >> 4),
+        "geonw.ch.htype": f"0x{ht_hst:02x}",
+        "geonw.ch.plength": str(payload_length),
+    }
+    offset += 8
+    gnw = {"geonw.bh": basic, "geonw.ch": common}
+    layers["gnw"] = gnw
+
+    if header_type == GN_HT_GEOBROADCAST:
+        seq_num = struct.unpack(">H", data[offset : offset + 2])[0]
+        gnw["geonw.gbc"] = {
+            "geonw.seq_num": str(seq_num),
+            "geonw.src_pos_tree": _decode_position_vector(data, offset + 4),
+        }
+        offset += 44
+    elif header_type == GN_HT_TSB and header_subtype == GN_HST_SHB:
+        gnw["geonw.tsb"] = {
+            "geonw.src_pos_tree": _decode_position_vector(data, offset)
+        }
+        offset += 28
+    elif header_type == GN_HT_TSB:
+        seq_num = struct.unpack(">H", data[offset : offset + 2])[0]
+        gnw["geonw.tsb"] = {
+            "geonw.seq_num": str(seq_num),
+            "geonw.src_pos_tree": _decode_position_vector(data, offset + 4),
+        }
+        offset += 28
+    else:
+        return False
+
+    if nh >> 4 != GN_CH_NH_BTP_B:
+        return False
+    destination_port, port_info = struct.unpack(">HH", data[offset : offset + 4])
+    layers["btpb"] = {
+        "btpb.dstport": str(destination_port),
+        "btpb.dstportinf": str(port_info),
+    }
+    offset += 4
+
+    payload = data[offset:]
+    if len(payload) < 6:
+        return False
+    protocol_version, message_id, station_id = struct.unpack(">BBI", payload[:6])
+    its = {
+        "its.ItsPduHeader_element": {
+            "its.protocolVersion": str(protocol_version),
+            "its.messageId": str(message_id),
+            "its.stationId": str(station_id),
+        }
+    }
+    layers["its"] = its
+    try:
+        if message_id == ITS_MESSAGE_CAM:
+            its["cam.CamPayload_element"] = _decode_cam(BitReader(payload, 48))
+        elif message_id == ITS_MESSAGE_DENM:
+            its["denm.DenmPayload_element"] = _decode_denm(BitReader(payload, 48))
+    except ValueError:
+        pass  # Message tronqué : seul l'en-tête ITS est conservé
+    return True
+
+
+def _decode_position_vector(data, offset):
+    """Decode a GeoNetworking long position vector"""
+    _, _, latitude, longitude, speed = struct.unpack(
+        ">QIiiH", data[offset : offset + 22]
+    )
+    speed &= 0x7FFF
+    if speed & 0x4000:
+        speed -= 0x8000
+    return {
+        "geonw.src_pos.lat": str(latitude),
+        "geonw.src_pos.long": str(longitude),
+        "geonw.src_pos.speed": str(speed),
+    }
+
+
+def _decode_reference_position(reader, ellipse_names):
+    """Decode a ReferencePosition (latitude, longitude, confidence ellipse, altitude)"""
+    latitude = reader.read(31, -900000000)
+    longitude = reader.read(32, -1800000000)
+    semi_major = reader.read(12)
+    semi_minor = reader.read(12)
+    orientation = reader.read(12)
+    altitude = reader.read(20, -100000)
+    altitude_confidence = reader.read(4)
+    return {
+        "its.latitude": str(latitude),
+        "its.longitude": str(longitude),
+        "its.positionConfidenceEllipse_element": dict(
+            zip(ellipse_names, (str(semi_major), str(semi_minor), str(orientation)))
+        ),
+        "its.altitude_element": {
+            "its.altitudeValue": str(altitude),
+            "its.altitudeConfidence": str(altitude_confidence),
+        },
+    }
+
+
+def _decode_cam(reader):
+    """Decode the generation delta time and the basic container of a CAM"""
+    generation_delta_time = reader.read(16)
+    reader.flags(3)  # Extension et conteneurs optionnels de CamParameters
+    reader.flags(1)  # Extension du BasicContainer
+    station_type = reader.read(8)
+    reference_position = _decode_reference_position(
+        reader,
+        (
+            "its.semiMajorAxisLength",
+            "its.semiMinorAxisLength",
+            "its.semiMajorAxisOrientation",
+        ),
+    )
+    return {
+        "cam.generationDeltaTime": str(generation_delta_time),
+        "cam.camParameters_element": {
+            "cam.basicContainer_element": {
+                "its.stationType": str(station_type),
+                "its.referencePosition_element": reference_position,
+            }
+        },
+    }
+
+
+def _decode_denm(reader):
+    """Decode the management container of a DENM"""
+    reader.flags(3)  # Conteneurs optionnels situation, location et alacarte
+    _, termination, distance, direction, validity, interval = reader.flags(6)
+    originating_station_id = reader.read(32)
+    sequence_number = reader.read(16)
+    detection_time = reader.read(42)
+    reference_time = reader.read(42)
+    if termination:
+        reader.read(1)
+    event_position = _decode_reference_position(
+        reader,
+        (
+            "its.semiMajorConfidence",
+            "its.semiMinorConfidence",
+            "its.semiMajorOrientation",
+        ),
+    )
+    if distance:
+        reader.read(3)
+    if direction:
+        reader.read(2)
+    validity_duration = reader.read(17) if validity else 600
+    if interval:
+        reader.read(14, 1)
+    station_type = reader.read(8)
+    return {
+        "denm.management_element": {
+            "denm.actionId_element": {
+                "its.originatingStationId": str(originating_station_id),
+                "its.sequenceNumber": str(sequence_number),
+            },
+            "denm.detectionTime": str(detection_time),
+            "denm.referenceTime": str(reference_time),
+            "denm.eventPosition_element": event_position,
+            "denm.validityDuration": str(validity_duration),
+            "denm.stationType": str(station_type),
+        }
+    }
+
+
+def iter_layers(pcap_path: str, tshark_path: str = None):
+    """Read a capture and yield the layers of each frame, as in a tshark JSON export
+
+    The frames the native reader cannot dissect (other protocols, secured
+    GeoNetworking packets...) are dissected by tshark when ``tshark_path`` is
+    given; tshark then only processes those frames. Otherwise they are kept
+    with their frame and Ethernet layers only.
+
+    Args:
+        pcap_path (str): The path to the pcap or pcapng file
+        tshark_path (str): The path to tshark, or None to never call it
+
+    Yields:
+        dict: The layers of the next frame
+    """
+    fallback = _iter_tshark(pcap_path, tshark_path) if tshark_path else iter(())
+    pending = next(fallback, None)
+
+    with open(pcap_path, "rb") as file:
+        for number, record in enumerate(iter_records(file), start=1):
+            layers, needs_tshark = decode_frame(number, *record)
+            # Les paquets tshark arrivent dans l'ordre des trames
+            while pending is not None and _frame_number(pending) < number:
+                pending = next(fallback, None)
+            if pending is not None and _frame_number(pending) == number:
+                if needs_tshark:
+                    layers = pending
+                pending = next(fallback, None)
+            yield layers
+
+
+def _frame_number(layers):
+    """Return the frame number of the layers of a frame"""
+    return int(layers["frame"]["frame.number"])
+
+
+def _iter_tshark(pcap_path, tshark_path):
+    """Dissect with tshark the frames the native reader does not support
+
+    Yields:
+        dict: The layers of each frame matching TSHARK_FALLBACK_FILTER
+    """
+    process = subprocess.Popen(
+        [tshark_path, "-r", pcap_path, "-T", "json", "-Y", TSHARK_FALLBACK_FILTER],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        for _, packet_data in iter_array_items(process.stdout):
+            yield packet_data["_source"]["layers"]
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def convert(pcap_path: str, json_path: str, tshark_path: str = None):
+    """Convert a capture into a JSON file readable by Packets
+
+    Args:
+        pcap_path (str): The path to the pcap or pcapng file
+        json_path (str): The path to the JSON file to write
+        tshark_path (str): The path to tshark for the unsupported frames, or None
+
+    Returns:
+        int: The number of frames written
+    """
+    index = "packets-" + time.strftime("%Y-%m-%d")  # Comme tshark
+    count = 0
+    with open(json_path, "w") as output:
+        output.write("[\n")
+        for layers in iter_layers(pcap_path, tshark_path):
+            if count:
+                output.write(",\n")
+            packet = {"_index": index, "_type": "doc", "_score": None}
+            packet["_source"] = {"layers": layers}
+            output.write(json.dumps(packet))  # dumps utilise l'encodeur C
+            count += 1
+        output.write("\n]\n")
+    return count
@@ -0,0 +1,387 @@
+import mmap
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+# Budget mémoire par défaut du cache (512 Mio)
+DEFAULT_MAX_BYTES = 512 << 20
+
+# Nombre de paquets mesurés pour estimer la taille d'une collection
+SIZE_SAMPLE = 256
+
+# Parties de la taille d'une collection : les paquets, puis les structures
+# dérivées (clés de Packets.derived_structures)
+PACKETS = "packets"
+TABLE_CACHE = "table_cache"
+
+# Objets partagés par tout le processus, jamais comptés
+_NOT_COUNTED = (type, types.FunctionType, types.MethodType, types.ModuleType, mmap.mmap)
+
+
+class _Flight:
+    """A load in progress, shared by the requests waiting for the same capture"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CaptureCache:
+    """A process-wide LRU cache of loaded packet collections
+
+    The entries are keyed by (path, size, mtime), so a capture rewritten on
+    disk is never served from the cache. The accounted size of an entry is an
+    estimate of the memory held by its packets and by the structures derived
+    from them (indexes, rollups, cached query results...). These structures
+    are built on demand, so an entry is measured again each time one of them
+    is built, and the least recently used entries are evicted when the total
+    exceeds ``max_bytes``.
+
+    Loads are single-flight: while a capture is being loaded, the other
+    requests for the same key wait for that load instead of starting their
+    own. Different captures are loaded concurrently.
+
+    Attributes:
+        max_bytes (int): The memory budget of the cache, in bytes
+        hits (int): The number of lookups served from the cache
+        misses (int): The number of lookups that loaded the capture
+        evictions (int): The number of entries evicted to respect the budget
+        waits (int): The number of lookups that waited for a load in progress
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Create an empty cache
+
+        Args:
+            max_bytes (int): The memory budget of the cache, in bytes
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.waits = 0
+        self._entries = OrderedDict()  # clé -> (collection, taille par partie)
+        self._size = 0
+        self._flights = {}  # clé -> _Flight des chargements en cours
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the cache from the Flask configuration
+
+        Args:
+            app (Flask): The application, CAPTURE_CACHE_MAX_BYTES is read from
+                its configuration
+        """
+        self.max_bytes = app.config.get("CAPTURE_CACHE_MAX_BYTES", self.max_bytes)
+        app.extensions["capture_cache"] = self
+
+    @staticmethod
+    def key(file_path: str):
+        """Get the cache key of a capture
+
+        Args:
+            file_path (str): The path to the capture
+
+        Returns:
+            Tuple[str, int, int]: The absolute path, the size and the mtime (ns)
+
+        Raises:
+            FileNotFoundError: If the file is not found
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"The file {file_path} was not found.")
+        return path, stat.st_size, stat.st_mtime_ns
+
+    def get(self, file_path: str, loader):
+        """Get the collection of a capture, loading it on a miss
+
+        If the capture is already being loaded by another thread, wait for
+        that load. An error raised by the loader is raised in every waiting
+        thread, and the next lookup tries to load the capture again.
+
+        Args:
+            file_path (str): The path to the capture
+            loader (Callable[[], Packets]): Loads the collection, called on a miss
+
+        Returns:
+            Packets: The collection
+
+        Raises:
+            FileNotFoundError: If the file is not found
+        """
+        key = self.key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = loader()
+            self.put(key, flight.result)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def put(self, key, packets):
+        """Store a collection, evicting the least recently used entries
+
+        The previous versions of the same capture are dropped. A collection
+        larger than the whole budget is not stored. The collection of a stored
+        entry is measured again when it builds a derived structure.
+
+        Args:
+            key (Tuple[str, int, int]): The key returned by ``key``
+            packets (Packets): The collection
+        """
+        parts = measure(packets)
+        with self._lock:
+            self._discard(lambda other: other[0] == key[0])
+            if sum(parts.values()) > self.max_bytes:
+                return
+            self._entries[key] = (packets, parts)
+            self._size += sum(parts.values())
+            packets.on_build = lambda name: self._remeasure(key, packets, name)
+            self._evict()
+
+    def _remeasure(self, key, packets, name):
+        """Update the size of an entry after a derived structure is built
+
+        Args:
+            key (Tuple[str, int, int]): The key of the entry
+            packets (Packets): The collection of the entry
+            name (str): The structure, a key of ``Packets.derived_structures``
+        """
+        structures = packets.derived_structures()
+        exclude = _shared_ids(packets)
+        sizes = {
+            part: deep_size(structures[part], exclude)
+            for part in (name, TABLE_CACHE)
+            if part in structures
+        }
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not packets:
+                return
+            parts = entry[1]
+            for part, size in sizes.items():
+                self._size += size - parts.get(part, 0)
+                parts[part] = size
+            self._evict()
+
+    def _evict(self):
+        """Evict the least recently used entries over the budget, the lock must
+        be held
+        """
+        while self._size > self.max_bytes and self._entries:
+            _, (packets, parts) = self._entries.popitem(last=False)
+            packets.on_build = None
+            self._size -= sum(parts.values())
+            self.evictions += 1
+
+    def invalidate(self, file_path: str = None):
+        """Drop the cached versions of a capture
+
+        Args:
+            file_path (str): The path to the capture, None to clear the cache
+        """
+        path = os.path.abspath(file_path) if file_path else None
+        with self._lock:
+            self._discard(lambda key: path is None or key[0] == path)
+
+    def stats(self):
+        """Get the counters of the cache
+
+        Returns:
+            dict: The hits, misses, evictions, waits, number of entries and
+            loads in progress, accounted size and budget of the cache
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "waits": self.waits,
+                "loading": len(self._flights),
+                "entries": len(self._entries),
+                "size": self._size,
+                "max_bytes": self.max_bytes,
+                "sizes": {
+                    key[0]: sum(parts.values())
+                    for key, (_, parts) in self._entries.items()
+                },
+            }
+
+    def _discard(self, predicate):
+        """Remove the entries whose key matches, the lock must be held
+
+        Args:
+            predicate (Callable[[tuple], bool]): Selects the keys to remove
+        """
+        for key in [key for key in self._entries if predicate(key)]:
+            packets, parts = self._entries.pop(key)
+            packets.on_build = None
+            self._size -= sum(parts.values())
+
+
+def estimate_size(packets):
+    """Estimate the memory held by a collection of packets
+
+    Args:
+        packets (Packets): The collection
+
+    Returns:
+        int: The estimated size, in bytes, see ``measure``
+    """
+    return sum(measure(packets).values())
+
+
+def measure(packets):
+    """Estimate the memory held by a collection, by part
+
+    The packets are measured from a sample (object and numeric values),
+    extrapolated to the whole collection as if every packet was built: a
+    collection read from the sidecar only builds them on demand, but may
+    build them all later. The values of the dictionary-encoded columns are
+    shared by the packets and counted once; among the other strings of the
+    sample, those seen once are taken as specific to their packet and
+    extrapolated, the repeated ones (interned) are counted once. The columns
+    of the table are counted unless they are memory-mapped, since mapped pages
+    live in the page cache. The derived structures are measured with
+    ``deep_size``.
+
+    Args:
+        packets (Packets): The collection
+
+    Returns:
+        Dict[str, int]: The estimated size in bytes of the packets (PACKETS)
+        and of each derived structure, by key of ``Packets.derived_structures``
+    """
+    table = packets.table
+    count = len(table)
+    size = sys.getsizeof([]) + 8 * count
+    for column in [table.types, *table.columns.values()]:
+        size += deep_size(column, set())
+    shared = set()
+    size += deep_size(table.dictionaries, shared)
+
+    if count:
+        step = max(count // SIZE_SAMPLE, 1)
+        sample = table.materialize(np.arange(0, count, step)[:SIZE_SAMPLE])
+        sample_size = 0
+        strings = {}  # id -> (taille, occurrences)
+        for packet in sample:
+            sample_size += sys.getsizeof(packet)
+            for value in packet.attributes().values():
+                if isinstance(value, str):
+                    if id(value) not in shared:
+                        value_size, seen = strings.get(id(value), (0, 0))
+                        strings[id(value)] = sys.getsizeof(value), seen + 1
+                else:
+                    sample_size += sys.getsizeof(value)
+        for value_size, seen in strings.values():
+            if seen == 1:
+                sample_size += value_size
+            else:
+                size += value_size
+        size += sample_size * count // len(sample)
+
+    parts = {PACKETS: size}
+    exclude = _shared_ids(packets)
+    for name, structure in packets.derived_structures().items():
+        parts[name] = deep_size(structure, exclude)
+    return parts
+
+
+def deep_size(value, seen):
+    """Measure the memory held by an object and the objects it references
+
+    NumPy arrays count their data, unless it is memory-mapped. Classes,
+    functions and modules are not counted.
+
+    Args:
+        value: The object
+        seen (Set[int]): The ids of the objects already counted or to leave
+            out, updated
+
+    Returns:
+        int: The size, in bytes
+    """
+    if id(value) in seen or isinstance(value, _NOT_COUNTED):
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        if isinstance(value, np.memmap):
+            return 0
+        # Une vue ne possède pas ses données : on compte le tableau d'origine
+        size = sys.getsizeof(value)
+        if value.base is not None:
+            size += deep_size(value.base, seen)
+        if value.dtype == object:
+            size += sum(deep_size(item, seen) for item in value.flat)
+        return size
+
+    size = sys.getsizeof(value)
+    # Copies : les caches des structures peuvent grandir pendant la mesure
+    if isinstance(value, dict):
+        size += sum(
+            deep_size(key, seen) + deep_size(item, seen)
+            for key, item in list(value.items())
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in list(value))
+    elif not isinstance(value, (str, bytes, int, float)):
+        if hasattr(value, "__dict__"):
+            size += deep_size(vars(value), seen)
+        for cls in type(value).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if hasattr(value, slot):
+                    size += deep_size(getattr(value, slot), seen)
+    return size
+
+
+def _shared_ids(packets):
+    """Get the ids of the objects measured with the packets
+
+    The derived structures reference the table and its columns, which are
+    counted in the size of the packets.
+
+    Args:
+        packets (Packets): The collection
+
+    Returns:
+        Set[int]: The ids, to leave out of ``deep_size``
+    """
+    ids = {id(packets), id(packets._packets)}
+    table = packets._table
+    if table is not None:
+        ids.add(id(table))
+        ids.update(id(column) for column in [table.types, *table.columns.values()])
+    return ids
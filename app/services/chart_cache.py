@@ -0,0 +1,180 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Nombre de réponses gardées par défaut
+DEFAULT_MAX_ENTRIES = 256
+
+# Nombre de graphiques calculés en parallèle par défaut
+DEFAULT_WORKERS = 4
+
+
+class ChartCache:
+    """A process-wide LRU cache of the JSON payloads of the charts
+
+    An entry is keyed by the cache key of its capture (path, size, mtime),
+    the name of the chart and the parameters it depends on, so a capture
+    rewritten on disk is never served from the cache. The ETag of an entry
+    is derived from its key only: a request revalidating a payload is
+    answered without loading the capture.
+
+    Computations are single-flight, like the loads of the capture cache.
+    ``prefetch`` starts the computation of several charts in a thread pool,
+    so they run concurrently while the page is being displayed, and the
+    requests for these charts wait for them.
+
+    Attributes:
+        max_entries (int): The number of payloads kept
+        workers (int): The number of charts computed at the same time
+        hits (int): The number of lookups served from the cache
+        misses (int): The number of lookups that computed the payload
+        waits (int): The number of lookups that waited for a computation
+    """
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, workers: int = DEFAULT_WORKERS
+    ):
+        """Create an empty cache
+
+        Args:
+            max_entries (int): The number of payloads kept
+            workers (int): The number of charts computed at the same time
+        """
+        self.max_entries = max_entries
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self._entries = OrderedDict()  # clé -> contenu JSON
+        self._flights = {}  # clé -> Future des calculs en cours
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the cache from the Flask configuration
+
+        Args:
+            app (Flask): The application, CHART_CACHE_ENTRIES and CHART_WORKERS
+                are read from its configuration
+        """
+        self.max_entries = app.config.get("CHART_CACHE_ENTRIES", self.max_entries)
+        self.workers = app.config.get("CHART_WORKERS", self.workers)
+        app.extensions["chart_cache"] = self
+
+    @staticmethod
+    def etag(key):
+        """Get the ETag of an entry
+
+        Args:
+            key (tuple): The key of the entry
+
+        Returns:
+            str: The ETag, without quotes
+        """
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key, compute):
+        """Get a payload, computing it on a miss
+
+        If the payload is already being computed, by a request or by
+        ``prefetch``, wait for that computation. An error raised by the
+        computation is raised in every waiting thread, and the next lookup
+        computes the payload again.
+
+        Args:
+            key (tuple): The key of the entry
+            compute (Callable[[], bytes]): Computes the payload, called on a miss
+
+        Returns:
+            bytes: The payload
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if leader:
+            self._run(key, flight, compute)
+        return flight.result()
+
+    def prefetch(self, jobs):
+        """Start computing the payloads that are not cached yet
+
+        Args:
+            jobs (Dict[tuple, Callable[[], bytes]]): The computation of each
+                key
+        """
+        started = []
+        with self._lock:
+            for key, compute in jobs.items():
+                if key in self._entries or key in self._flights:
+                    continue
+                flight = self._flights[key] = Future()
+                started.append((key, flight, compute))
+            if started and self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="charts"
+                )
+        for key, flight, compute in started:
+            self._executor.submit(self._run, key, flight, compute)
+
+    def invalidate(self, file_path: str = None):
+        """Drop the payloads of a capture
+
+        Args:
+            file_path (str): The path to the capture, None to clear the cache
+        """
+        path = os.path.abspath(file_path) if file_path else None
+        with self._lock:
+            for key in list(self._entries):
+                if path is None or key[0][0] == path:
+                    del self._entries[key]
+
+    def stats(self):
+        """Get the counters of the cache
+
+        Returns:
+            dict: The hits, misses, waits, number of entries and computations
+            in progress of the cache
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "computing": len(self._flights),
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _run(self, key, flight, compute):
+        """Compute a payload and store it
+
+        Args:
+            key (tuple): The key of the entry
+            flight (Future): Receives the payload or the error
+            compute (Callable[[], bytes]): Computes the payload
+        """
+        try:
+            payload = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._flights[key]
+            flight.set_exception(e)
+            return
+        with self._lock:
+            del self._flights[key]
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        flight.set_result(payload)
@@ -0,0 +1,113 @@
+from app.extensions import capture_cache, chart_cache
+from app.models.Packets import Packets
+
+
+def _method(name):
+    """Get a chart returning the result of a method of Packets
+
+    Args:
+        name (str): The method, called without arguments
+
+    Returns:
+        Callable[[Packets, Mapping], Any]: The chart
+    """
+    return lambda packets, config: getattr(packets, name)()
+
+
+def _time_series(packets, config):
+    return packets.time_series_data(
+        max_points=config["CHART_MAX_POINTS"], method=config["CHART_DOWNSAMPLING"]
+    )
+
+
+def _source_traffic(packets, config):
+    return {"src": packets.get_src_traffic(), "dst": packets.get_dst_traffic()}
+
+
+# Données des graphiques du tableau de bord, calculées hors des gabarits (la
+# page s'affiche avant tout calcul) : fonction (collection, configuration)
+CHARTS = {
+    "statistics": _method("statistics"),
+    "time-series": _time_series,
+    "mac-traffic": _method("get_traffic_details"),
+    "source-traffic": _source_traffic,
+    "furthest-distance": _method("get_furthest_station_distance"),
+    "distance-distribution": _method("get_distance_distribution"),
+    "repetitions": _method("get_repetition_distribution"),
+    "receptions": _method("get_reception_distribution"),
+    "hops": _method("get_hops_distribution"),
+}
+
+# Paramètres de configuration dont dépendent les données de chaque graphique
+PARAMETERS = {
+    "time-series": ("CHART_MAX_POINTS", "CHART_DOWNSAMPLING"),
+}
+
+
+def chart_key(file_path, name, config):
+    """Get the cache key of the data of a chart
+
+    Args:
+        file_path (str): The path to the capture
+        name (str): The chart, a key of CHARTS
+        config (Mapping): The application configuration
+
+    Returns:
+        tuple: The key, changing with the capture and the chart parameters
+
+    Raises:
+        FileNotFoundError: If the file is not found
+    """
+    parameters = tuple(config[parameter] for parameter in PARAMETERS.get(name, ()))
+    return (capture_cache.key(file_path), name, parameters)
+
+
+def chart_payload(file_path, name, config, json_provider):
+    """Get a function computing the JSON payload of a chart
+
+    The function does not use the request context, so it can run in the
+    thread pool of the chart cache.
+
+    Args:
+        file_path (str): The path to the capture
+        name (str): The chart, a key of CHARTS
+        config (Mapping): The application configuration
+        json_provider (JSONProvider): Serializes the data, like ``tojson``
+
+    Returns:
+        Callable[[], bytes]: The function
+    """
+    chart = CHARTS[name]
+    workers = config["PACKETS_WORKERS"]
+
+    def compute():
+        packets = capture_cache.get(
+            file_path, lambda: Packets(file_path, workers=workers)
+        )
+        return json_provider.dumps(chart(packets, config)).encode("utf-8")
+
+    return compute
+
+
+def prefetch_charts(file_path, config, json_provider):
+    """Start computing the data of every chart of a capture
+
+    The charts are computed concurrently in the thread pool of the chart
+    cache; the charts already cached or being computed are skipped.
+
+    Args:
+        file_path (str): The path to the capture
+        config (Mapping): The application configuration
+        json_provider (JSONProvider): Serializes the data
+
+    Raises:
+        FileNotFoundError: If the file is not found
+    """
+    chart_cache.prefetch(
+        {
+            chart_key(file_path, name, config): chart_payload(
+                file_path, name, config, json_provider
+            )
+            for name in CHARTS
+        }
+    )
@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import zlib
+
+from app.models.PacketTable import PACKET_TYPES
+
+# Formats d'export : type MIME et extension du fichier
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+# Niveau de compression gzip (6 : compromis de zlib entre débit et taille)
+GZIP_LEVEL = 6
+# Taille des morceaux compressés envoyés au client (en octets)
+GZIP_CHUNK_SIZE = 64 << 10
+# Encodeur JSON compact, partagé par toutes les lignes
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def columns(packet_type):
+    """Get the keys of to_dict of a packet class and its subclasses
+
+    Args:
+        packet_type (type): The packet class
+
+    Returns:
+        List[str]: The keys, base class first
+    """
+    keys = []
+    for table_type in PACKET_TYPES:
+        if not issubclass(table_type, packet_type):
+            continue
+        for name in table_type.attribute_names():
+            if name == "utc_offset":
+                # Déjà appliqué à « time »
+                continue
+            key = "time" if name == "timestamp" else name
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+def project(packet, fields):
+    """Convert a packet to a dictionary restricted to some fields
+
+    Args:
+        packet (Packet): The packet
+        fields (List[str]): The keys to keep, None for every key; the keys
+            missing from the class of the packet are left out
+
+    Returns:
+        dict: The packet as a dictionary
+    """
+    packet_dict = packet.to_dict()
+    if fields is None:
+        return packet_dict
+    return {field: packet_dict[field] for field in fields if field in packet_dict}
+
+
+def iter_ndjson(batches, fields=None):
+    """Encode packets as JSON lines, one chunk per batch
+
+    Args:
+        batches (Iterable[List[Packet]]): The packets, batch by batch
+        fields (List[str]): The keys of to_dict to keep, None for every key
+
+    Yields:
+        bytes: The lines of a batch
+    """
+    for batch in batches:
+        lines = [_JSON_ENCODER.encode(project(packet, fields)) for packet in batch]
+        if lines:
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+
+
+def iter_csv(batches, fields):
+    """Encode packets as CSV, one chunk per batch
+
+    Args:
+        batches (Iterable[List[Packet]]): The packets, batch by batch
+        fields (List[str]): The keys of to_dict, one column each; a key missing
+            from the class of a packet gives an empty cell
+
+    Yields:
+        bytes: The header, then the rows of a batch
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(
+        buffer, fields, restval="", extrasaction="ignore", lineterminator="\n"
+    )
+    writer.writeheader()
+    yield buffer.getvalue().encode("utf-8")
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(packet.to_dict() for packet in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks, level: int = GZIP_LEVEL):
+    """Compress a stream in the gzip format, as it is produced
+
+    Args:
+        chunks (Iterable[bytes]): The stream
+        level (int): The compression level, from 1 (fastest) to 9
+
+    Yields:
+        bytes: The compressed stream, in chunks of about GZIP_CHUNK_SIZE bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = []
+    size = 0
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            pending.append(compressed)
+            size += len(compressed)
+        if size >= GZIP_CHUNK_SIZE:
+            yield b"".join(pending)
+            pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b"".join(pending)
@@ -0,0 +1,228 @@
+import codecs
+import json
+import os
+import re
+
+# Taille des blocs lus sur le disque (1 Mio)
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+
+# Début d'un paquet dans un export tshark -T json : {"_index": ...
+_TSHARK_ITEM = re.compile(rb'\{\s*"_index"\s*:')
+
+
+def iter_array_items(file, chunk_size: int = CHUNK_SIZE, inside: bool = False):
+    """Iterate over the items of a top-level JSON array without loading the whole file.
+
+    The file is read in blocks of ``chunk_size`` bytes and each element of the
+    array is decoded on its own with ``json.JSONDecoder.raw_decode``, so peak
+    memory is bounded by the largest element plus one block.
+
+    Args:
+        file (BinaryIO): A file object opened in binary mode, positioned at the
+            array. Pipes are accepted, offsets then count from the first byte read.
+        chunk_size (int): The number of bytes read at a time
+        inside (bool): True if the file is positioned at the start of an element
+            of the array rather than at its opening bracket
+
+    Yields:
+        Tuple[int, Any]: The byte offset of the item in the file and the decoded item
+
+    Raises:
+        json.JSONDecodeError: If the content is not a valid JSON array
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    buffer = ""
+    pos = 0  # Position courante dans le buffer (en caractères)
+    mark = 0  # Dernière position du buffer dont l'offset en octets est connu
+    mark_offset = file.tell() if file.seekable() else 0
+    ascii_only = True
+    eof = False
+
+    def byte_offset(index):
+        """Return the offset in the file of the character at ``index`` in the buffer."""
+        nonlocal mark, mark_offset
+        if ascii_only:
+            return mark_offset + index - mark
+        mark_offset += len(buffer[mark:index].encode("utf-8"))
+        mark = index
+        return mark_offset
+
+    def fill(size):
+        """Append the next block of the file to the buffer, dropping consumed text."""
+        nonlocal buffer, pos, mark, mark_offset, ascii_only, eof
+        mark_offset = byte_offset(pos)
+        data = file.read(size)
+        eof = not data
+        buffer = buffer[pos:] + utf8.decode(data, final=eof)
+        ascii_only = buffer.isascii()
+        pos = mark = 0
+
+    def skip(separators):
+        """Skip whitespace and the given separators, reading more data if needed."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in separators:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill(chunk_size)
+
+    if not inside:
+        skip(_WHITESPACE)
+        if pos >= len(buffer) or buffer[pos] != "[":
+            raise json.JSONDecodeError("Expecting '['", buffer, pos)
+        pos += 1
+
+    expect_item = True
+    while True:
+        skip(_WHITESPACE)
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        if not expect_item:
+            if buffer[pos] != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            skip(_WHITESPACE)
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Élément incomplet : lire davantage (taille croissante pour les gros éléments)
+                fill(max(chunk_size, len(buffer)))
+                continue
+            if end == len(buffer) and not eof:
+                # Un nombre peut être tronqué en fin de buffer, on relit pour en être sûr
+                fill(chunk_size)
+                continue
+            break
+
+        yield byte_offset(pos), item
+        pos = end
+        expect_item = False
+
+
+def split_array(file_path: str, parts: int):
+    """Split a tshark JSON export into byte ranges that each start on a packet.
+
+    The split points are spread evenly over the file, then moved forward to the
+    next ``{"_index": ...`` object preceded by a comma. The ranges must be
+    checked by the caller: ``iter_array_items(..., inside=True)`` started at the
+    beginning of a range has to stop exactly at the beginning of the next one.
+
+    Args:
+        file_path (str): The path to the JSON file
+        parts (int): The desired number of ranges
+
+    Returns:
+        List[Tuple[int, int]]: The (start, end) byte ranges, in file order
+    """
+    size = os.path.getsize(file_path)
+    starts = []
+    with open(file_path, "rb") as file:
+        first = _find_item(file, 0, first=True)
+        if first is None:
+            return []
+        starts.append(first)
+        for i in range(1, parts):
+            start = _find_item(file, max(size * i // parts, starts[-1] + 1))
+            if start is None:
+                break
+            if start > starts[-1]:
+                starts.append(start)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def item_offsets(file_path: str):
+    """Find the offset of every packet object of a tshark JSON export.
+
+    The file is scanned block by block for the ``{"_index": ...`` objects
+    preceded by the opening bracket or a comma, like the split points of
+    ``split_array``, without decoding the packets. The offsets must be checked
+    when the packets are read: ``iter_array_items`` yields the offset of each
+    item it decodes.
+
+    Args:
+        file_path (str): The path to the JSON file
+
+    Returns:
+        List[int]: The offsets, in file order
+    """
+    offsets = []
+    with open(file_path, "rb") as file:
+        first = _find_item(file, 0, first=True)
+        if first is None:
+            return offsets
+        offsets.append(first)
+        position = first + 1
+        while True:
+            file.seek(position)
+            block = file.read(CHUNK_SIZE)
+            if not block:
+                return offsets
+            for match in _TSHARK_ITEM.finditer(block):
+                offset = position + match.start()
+                if offset <= offsets[-1]:
+                    continue
+                # Seuls quelques blancs séparent la virgule de l'objet
+                before = block[max(match.start() - 64, 0) : match.start()]
+                before = before.rstrip()[-1:] or _previous_char(file, offset)
+                if before == b",":
+                    offsets.append(offset)
+            # Recouvrement pour ne pas manquer un motif à cheval sur deux blocs
+            position += max(len(block) - 64, 1)
+
+
+def _find_item(file, position, first=False):
+    """Find the offset of the first tshark packet object at or after ``position``.
+
+    Args:
+        file (BinaryIO): The JSON file opened in binary mode
+        position (int): The offset to search from
+        first (bool): Whether the object is the first element of the array
+
+    Returns:
+        int: The offset of the object, or None if there is none
+    """
+    separator = b"[" if first else b","
+    while True:
+        file.seek(position)
+        block = file.read(CHUNK_SIZE)
+        if not block:
+            return None
+        for match in _TSHARK_ITEM.finditer(block):
+            before = block[: match.start()].rstrip()[-1:]
+            if not before:
+                before = _previous_char(file, position + match.start())
+            if before == separator:
+                return position + match.start()
+        # Recouvrement pour ne pas manquer un motif à cheval sur deux blocs
+        position += max(len(block) - 64, 1)
+
+
+def _previous_char(file, position):
+    """Return the last non-whitespace byte before ``position``.
+
+    Args:
+        file (BinaryIO): The JSON file opened in binary mode
+        position (int): The offset to look back from
+
+    Returns:
+        bytes: The byte found, or an empty bytes object at the start of the file
+    """
+    while position > 0:
+        start = max(position - 256, 0)
+        file.seek(start)
+        block = file.read(position - start).rstrip()
+        if block:
+            return block[-1:]
+        position = start
+    return b""
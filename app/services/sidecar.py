@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from app.models.PacketTable import PacketTable
+
+# Version du format, à incrémenter quand les colonnes ou leur encodage changent
+FORMAT_VERSION = 4
+
+# Taille des blocs du fichier source utilisés pour l'empreinte
+FINGERPRINT_BLOCK = 1 << 20
+
+
+def sidecar_path(file_path: str):
+    """Get the path of the columnar sidecar of a capture export
+
+    Args:
+        file_path (str): The path to the export (.json or .tsv)
+
+    Returns:
+        str: The path of the sidecar directory, next to the export
+    """
+    return file_path + ".cols"
+
+
+def offsets_path(file_path: str):
+    """Get the path of the offset index of a capture export
+
+    Args:
+        file_path (str): The path to the export (.json or .tsv)
+
+    Returns:
+        str: The path of the index directory, next to the export
+    """
+    return file_path + ".offsets"
+
+
+def fingerprint(file_path: str):
+    """Compute the key identifying the content of a capture export
+
+    The key combines the size, the modification time and a hash of the first,
+    middle and last blocks of the file, so it is computed in constant time.
+
+    Args:
+        file_path (str): The path to the export
+
+    Returns:
+        dict: The fingerprint
+    """
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file:
+        for position in (0, stat.st_size // 2, stat.st_size - FINGERPRINT_BLOCK):
+            file.seek(max(position, 0))
+            digest.update(file.read(FINGERPRINT_BLOCK))
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest.hexdigest(),
+    }
+
+
+def _write_directory(target: str, write):
+    """Write a sidecar directory atomically
+
+    The directory is written under a temporary name and renamed, so readers
+    never see a partial sidecar.
+
+    Args:
+        target (str): The path of the sidecar directory
+        write (Callable[[str], None]): Writes the files into a directory
+    """
+    directory = None
+    try:
+        directory = tempfile.mkdtemp(
+            prefix=os.path.basename(target) + ".", dir=os.path.dirname(target)
+        )
+        write(directory)
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        os.rename(directory, target)
+    except OSError as e:
+        # Un autre processus a pu écrire le sidecar en même temps
+        print(f"Warning: Could not write the sidecar {target}: {e}")
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _read_meta(directory: str, file_path: str):
+    """Read the metadata of a sidecar directory if it is up to date
+
+    Args:
+        directory (str): The path of the sidecar directory
+        file_path (str): The path to the export
+
+    Returns:
+        dict: The metadata, or None if the sidecar is missing or stale
+    """
+    try:
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if (
+        meta.get("version") != FORMAT_VERSION
+        or meta.get("fingerprint") != fingerprint(file_path)
+    ):
+        return None
+    return meta
+
+
+def save_table(file_path: str, table: PacketTable):
+    """Write the columnar sidecar of a capture export
+
+    Each column is written as a .npy file, the dictionaries and the schema in
+    meta.json.
+
+    Args:
+        file_path (str): The path to the export
+        table (PacketTable): The packets of the export
+    """
+
+    def write(directory):
+        np.save(os.path.join(directory, "types.npy"), table.types)
+        for index, (name, column) in enumerate(table.columns.items()):
+            np.save(os.path.join(directory, f"column_{index}.npy"), column)
+        meta = {
+            "version": FORMAT_VERSION,
+            "fingerprint": fingerprint(file_path),
+            "rows": len(table),
+            "columns": list(table.columns),
+            "encodings": table.encodings,
+            "dictionaries": table.dictionaries,
+            "attributes": table.attributes,
+        }
+        with open(os.path.join(directory, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+    _write_directory(sidecar_path(file_path), write)
+
+
+def load_table(file_path: str):
+    """Memory-map the columnar sidecar of a capture export
+
+    The columns are opened with ``np.load(mmap_mode="r")``: they are read
+    lazily from the OS page cache, which is shared between processes.
+
+    Args:
+        file_path (str): The path to the export
+
+    Returns:
+        PacketTable: The table, or None if there is no up-to-date sidecar
+    """
+    directory = sidecar_path(file_path)
+    meta = _read_meta(directory, file_path)
+    if meta is None:
+        return None
+
+    try:
+        columns = {
+            name: np.load(
+                os.path.join(directory, f"column_{index}.npy"), mmap_mode="r"
+            )
+            for index, name in enumerate(meta["columns"])
+        }
+        types = np.load(os.path.join(directory, "types.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return PacketTable(
+        types,
+        columns,
+        meta["encodings"],
+        meta["dictionaries"],
+        meta["attributes"],
+    )
+
+
+def save_offsets(file_path: str, offsets):
+    """Write the offset index of a capture export
+
+    The offsets are written as a uint64 .npy file, 8 bytes per packet.
+
+    Args:
+        file_path (str): The path to the export
+        offsets (Sequence[int]): The byte offset of each packet, in file order
+    """
+
+    def write(directory):
+        np.save(
+            os.path.join(directory, "offsets.npy"), np.asarray(offsets, np.uint64)
+        )
+        meta = {
+            "version": FORMAT_VERSION,
+            "fingerprint": fingerprint(file_path),
+            "rows": len(offsets),
+        }
+        with open(os.path.join(directory, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+    _write_directory(offsets_path(file_path), write)
+
+
+def load_offsets(file_path: str):
+    """Memory-map the offset index of a capture export
+
+    Args:
+        file_path (str): The path to the export
+
+    Returns:
+        np.ndarray: The byte offset of each packet (uint64), or None if there
+        is no up-to-date index
+    """
+    directory = offsets_path(file_path)
+    meta = _read_meta(directory, file_path)
+    if meta is None:
+        return None
+    if not meta["rows"]:
+        # Un fichier vide ne peut pas être projeté en mémoire
+        return np.empty(0, np.uint64)
+    try:
+        return np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
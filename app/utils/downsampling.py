@@ -0,0 +1,104 @@
+import numpy as np
+
+# Méthodes de réduction disponibles
+LTTB = "lttb"  # Largest-Triangle-Three-Buckets
+MINMAX = "minmax"  # Minimum et maximum de chaque seau
+
+
+def lttb(x, y, target):
+    """Select the points of a series with Largest-Triangle-Three-Buckets
+
+    The first and last points are kept. The other points are split into
+    ``target - 2`` buckets, and in each bucket the point forming the largest
+    triangle with the point selected in the previous bucket and the mean of
+    the next bucket is kept, so the peaks of the series remain visible.
+
+    Args:
+        x (np.ndarray): The x values, increasing
+        y (np.ndarray): The y values
+        target (int): The number of points to keep, at least 3
+
+    Returns:
+        np.ndarray: The indices of the points kept, increasing
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(x)
+    if target >= count or target < 3:
+        return np.arange(count)
+
+    # Bornes calculées en entiers : linspace tronqué peut décaler une borne
+    edges = 1 + np.arange(target - 1) * (count - 2) // (target - 2)
+    sizes = np.diff(edges)
+    # Point moyen de chaque seau, puis dernier point comme « seau » suivant
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+    selected = np.empty(target, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(target - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        # Aire (au facteur 1/2 près) des triangles précédent, point, suivant
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x, y, target):
+    """Select the minimum and maximum of each bucket of a series
+
+    Args:
+        x (np.ndarray): The x values, increasing
+        y (np.ndarray): The y values
+        target (int): The number of points to keep, at least 2
+
+    Returns:
+        np.ndarray: The indices of the points kept, increasing
+    """
+    y = np.asarray(y, dtype=np.float64)
+    count = len(y)
+    if target >= count or target < 2:
+        return np.arange(count)
+
+    buckets = target // 2
+    edges = np.arange(buckets + 1) * count // buckets
+    selected = [0, count - 1]
+    for start, end in zip(edges[:-1].tolist(), edges[1:].tolist()):
+        if start < end:
+            selected.append(start + int(np.argmin(y[start:end])))
+            selected.append(start + int(np.argmax(y[start:end])))
+    return np.unique(selected)
+
+
+def downsample(x, series, target, method=LTTB):
+    """Reduce several series sharing the same x values to about target points
+
+    Each series is reduced on its own, and the points kept by any of them
+    are kept for all, so every series keeps its peaks and the series still
+    share their x values. The result has at most ``len(series) * target``
+    points.
+
+    Args:
+        x (np.ndarray): The x values, increasing
+        series (List[np.ndarray]): The y values of each series
+        target (int): The number of points to keep for each series
+        method (str): LTTB or MINMAX
+
+    Returns:
+        np.ndarray: The indices of the points kept, increasing
+
+    Raises:
+        ValueError: If the method is unknown
+    """
+    if method not in (LTTB, MINMAX):
+        raise ValueError(f"Unknown downsampling method: {method}")
+    if target is None or len(x) <= target:
+        return np.arange(len(x))
+    reduce = lttb if method == LTTB else minmax
+    x = np.asarray(x, dtype=np.float64)
+    return np.unique(np.concatenate([reduce(x, y, target) for y in series]))
@@ -0,0 +1,153 @@
+import math
+
+import numpy as np
+
+# Rayon moyen de la Terre (IUGG), en kilomètres, pour tous les calculs de distance
+EARTH_RADIUS_KM = 6371.0088
+
+# Nombre de points traités à la fois par many_to_many
+CHUNK_SIZE = 4096
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Compute the great-circle distance between two points (haversine)
+
+    Args:
+        lat1 (float): The latitude of the first point, in degrees
+        lon1 (float): The longitude of the first point, in degrees
+        lat2 (float): The latitude of the second point, in degrees
+        lon2 (float): The longitude of the second point, in degrees
+
+    Returns:
+        float: The distance, in kilometers
+    """
+    lat1, lon1 = math.radians(lat1), math.radians(lon1)
+    lat2, lon2 = math.radians(lat2), math.radians(lon2)
+    d = (
+        math.sin((lat2 - lat1) * 0.5) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) * 0.5) ** 2
+    )
+    return EARTH_RADIUS_KM * (2 * math.asin(math.sqrt(min(d, 1.0))))
+
+
+def pairwise(lat1, lon1, lat2, lon2):
+    """Compute the distances between pairs of points
+
+    The arguments are broadcast against each other, like NumPy operators.
+
+    Args:
+        lat1 (np.ndarray): The latitudes of the first points, in degrees
+        lon1 (np.ndarray): The longitudes of the first points, in degrees
+        lat2 (np.ndarray): The latitudes of the second points, in degrees
+        lon2 (np.ndarray): The longitudes of the second points, in degrees
+
+    Returns:
+        np.ndarray: The distance of each pair, in kilometers, NaN when a
+        position is NaN
+    """
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    d = (
+        np.sin((lat2 - lat1) * 0.5) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    )
+    return EARTH_RADIUS_KM * (2 * np.arcsin(np.sqrt(np.minimum(d, 1.0))))
+
+
+def one_to_many(lat, lon, lats, lons):
+    """Compute the distances from a point to many points
+
+    Args:
+        lat (float): The latitude of the point, in degrees
+        lon (float): The longitude of the point, in degrees
+        lats (np.ndarray): The latitudes of the other points, in degrees
+        lons (np.ndarray): The longitudes of the other points, in degrees
+
+    Returns:
+        np.ndarray: The distances, in kilometers
+    """
+    return pairwise(lat, lon, np.asarray(lats, dtype=np.float64), lons)
+
+
+def bounding_margin(lat, radius):
+    """Get the latitude and longitude margins containing a radius around a point
+
+    Args:
+        lat (float): The latitude of the point, in degrees
+        radius (float): The radius, in kilometers
+
+    Returns:
+        Tuple[float, float]: The latitude margin and the longitude margin, in
+        degrees; the longitude margin is infinite near the poles
+    """
+    margin = math.degrees(radius / EARTH_RADIUS_KM)
+    cos_latitude = math.cos(math.radians(min(abs(lat) + margin, 90.0)))
+    if cos_latitude <= 1e-9:
+        return margin, math.inf
+    return margin, margin / cos_latitude
+
+
+def many_to_many(lats1, lons1, lats2, lons2, cutoff=None):
+    """Compute the distances between two sets of points
+
+    Without a cutoff, the full matrix is returned. With a cutoff, only the
+    pairs within the cutoff are computed: the second set is sorted by
+    latitude, and each point of the first set is only compared with the
+    points of its latitude and longitude band.
+
+    Args:
+        lats1 (np.ndarray): The latitudes of the first set, in degrees
+        lons1 (np.ndarray): The longitudes of the first set, in degrees
+        lats2 (np.ndarray): The latitudes of the second set, in degrees
+        lons2 (np.ndarray): The longitudes of the second set, in degrees
+        cutoff (float): The maximum distance of the pairs, in kilometers
+
+    Returns:
+        np.ndarray | Tuple[np.ndarray, np.ndarray, np.ndarray]: The matrix of
+        the distances in kilometers, or with a cutoff the index of each pair
+        in the first set, in the second set and its distance, sorted by the
+        index in the first set then in the second set
+    """
+    lats1, lons1 = np.asarray(lats1, np.float64), np.asarray(lons1, np.float64)
+    lats2, lons2 = np.asarray(lats2, np.float64), np.asarray(lons2, np.float64)
+    if cutoff is None:
+        return pairwise(lats1[:, None], lons1[:, None], lats2[None, :], lons2[None, :])
+
+    order = np.argsort(lats2, kind="stable")
+    sorted_lats = lats2[order]
+    margin = math.degrees(cutoff / EARTH_RADIUS_KM)
+    firsts, seconds, distances = [], [], []
+    for chunk in range(0, len(lats1), CHUNK_SIZE):
+        lat, lon = lats1[chunk : chunk + CHUNK_SIZE], lons1[chunk : chunk + CHUNK_SIZE]
+        start = np.searchsorted(sorted_lats, lat - margin, side="left")
+        end = np.searchsorted(sorted_lats, lat + margin, side="right")
+
+        # Couples candidats de la bande de latitude de chaque point
+        counts = np.maximum(end - start, 0)
+        first = np.repeat(np.arange(len(lat)), counts)
+        offsets = np.arange(counts.sum())
+        offsets -= np.repeat(np.cumsum(counts) - counts, counts)
+        second = order[np.repeat(start, counts) + offsets]
+
+        # puis de sa bande de longitude, sauf près des pôles
+        cos_latitude = np.cos(np.radians(np.minimum(np.abs(lat) + margin, 90.0)))
+        with np.errstate(divide="ignore"):
+            lon_margin = np.where(cos_latitude > 1e-9, margin / cos_latitude, np.inf)
+        delta = np.abs(lons2[second] - lon[first])
+        delta = np.minimum(delta, 360.0 - delta)
+        band = delta <= lon_margin[first]
+        first, second = first[band], second[band]
+
+        pair_distances = pairwise(lat[first], lon[first], lats2[second], lons2[second])
+        within = pair_distances <= cutoff
+        firsts.append(first[within] + chunk)
+        seconds.append(second[within])
+        distances.append(pair_distances[within])
+
+    if not firsts:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+    firsts, seconds = np.concatenate(firsts), np.concatenate(seconds)
+    distances = np.concatenate(distances)
+    pairs = np.lexsort((seconds, firsts))
+    return firsts[pairs], seconds[pairs], distances[pairs]
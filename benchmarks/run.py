@@ -0,0 +1,322 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.CAM import CAM  # noqa: E402
+from app.models.DENM import DENM  # noqa: E402
+from app.models.PacketTable import PacketTable  # noqa: E402
+from app.models.StationIndex import StationIndex  # noqa: E402
+from app.services.json_stream import item_offsets, iter_array_items  # noqa: E402
+from app.utils import geodesy  # noqa: E402
+from app.utils.downsampling import LTTB, MINMAX, downsample  # noqa: E402
+
+# Benchmarks disponibles, par nom
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    """Register a benchmark under the name of its function
+
+    Args:
+        function (Callable[[int], None]): The benchmark, called with the number
+            of packets of the synthetic capture
+
+    Returns:
+        Callable[[int], None]: The function, unchanged
+    """
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def measure(function, *args, memory=False):
+    """Run a function once, measuring its duration and peak memory
+
+    Args:
+        function (Callable): The function
+        *args: The arguments of the function
+        memory (bool): Whether to trace the memory, which slows the function
+
+    Returns:
+        Tuple[Any, float, float]: The result, the duration in seconds and the
+        peak of the memory allocated by Python in MB, None if not traced
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    duration = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, duration, peak
+
+
+def report(label, duration, peak=None):
+    """Print a line of results"""
+    line = f"  {label:<40} {duration:9.3f} s"
+    if peak is not None:
+        line += f" {peak:10.1f} MB"
+    print(line)
+
+
+def write_export(path, count, seed=0):
+    """Write a synthetic tshark -T json export of CAMs
+
+    Args:
+        path (str): The path of the file
+        count (int): The number of packets
+        seed (int): The seed of the random generator
+    """
+    rnd = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("[\n")
+        for number in range(1, count + 1):
+            station = rnd.randrange(40)
+            layers = {
+                "frame": {
+                    "frame.time_epoch": f"{1718186400 + number * 0.05:.9f}",
+                    "frame.number": str(number),
+                    "frame.len": str(rnd.randrange(60, 400)),
+                    "frame.protocols": "eth:ethertype:gnw:btpb:its",
+                },
+                "eth": {
+                    "eth.src": f"02:00:00:00:00:{station:02x}",
+                    "eth.type": "0x8947",
+                },
+                "gnw": {
+                    "geonw.bh": {"geonw.bh.version": "1", "geonw.bh.rhl": "1"},
+                    "geonw.tsb": {
+                        "geonw.src_pos_tree": {
+                            "geonw.src_pos.lat": str(492500000 + station * 1000),
+                            "geonw.src_pos.long": str(40300000 + station * 1000),
+                            "geonw.src_pos.speed": str(rnd.randrange(3000)),
+                        }
+                    },
+                },
+                "its": {
+                    "its.ItsPduHeader_element": {"its.stationId": str(1000 + station)},
+                    "cam.generationDeltaTime": str(rnd.randrange(65536)),
+                },
+            }
+            packet = {"_index": "packets-2024-06-12", "_source": {"layers": layers}}
+            file.write(json.dumps(packet, indent=2))
+            file.write(",\n" if number < count else "\n")
+        file.write("]\n")
+
+
+def make_packets(count, seed=0):
+    """Build the CAMs and DENMs of a synthetic capture
+
+    40 stations send CAMs; the DENMs are sent by the stations or relayed by
+    50 MAC addresses that never send a CAM, like road-side units.
+
+    Args:
+        count (int): The number of packets
+        seed (int): The seed of the random generator
+
+    Returns:
+        List[Packet]: The packets, in time order
+    """
+    rnd = random.Random(seed)
+    packets = []
+    for number in range(count):
+        station = rnd.randrange(40)
+        packet_type = CAM if rnd.random() < 0.8 else DENM
+        packet = packet_type.__new__(packet_type)
+        for name in packet_type.attribute_names():
+            setattr(packet, name, None)
+        packet.timestamp = 1718186400 + number * 0.01
+        packet.frame_number = str(number + 1)
+        packet.src_mac = f"02:00:00:00:00:{station:02x}"
+        packet.stationID = str(1000 + station)
+        packet.latitude = str(492500000 + station * 1000 + rnd.randrange(-500, 500))
+        packet.longitude = str(40300000 + station * 1000 + rnd.randrange(-500, 500))
+        if packet_type is DENM:
+            packet.originating_station_id = str(1000 + rnd.randrange(40))
+            if rnd.random() < 0.5:
+                packet.src_mac = f"02:00:00:00:01:{rnd.randrange(50):02x}"
+        packets.append(packet)
+    return packets
+
+
+@benchmark
+def json_stream(count):
+    """Parse a tshark export with json.load and with iter_array_items"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture.json")
+        write_export(path, count)
+        print(f"json_stream: {count} packets, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        def load():
+            with open(path, "rb") as file:
+                return len(json.load(file))
+
+        def stream():
+            with open(path, "rb") as file:
+                return sum(1 for _ in iter_array_items(file))
+
+        loaded, duration, peak = measure(load, memory=True)
+        report("json.load", duration, peak)
+        streamed, duration, peak = measure(stream, memory=True)
+        report("iter_array_items", duration, peak)
+        offsets, duration, peak = measure(item_offsets, path, memory=True)
+        report("item_offsets", duration, peak)
+        assert loaded == streamed == len(offsets) == count
+
+
+@benchmark
+def station_index(count):
+    """Find the station behind the MAC address of every DENM"""
+    packets = make_packets(count)
+    denms = [packet for packet in packets if isinstance(packet, DENM)]
+    print(f"station_index: {count} packets, {len(denms)} DENMs")
+
+    def scan():
+        # Recherche d'origine : premier CAM de l'adresse, pour chaque DENM
+        stations = []
+        for denm in denms:
+            station = None
+            for packet in packets:
+                if isinstance(packet, CAM) and packet.src_mac == denm.src_mac:
+                    station = packet.stationID
+                    break
+            stations.append(station)
+        return stations
+
+    def lookup(table):
+        index = StationIndex.from_table(table)
+        return [index.station(denm.src_mac) for denm in denms]
+
+    table = PacketTable.from_packets(packets)
+    expected, duration, _ = measure(scan)
+    report("scan of the packets", duration)
+    stations, duration, _ = measure(lookup, table)
+    report("StationIndex, build included", duration)
+    assert stations == expected
+
+
+@benchmark
+def asof_join(count):
+    """Match every DENM with the closest CAM in time of its station"""
+    packets = make_packets(count)
+    table = PacketTable.from_packets(packets)
+    denm_rows = [row for row, packet in enumerate(packets) if isinstance(packet, DENM)]
+    print(f"asof_join: {count} packets, {len(denm_rows)} DENMs")
+
+    def scan():
+        # Recherche d'origine : tous les CAM de la station, pour chaque DENM
+        cams = defaultdict(list)
+        for row, packet in enumerate(packets):
+            if isinstance(packet, CAM):
+                cams[packet.stationID].append(row)
+        matches = []
+        for row in denm_rows:
+            denm = packets[row]
+            best, best_gap = -1, math.inf
+            for cam in cams[denm.originating_station_id]:
+                gap = abs(denm.timestamp - packets[cam].timestamp)
+                if gap < best_gap:
+                    best, best_gap = cam, gap
+            matches.append(best)
+        return matches
+
+    def join():
+        left_rows = np.flatnonzero(table.type_mask(DENM))
+        right_rows = np.flatnonzero(table.type_mask(CAM))
+        return table.asof_join(
+            left_rows, "originating_station_id", right_rows, "stationID"
+        )
+
+    expected, duration, _ = measure(scan)
+    report("scan of the CAMs of each station", duration)
+    matches, duration, _ = measure(join)
+    report("PacketTable.asof_join", duration)
+    assert matches.tolist() == expected
+
+
+@benchmark
+def distances(count):
+    """Compute distances with the scalar haversine and the geodesy kernels"""
+    rng = np.random.default_rng(0)
+    lats1, lats2 = rng.uniform(49.0, 49.5, (2, count))
+    lons1, lons2 = rng.uniform(4.0, 4.5, (2, count))
+    print(f"distances: {count} pairs")
+
+    def haversine():
+        # Formule scalaire d'origine (GeoNetworking.haversine), un couple à la fois
+        result = []
+        for lat1, lon1, lat2, lon2 in zip(
+            lats1.tolist(), lons1.tolist(), lats2.tolist(), lons2.tolist()
+        ):
+            lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+            a = (
+                math.sin((lat2 - lat1) / 2) ** 2
+                + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            )
+            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+            result.append(c * geodesy.EARTH_RADIUS_KM)
+        return np.array(result)
+
+    expected, duration, _ = measure(haversine)
+    report("scalar haversine", duration)
+    result, duration, _ = measure(geodesy.pairwise, lats1, lons1, lats2, lons2)
+    report("geodesy.pairwise", duration)
+    assert np.allclose(result, expected, rtol=1e-9)
+
+    points = min(count, 5000)
+    arguments = (lats1[:points], lons1[:points], lats2[:points], lons2[:points])
+    matrix, duration, _ = measure(geodesy.many_to_many, *arguments)
+    report(f"many_to_many {points} x {points}", duration)
+    pairs, duration, _ = measure(lambda: geodesy.many_to_many(*arguments, cutoff=0.5))
+    report(f"many_to_many {points} x {points}, 0.5 km", duration)
+    assert len(pairs[0]) == np.count_nonzero(matrix <= 0.5)
+
+
+@benchmark
+def downsampling(count):
+    """Reduce the three series of the traffic chart to 1000 points"""
+    rng = np.random.default_rng(0)
+    times = np.arange(count, dtype=np.float64) * 60
+    series = [rng.poisson(rate, count).astype(np.float64) for rate in (600, 20, 100)]
+    # Pics de DENM isolés
+    series[1][rng.integers(0, count, 10)] += 500
+    print(f"downsampling: 3 series of {count} points")
+
+    for method in (LTTB, MINMAX):
+        selected, duration, _ = measure(downsample, times, series, 1000, method)
+        report(f"{method}, {len(selected)} points kept", duration)
+        peaks = all(
+            values[selected].max() == values.max()
+            and values[selected].min() == values.min()
+            for values in series
+        )
+        print(f"    minimum and maximum of every series kept: {peaks}")
+
+
+def main():
+    """Run the benchmarks given on the command line, all by default"""
+    parser = argparse.ArgumentParser(description="Run the benchmarks")
+    parser.add_argument("names", nargs="*", help=", ".join(BENCHMARKS))
+    parser.add_argument("-n", "--packets", type=int, default=30000)
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.packets)
+
+
+if __name__ == "__main__":
+    main()
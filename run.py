@@ -32,22 +32,10 @@ formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 print("Logger configuré.")
 
-# Configuration du cache
-from flask_caching import Cache
-
-print("Configuration du cache...")
-cache_config = {
-    "DEBUG": True,  # certains paramètres peuvent être définis via des variables d'environnement
-    "CACHE_TYPE": "simple",  # Type de cache, ex. Redis, FileSystem, SimpleCache
-    "CACHE_DEFAULT_TIMEOUT": 300,
-}
-
 # Création de l'application Flask
 print("Création de l'application Flask...")
 app, socketio = create_app()
 app.logger.addHandler(handler)
-app.config.from_mapping(cache_config)
-cache = Cache(app)
 print("Application Flask créée et configurée.")
 
 # Activer le threading si nécessaire
@@ -0,0 +1,234 @@
+import datetime
+import json
+import os
+import random
+
+import pytest
+
+from app.models.PacketTable import PacketTable
+
+
+def make_packet(packet_type, **values):
+    """Build a packet from some of its attributes, the others are None
+
+    Args:
+        packet_type (type): The packet class, e.g. CAM
+        **values: The attributes of the packet
+
+    Returns:
+        Packet: The packet
+    """
+    packet = packet_type.__new__(packet_type)
+    for name in packet_type.attribute_names():
+        setattr(packet, name, values.pop(name, None))
+    if values:
+        raise TypeError(f"Unknown attributes: {', '.join(values)}")
+    return packet
+
+
+@pytest.fixture
+def make_table():
+    """Build a PacketTable from (packet class, attributes) pairs"""
+
+    def build(specs):
+        packets = [make_packet(packet_type, **values) for packet_type, values in specs]
+        return PacketTable.from_packets(packets)
+
+    return build
+
+
+def tshark_layers(number, kind, station, time, utc_offset=0, event=None):
+    """Build the layers of a packet of a tshark -T json export
+
+    Args:
+        number (int): The frame number
+        kind (str): "cam", "denm", "geo" (GeoNetworking) or "ipv6"
+        station (dict): The sender: "mac", "id", "type", "lat" and "lon"
+        time (float): The time, in seconds since the epoch
+        utc_offset (int): The UTC offset of the capture clock, in seconds
+        event (dict): The DENM event: "station", "seq" and "detection"
+
+    Returns:
+        dict: The layers
+    """
+    seconds, fraction = divmod(round(time * 1e6), 1_000_000)
+    wall_clock = datetime.datetime.fromtimestamp(
+        seconds + utc_offset, datetime.timezone.utc
+    )
+    zone = {0: "UTC", 3600: "CET", 7200: "CEST"}[utc_offset]
+    frame = {
+        "frame.time": f"{wall_clock:%b %d, %Y %H:%M:%S}.{fraction:06d}000 {zone}",
+        "frame.time_epoch": f"{seconds}.{fraction:06d}000",
+        "frame.number": str(number),
+        "frame.len": str(100 + number % 200),
+        "frame.protocols": "eth:ethertype:gnw:btpb:its",
+    }
+    eth = {"eth.dst": "ff:ff:ff:ff:ff:ff", "eth.src": station["mac"]}
+    layers = {"frame": frame, "eth": eth}
+    if kind == "ipv6":
+        frame["frame.protocols"] = "eth:ethertype:ipv6:icmpv6"
+        eth.update({"eth.type": "0x86dd", "eth.dst": "33:33:00:00:00:01"})
+        layers["ipv6"] = {"ipv6.src": "fe80::1", "ipv6.dst": "ff02::1"}
+        return layers
+
+    eth["eth.type"] = "0x8947"
+    position = {
+        "geonw.src_pos.lat": str(station["lat"]),
+        "geonw.src_pos.long": str(station["lon"]),
+        "geonw.src_pos.speed": str(number % 3000),
+    }
+    rhl = "1" if kind != "denm" else str(10 - number % 4)
+    header_type = "0x40" if kind == "denm" else "0x50"
+    layers["gnw"] = {
+        "geonw.bh": {"geonw.bh.rhl": rhl},
+        "geonw.ch": {"geonw.ch.htype": header_type},
+    }
+    if kind == "denm":
+        layers["gnw"]["geonw.gbc"] = {
+            "geonw.seq_num": str(event["seq"]),
+            "geonw.src_pos_tree": position,
+        }
+    else:
+        layers["gnw"]["geonw.tsb"] = {"geonw.src_pos_tree": position}
+    its = {"its.ItsPduHeader_element": {"its.stationId": str(station["id"])}}
+    if kind == "cam":
+        reference = {
+            "its.latitude": str(station["lat"]),
+            "its.longitude": str(station["lon"]),
+            "its.positionConfidenceEllipse_element": {
+                "its.semiMajorAxisLength": "100",
+                "its.semiMinorAxisLength": "50",
+                "its.semiMajorAxisOrientation": "900",
+            },
+            "its.altitude_element": {
+                "its.altitudeValue": "12000",
+                "its.altitudeConfidence": "15",
+            },
+        }
+        its["cam.CamPayload_element"] = {
+            "cam.generationDeltaTime": str(number * 7 % 65536),
+            "cam.camParameters_element": {
+                "cam.basicContainer_element": {
+                    "its.stationType": str(station["type"]),
+                    "its.referencePosition_element": reference,
+                }
+            },
+        }
+    elif kind == "denm":
+        origin = event["station"]
+        its["denm.DenmPayload_element"] = {
+            "denm.management_element": {
+                "denm.actionId_element": {
+                    "its.originatingStationId": str(origin["id"]),
+                    "its.sequenceNumber": str(event["seq"] % 50),
+                },
+                "denm.detectionTime": str(event["detection"]),
+                "denm.referenceTime": str(event["detection"]),
+                "denm.eventPosition_element": {
+                    "its.latitude": str(origin["lat"]),
+                    "its.longitude": str(origin["lon"]),
+                    "its.positionConfidenceEllipse_element": {
+                        "its.semiMajorConfidence": "100",
+                        "its.semiMinorConfidence": "50",
+                        "its.semiMajorOrientation": "900",
+                    },
+                    "its.altitude_element": {
+                        "its.altitudeValue": "12000",
+                        "its.altitudeConfidence": "15",
+                    },
+                },
+                "denm.validityDuration": "600",
+                "denm.stationType": str(origin["type"]),
+            }
+        }
+    layers["its"] = its
+    return layers
+
+
+def write_export(path, count=300, seed=1, kinds=None, utc_offset=0):
+    """Write a synthetic tshark -T json export
+
+    12 stations move around Valenciennes; the DENMs of a few events are
+    relayed by the stations with decreasing hop limits.
+
+    Args:
+        path (str): The path of the file
+        count (int): The number of packets
+        seed (int): The seed of the random generator
+        kinds (Sequence[str]): The kinds of packets drawn, see tshark_layers
+        utc_offset (int): The UTC offset of the capture clock, in seconds
+
+    Returns:
+        List[dict]: The packets written
+    """
+    rnd = random.Random(seed)
+    kinds = kinds or ["cam"] * 6 + ["denm"] * 2 + ["geo", "ipv6"]
+    stations = [
+        {
+            "mac": f"02:00:00:00:00:{number:02x}",
+            "id": 1000 + number,
+            "type": rnd.choice([5, 10, 15]),
+            "lat": 503500000 + rnd.randrange(-20000, 20000),
+            "lon": 35200000 + rnd.randrange(-20000, 20000),
+        }
+        for number in range(12)
+    ]
+    events = []
+    packets = []
+    time = 1718186400.0
+    for number in range(1, count + 1):
+        time += rnd.randrange(1000, 200000) / 1e6
+        station = rnd.choice(stations)
+        station["lat"] += rnd.randrange(-300, 300)
+        station["lon"] += rnd.randrange(-300, 300)
+        kind = rnd.choice(kinds)
+        event = None
+        if kind == "denm":
+            if not events or rnd.random() < 0.3:
+                events.append(
+                    {
+                        "station": dict(rnd.choice(stations)),
+                        "seq": number,
+                        "detection": int(time * 1000) - 1072915200000,
+                    }
+                )
+            event = rnd.choice(events)
+        layers = tshark_layers(number, kind, station, time, utc_offset, event)
+        packets.append({"_index": "packets-2024-06-12", "_source": {"layers": layers}})
+    with open(path, "w") as file:
+        json.dump(packets, file, indent=2)
+    return packets
+
+
+@pytest.fixture
+def capture(tmp_path):
+    """The path to a synthetic capture of 300 packets"""
+    path = tmp_path / "capture.json"
+    write_export(path)
+    return str(path)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The application, reading the captures of a temporary data directory"""
+    from app import create_app
+
+    application, _ = create_app()
+    application.config["TESTING"] = True
+    application.secret_key = "test"
+    # Gabarits résolus depuis le paquet avant de déplacer le dossier racine
+    application.jinja_loader
+    application.root_path = str(tmp_path)
+    (tmp_path / "data" / "json").mkdir(parents=True)
+    return application
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def data_dir(app):
+    """The data directory of the application"""
+    return os.path.join(app.root_path, "data", "json")
@@ -0,0 +1,212 @@
+import datetime
+import json
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.GeoNetworking import GeoNetworking
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+@pytest.fixture
+def cest_capture(data_dir):
+    """A capture whose clock is two hours ahead of UTC"""
+    write_export(f"{data_dir}/capture.json", utc_offset=7200)
+    return "capture.json"
+
+
+def get_packets(client, **args):
+    """Get every page of the packet API"""
+    packets, after = [], None
+    while True:
+        page_args = dict(args, limit=50, **({"after": after} if after else {}))
+        response = client.get("/api/paquets/", query_string=page_args)
+        assert response.status_code == 200, response.data
+        page = json.loads(response.data)
+        packets += page["packets"]
+        after = page["next_cursor"]
+        if after is None:
+            return packets
+
+
+def test_time_filter_round_trip(client, cest_capture):
+    packets = get_packets(client, file=cest_capture)
+    label = packets[40]["time"]
+    expected = [packet["frame_number"] for packet in packets if packet["time"] == label]
+
+    # Le champ « time » relu tel quel : heure de la capture
+    moment = datetime.datetime.strptime(label, "%Y-%m-%d %H:%M:%S")
+    end = (moment + datetime.timedelta(microseconds=999999)).isoformat()
+    selected = get_packets(client, file=cest_capture, start=label, end=end)
+    assert [packet["frame_number"] for packet in selected] == expected
+
+    # Même intervalle avec un décalage explicite, puis en secondes depuis l'epoch
+    utc = moment - datetime.timedelta(hours=2)
+    start, end = f"{utc.isoformat()}Z", f"{utc.isoformat()}.999999+00:00"
+    selected = get_packets(client, file=cest_capture, start=start, end=end)
+    assert [packet["frame_number"] for packet in selected] == expected
+    epoch = utc.replace(tzinfo=datetime.timezone.utc).timestamp()
+    selected = get_packets(client, file=cest_capture, start=epoch, end=epoch + 0.999)
+    assert [packet["frame_number"] for packet in selected] == expected
+
+
+def test_time_filter_of_the_export(client, cest_capture):
+    packets = get_packets(client, file=cest_capture)
+    start, end = packets[10]["time"], packets[20]["time"]
+    expected = [
+        packet["frame_number"] for packet in packets if start <= packet["time"] <= end
+    ]
+    response = client.get(
+        "/api/paquets/export",
+        query_string={"file": cest_capture, "start": start, "end": end + ".999"},
+    )
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.data.splitlines()]
+    assert [packet["frame_number"] for packet in exported] == expected
+
+
+def test_invalid_time(client, cest_capture):
+    response = client.get(
+        "/api/paquets/", query_string={"file": cest_capture, "start": "tomorrow-ish"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def api_capture(data_dir):
+    """A capture of the data directory, and its packets parsed from scratch"""
+    path = f"{data_dir}/capture.json"
+    write_export(path, count=500, seed=4)
+    return "capture.json", Packets(path, use_sidecar=False).packets
+
+
+def as_json(app, packets, fields=None):
+    """The packets as the API sends them"""
+    dicts = [packet.to_dict() for packet in packets]
+    if fields:
+        dicts = [{key: d[key] for key in fields if key in d} for d in dicts]
+    return json.loads(app.json.dumps(dicts))
+
+
+def test_pages_concatenate_to_the_capture(app, client, api_capture):
+    filename, packets = api_capture
+    url, pages = "/api/paquets/?file=capture.json&limit=120", []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = json.loads(response.data)
+        assert page["total"] == len(packets) and page["limit"] == 120
+        pages.append(page)
+        url = page["next"]
+    assert [len(page["packets"]) for page in pages] == [120, 120, 120, 120, 20]
+    # Curseur : dernier numéro de trame de la page
+    for page in pages[:-1]:
+        assert page["next_cursor"] == page["packets"][-1]["frame_number"]
+    assert pages[-1]["next_cursor"] is None
+    assert sum((page["packets"] for page in pages), []) == as_json(app, packets)
+    assert get_packets(client, file=filename) == as_json(app, packets)
+
+
+def sent_by(packet, station):
+    """Whether a packet was sent by a station or is a DENM it originated"""
+    return station in (
+        getattr(packet, "stationID", None),
+        getattr(packet, "originating_station_id", None),
+    )
+
+
+def in_box(packet):
+    """Whether the source position of a packet is in the box of the test"""
+    if getattr(packet, "src_pos_lat", None) is None:
+        return False
+    lat, lon = packet.src_pos_lat / 1e7, packet.src_pos_long / 1e7
+    return 50.349 <= lat <= 50.351 and 3.52 <= lon <= 3.53
+
+
+def test_filters_match_the_scan(app, client, api_capture):
+    filename, packets = api_capture
+    mac, station = packets[0].src_mac, 1003
+    cases = [
+        ({"type": "cam"}, lambda p: isinstance(p, CAM)),
+        ({"type": "geo"}, lambda p: isinstance(p, GeoNetworking)),
+        ({"mac": mac.upper()}, lambda p: mac in (p.src_mac, p.dst_mac)),
+        ({"src_mac": mac}, lambda p: p.src_mac == mac),
+        ({"dst_mac": "ff:ff:ff:ff:ff:ff"}, lambda p: p.dst_mac == "ff:ff:ff:ff:ff:ff"),
+        ({"station": str(station)}, lambda p: sent_by(p, station)),
+        (
+            {"type": "denm", "src_mac": mac},
+            lambda p: isinstance(p, DENM) and p.src_mac == mac,
+        ),
+        ({"bbox": "3.52,50.349,3.53,50.351"}, in_box),
+    ]
+    for args, select in cases:
+        expected = as_json(app, [packet for packet in packets if select(packet)])
+        assert expected, args
+        assert get_packets(client, file=filename, **args) == expected
+        response = client.get("/api/paquets/", query_string=dict(args, file=filename))
+        assert json.loads(response.data)["total"] == len(expected)
+
+    # Points d'entrée d'un type de paquet
+    for prefix, packet_type in (("cam", CAM), ("denm", DENM), ("geo", GeoNetworking)):
+        response = client.get(
+            f"/api/paquets/{prefix}/", query_string={"file": filename}
+        )
+        page = json.loads(response.data)
+        expected = [packet for packet in packets if isinstance(packet, packet_type)]
+        assert page["total"] == len(expected)
+        assert page["packets"] == as_json(app, expected[:100])
+
+
+def test_fields_projection(app, client, api_capture):
+    filename, packets = api_capture
+    fields = "frame_number, time,stationID"
+    selected = get_packets(client, file=filename, fields=fields)
+    assert selected == as_json(app, packets, ["frame_number", "time", "stationID"])
+    response = client.get(
+        "/api/paquets/", query_string={"file": filename, "fields": "x"}
+    )
+    assert response.status_code == 400
+
+
+def test_page_bounds(app, client, api_capture):
+    filename, packets = api_capture
+    last = packets[-1].frame_number
+    page = json.loads(
+        client.get("/api/paquets/", query_string={"file": filename, "after": last}).data
+    )
+    assert page["packets"] == [] and page["next_cursor"] is None
+    middle = packets[250].frame_number
+    page = json.loads(
+        client.get(
+            "/api/paquets/", query_string={"file": filename, "after": middle}
+        ).data
+    )
+    assert page["packets"] == as_json(app, packets[251:351])
+
+    app.config["API_MAX_PAGE_SIZE"] = 30
+    page = json.loads(
+        client.get("/api/paquets/", query_string={"file": filename, "limit": 500}).data
+    )
+    assert page["limit"] == 30 and len(page["packets"]) == 30
+    for args in ({"limit": 0}, {"after": "x"}, {"type": "ipv4"}, {"station": "a"}):
+        response = client.get("/api/paquets/", query_string=dict(args, file=filename))
+        assert response.status_code == 400, args
+    response = client.get("/api/paquets/", query_string={"file": "missing.json"})
+    assert response.status_code == 404
+
+
+def test_single_packet(app, client, api_capture):
+    filename, packets = api_capture
+    cam = next(packet for packet in packets if isinstance(packet, CAM))
+    number = cam.frame_number
+    for url in (f"/api/paquet/{number}", f"/api/paquet/cam/{number}"):
+        response = client.get(url, query_string={"file": filename})
+        assert json.loads(response.data) == as_json(app, [cam])[0]
+    response = client.get(
+        f"/api/paquet/denm/{number}", query_string={"file": filename}
+    )
+    assert response.status_code == 404
+    response = client.get("/api/paquet/100000", query_string={"file": filename})
+    assert response.status_code == 404
@@ -0,0 +1,80 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.GeoNetworking import GeoNetworking
+
+
+def scan_join(specs, left_rows, left_key, right_rows, right_key):
+    """Match each left row by a scan of the right rows, in table order
+
+    As in the analytics before the as-of join, the first right row with the
+    smallest time difference wins.
+    """
+    matches = []
+    for left in left_rows:
+        left_values = specs[left][1]
+        key, time = left_values.get(left_key), left_values["timestamp"]
+        best, best_gap = -1, math.inf
+        for right in right_rows:
+            right_values = specs[right][1]
+            if key is None or right_values.get(right_key) != key:
+                continue
+            # Comparaison fausse si l'un des temps est NaN
+            gap = abs(time - right_values["timestamp"])
+            if gap < best_gap:
+                best, best_gap = right, gap
+        matches.append(best)
+    return matches
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_asof_join_matches_scan(make_table, seed):
+    rnd = random.Random(seed)
+    specs = []
+    for _ in range(300):
+        packet_type = rnd.choice([CAM, CAM, DENM, GeoNetworking])
+        # Temps arrondis à la seconde : beaucoup d'égalités à départager
+        time = float(rnd.randrange(60)) if rnd.random() > 0.05 else math.nan
+        values = {"timestamp": time, "stationID": str(1000 + rnd.randrange(8))}
+        if packet_type is DENM:
+            station = rnd.randrange(10)
+            values["originating_station_id"] = str(1000 + station) if station else None
+        specs.append((packet_type, values))
+    table = make_table(specs)
+
+    left_rows = np.flatnonzero(table.type_mask(DENM))
+    right_rows = np.flatnonzero(table.type_mask(CAM))
+    arguments = (left_rows, "originating_station_id", right_rows, "stationID")
+    matches = table.asof_join(*arguments)
+    assert matches.tolist() == scan_join(specs, *arguments)
+    assert (matches >= 0).any() and (matches < 0).any()
+
+
+def test_asof_join_tie_keeps_first_row(make_table):
+    specs = [
+        (CAM, {"timestamp": 12.0, "stationID": "7"}),
+        (CAM, {"timestamp": 8.0, "stationID": "7"}),
+        (CAM, {"timestamp": 8.0, "stationID": "7"}),
+        (CAM, {"timestamp": 10.0, "stationID": "8"}),
+        (DENM, {"timestamp": 10.0, "originating_station_id": "7"}),
+        (DENM, {"timestamp": 20.0, "originating_station_id": "9"}),
+    ]
+    table = make_table(specs)
+    matches = table.asof_join(
+        np.array([4, 5]), "originating_station_id", np.arange(4), "stationID"
+    )
+    assert matches.tolist() == [0, -1]
+
+
+def test_asof_join_without_right_rows(make_table):
+    table = make_table([(DENM, {"timestamp": 1.0, "originating_station_id": "7"})])
+    no_rows = np.array([], dtype=np.int64)
+    matches = table.asof_join(
+        np.array([0]), "originating_station_id", no_rows, "stationID"
+    )
+    assert matches.tolist() == [-1]
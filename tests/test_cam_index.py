@@ -0,0 +1,78 @@
+import math
+import random
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.CamIndex import CamIndex
+from app.utils import geodesy
+
+
+@pytest.fixture
+def cams():
+    """CAMs of two station types around Valenciennes, some at the same place"""
+    rnd = random.Random(5)
+    specs = []
+    for number in range(3000):
+        if number % 50 == 0 and specs:
+            # Même position qu'une CAM précédente : égalité de distance
+            values = dict(rnd.choice(specs)[1])
+        else:
+            values = {
+                "latitude": round((50.35 + rnd.gauss(0, 0.02)) * 1e7),
+                "longitude": round((3.52 + rnd.gauss(0, 0.03)) * 1e7),
+                "station_type": rnd.choice([5, 10]),
+            }
+        values["timestamp"] = 1718186400 + number * 0.1 + rnd.random() * 0.05
+        specs.append((CAM, values))
+    return specs
+
+
+def scan_nearest(specs, station_type, time, position, window):
+    """The closest CAM by a scan of the capture, times truncated to the second"""
+    closest = None
+    min_distance = float("inf")
+    for _, values in specs:
+        if values["station_type"] != station_type:
+            continue
+        if abs(math.floor(values["timestamp"]) - math.floor(time)) > window:
+            continue
+        cam_pos = (values["latitude"] / 1e7, values["longitude"] / 1e7)
+        distance = geodesy.distance(*position, *cam_pos)
+        if distance < min_distance:
+            min_distance = distance
+            closest = cam_pos
+    return closest
+
+
+@pytest.mark.parametrize("cell_size", [0.05, 0.5, 5.0])
+def test_nearest_is_the_scan(make_table, cams, cell_size):
+    index = CamIndex.from_table(make_table(cams), cell_size)
+    rnd = random.Random(6)
+    for _ in range(200):
+        station_type = rnd.choice([5, 10, 3])
+        time = 1718186400 + rnd.uniform(-30, 330)
+        if rnd.random() < 0.2:
+            # Point confondu avec une CAM
+            values = rnd.choice(cams)[1]
+            position = (values["latitude"] / 1e7, values["longitude"] / 1e7)
+        else:
+            position = (50.35 + rnd.gauss(0, 0.05), 3.52 + rnd.gauss(0, 0.05))
+        window = rnd.choice([0, 1, 10, 60])
+        expected = scan_nearest(cams, station_type, time, position, window)
+        assert index.nearest(station_type, time, position, window) == expected
+
+
+def test_nearest_at_the_edge_of_the_window(make_table):
+    cams = [
+        (CAM, {"latitude": 503500000, "longitude": 35200000, "timestamp": 400.1}),
+        (CAM, {"latitude": 504000000, "longitude": 35200000, "timestamp": 405.2}),
+    ]
+    for _, values in cams:
+        values.update(station_type=5, timestamp=1718186000 + values["timestamp"])
+    index = CamIndex.from_table(make_table(cams))
+    # 60,8 s d'écart, mais 60 s entre les champs « time » des paquets
+    assert index.nearest(5, 1718186460.9, (50.35, 3.52), 60) == (50.35, 3.52)
+    assert index.nearest(5, 1718186465.0, (50.35, 3.52), 60) == (50.4, 3.52)
+    assert index.nearest(5, 1718186466.0, (50.35, 3.52), 60) is None
+    assert index.nearest(5, float("nan"), (50.35, 3.52), 60) is None
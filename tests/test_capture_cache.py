@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.models.Packets import Packets
+from app.services.capture_cache import CaptureCache, estimate_size
+from tests.conftest import write_export
+
+
+@pytest.fixture
+def captures(tmp_path):
+    """Three captures of the same size"""
+    paths = []
+    for seed in range(3):
+        path = str(tmp_path / f"capture_{seed}.json")
+        write_export(path, count=200, seed=seed)
+        paths.append(path)
+    return paths
+
+
+class Loader:
+    """Load captures without their sidecar, counting the loads"""
+
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, path):
+        def load():
+            self.loads.append(path)
+            return Packets(path, use_sidecar=False)
+
+        return load
+
+
+def test_hits_and_misses(captures):
+    cache, loader = CaptureCache(), Loader()
+    first = cache.get(captures[0], loader(captures[0]))
+    assert cache.get(captures[0], loader(captures[0])) is first
+    assert loader.loads == [captures[0]]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["size"] == estimate_size(first) > 0
+
+
+def test_rewritten_capture_is_reloaded(captures):
+    cache, loader = CaptureCache(), Loader()
+    first = cache.get(captures[0], loader(captures[0]))
+    write_export(captures[0], count=250, seed=9)
+    second = cache.get(captures[0], loader(captures[0]))
+    assert second is not first and len(second.table) == 250
+    # L'ancienne version est retirée du cache
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["size"] == estimate_size(second)
+
+
+def test_least_recently_used_is_evicted(captures):
+    loader = Loader()
+    size = estimate_size(Packets(captures[0], use_sidecar=False))
+    cache = CaptureCache(max_bytes=int(size * 2.5))
+    for path in captures[:2]:
+        cache.get(path, loader(path))
+    cache.get(captures[0], loader(captures[0]))
+    cache.get(captures[2], loader(captures[2]))
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert set(stats["sizes"]) == {os.path.abspath(captures[0]), captures[2]}
+    assert stats["size"] <= cache.max_bytes
+    cache.get(captures[1], loader(captures[1]))
+    assert loader.loads == [captures[0], captures[1], captures[2], captures[1]]
+
+
+def test_capture_larger_than_the_budget(captures):
+    cache, loader = CaptureCache(max_bytes=1000), Loader()
+    cache.get(captures[0], loader(captures[0]))
+    cache.get(captures[0], loader(captures[0]))
+    assert len(loader.loads) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_derived_structures_are_accounted(captures):
+    loader = Loader()
+    cache = CaptureCache()
+    packets = cache.get(captures[0], loader(captures[0]))
+    before = cache.stats()["size"]
+    packets.search_packets("CAM")
+    after = cache.stats()["size"]
+    assert after > before
+    assert after == estimate_size(packets)
+
+    # Budget dépassé par une structure construite après le chargement
+    cache.max_bytes = after
+    packets.get_denm_cam_association()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate(captures):
+    cache, loader = CaptureCache(), Loader()
+    for path in captures:
+        cache.get(path, loader(path))
+    cache.invalidate(captures[0])
+    assert cache.stats()["entries"] == 2
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["size"] == 0
+
+
+def wait_for(condition, timeout=5):
+    """Wait until a condition holds, polling"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_single_flight(captures):
+    cache, release = CaptureCache(), threading.Event()
+    loads = []
+
+    def load(path):
+        loads.append(path)
+        release.wait()
+        return Packets(path, use_sidecar=False)
+
+    with ThreadPoolExecutor(8) as executor:
+        futures = [
+            executor.submit(cache.get, path, lambda path=path: load(path))
+            for path in (captures[number % 2] for number in range(8))
+        ]
+        # Un chargement par capture, les autres requêtes l'attendent
+        wait_for(lambda: cache.stats()["waits"] == 6)
+        assert cache.stats()["loading"] == 2
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert sorted(loads) == sorted(captures[:2])
+    assert all(result is results[number % 2] for number, result in enumerate(results))
+    stats = cache.stats()
+    assert (stats["misses"], stats["waits"], stats["loading"]) == (2, 6, 0)
+
+
+def test_single_flight_error(captures):
+    cache, release = CaptureCache(), threading.Event()
+    calls = []
+
+    def failing():
+        calls.append(None)
+        release.wait()
+        raise ValueError("broken capture")
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(cache.get, captures[0], failing) for _ in range(4)]
+        wait_for(lambda: cache.stats()["waits"] == 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="broken capture"):
+                future.result()
+    assert len(calls) == 1
+
+    # L'erreur n'est pas gardée : la requête suivante recharge la capture
+    packets = cache.get(captures[0], lambda: Packets(captures[0], use_sidecar=False))
+    assert len(packets.table) == 200
@@ -0,0 +1,101 @@
+import datetime
+import time
+
+import pytest
+
+from app.models import Packet as packet_module
+from app.models.CAM import CAM
+from app.models.Packets import Packets
+from tests.conftest import tshark_layers, write_export
+
+# frame.time sans les fractions de seconde ni la zone
+FRAME_TIME = "%b %d, %Y %H:%M:%S"
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Run the test on a server whose local time zone is not the capture's"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def wall_clocks(packets, layer=None):
+    """The frame.time of the packets, to the second, as naive datetimes"""
+    layers = [packet["_source"]["layers"] for packet in packets]
+    return [
+        datetime.datetime.strptime(item["frame"]["frame.time"][:21], FRAME_TIME)
+        for item in layers
+        if layer is None or layer in item.get("its", {})
+    ]
+
+
+@pytest.mark.parametrize("utc_offset", [0, 7200])
+def test_times_in_capture_zone(tmp_path, new_york, utc_offset):
+    path = tmp_path / "capture.json"
+    exported = write_export(path, utc_offset=utc_offset)
+    expected = [f"{moment:%Y-%m-%d %H:%M:%S}" for moment in wall_clocks(exported)]
+    # Écriture puis lecture du sidecar, puis analyse du JSON seul
+    for use_sidecar in (True, True, False):
+        packets = Packets(str(path), use_sidecar=use_sidecar)
+        assert [packet.time for packet in packets.packets] == expected
+        assert packets.get_first_last_time() == (expected[0], expected[-1])
+
+
+@pytest.mark.parametrize("utc_offset", [0, 7200])
+def test_denm_map_times_in_capture_zone(tmp_path, new_york, utc_offset):
+    path = tmp_path / "capture.json"
+    exported = write_export(path, utc_offset=utc_offset)
+    denm_times = set(wall_clocks(exported, "denm.DenmPayload_element"))
+    association = Packets(str(path)).get_denm_cam_association()
+    times = [entry["time"] for entries in association.values() for entry in entries]
+    assert times and set(times) <= denm_times
+
+
+
+# Sans frame.time_epoch, seul un frame.time en UTC ne dépend pas du serveur
+@pytest.mark.parametrize("epoch, utc_offset", [(True, 0), (True, 7200), (False, 0)])
+def test_frame_time_parsed_once(monkeypatch, epoch, utc_offset):
+    station = {"mac": "02:00:00:00:00:01", "id": 1001, "type": 5, "lat": 1, "lon": 2}
+    layers = tshark_layers(1, "cam", station, 1718186400.25, utc_offset)
+    if not epoch:
+        # Export antérieur à l'ajout de frame.time_epoch
+        del layers["frame"]["frame.time_epoch"]
+    # Ligne d'un export -T fields : seuls les champs de temps comptent ici
+    fields = {name: "1" for name in CAM.TSHARK_FIELDS.values()}
+    fields.pop("frame.time_epoch")
+    fields.update(layers["frame"])
+
+    parsed = []
+    parse_frame_time = packet_module.parse_frame_time
+
+    def parse(value):
+        if isinstance(value, str):
+            parsed.append(value)
+        return parse_frame_time(value)
+
+    monkeypatch.setattr(packet_module, "parse_frame_time", parse)
+    for packet in (CAM.from_dict(layers), CAM.from_fields(fields)):
+        assert packet.timestamp == pytest.approx(1718186400.25)
+        assert packet.utc_offset == utc_offset
+    assert len(parsed) == 2
+
+
+def test_time_lookups(tmp_path, new_york):
+    path = tmp_path / "capture.json"
+    write_export(path, utc_offset=7200)
+    for packets in (Packets(str(path)), Packets(str(path))):
+        # Parcours d'origine : comparaison au champ « time » des paquets
+        scan = packets.packets
+        labels = sorted({packet.time for packet in scan})
+        for start, end in [(labels[3], labels[3]), (labels[5], labels[20])]:
+            expected = [packet for packet in scan if start <= packet.time <= end]
+            assert packets.get_packets_by_time_range(start, end) == expected
+            moments = [datetime.datetime.fromisoformat(time) for time in (start, end)]
+            assert packets.get_packets_by_time_range(*moments) == expected
+        first = next(packet for packet in scan if packet.time == labels[7])
+        assert packets.get_packet_by_time(labels[7]) is first
+        assert packets.get_packet_by_time(f"{labels[7]}.5") is None
+        assert packets.get_packet_by_time("2024-06-12 00:00:00") is None
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from app.extensions import chart_cache
+from app.models.Packets import Packets
+from app.services.charts import CHARTS
+from tests.conftest import write_export
+
+
+@pytest.fixture
+def dashboard_capture(data_dir):
+    """A capture with relayed DENMs, so every chart has data"""
+    write_export(os.path.join(data_dir, "capture.json"), count=400, seed=5)
+    return "capture.json"
+
+
+def expected_data(app, data_dir, filename, name):
+    """The data of a chart computed on a new collection, as the page reads it"""
+    packets = Packets(os.path.join(data_dir, filename), use_sidecar=False)
+    return json.loads(app.json.dumps(CHARTS[name](packets, app.config)))
+
+
+@pytest.mark.parametrize("name", list(CHARTS))
+def test_chart_data(app, client, data_dir, dashboard_capture, name):
+    response = client.get(
+        f"/api/paquets/charts/{name}", query_string={"file": dashboard_capture}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert json.loads(response.data) == expected_data(
+        app, data_dir, dashboard_capture, name
+    )
+
+    # Revalidation sans recalcul, puis données servies depuis le cache
+    etag = response.headers["ETag"]
+    revalidated = client.get(
+        f"/api/paquets/charts/{name}",
+        query_string={"file": dashboard_capture},
+        headers={"If-None-Match": etag},
+    )
+    assert revalidated.status_code == 304
+    hits = chart_cache.stats()["hits"]
+    again = client.get(
+        f"/api/paquets/charts/{name}", query_string={"file": dashboard_capture}
+    )
+    assert again.data == response.data
+    assert chart_cache.stats()["hits"] == hits + 1
+
+
+def test_rewritten_capture(app, client, data_dir, dashboard_capture):
+    url = "/api/paquets/charts/statistics"
+    first = client.get(url, query_string={"file": dashboard_capture})
+    path = os.path.join(data_dir, dashboard_capture)
+    write_export(path, count=150, seed=2)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    second = client.get(
+        url,
+        query_string={"file": dashboard_capture},
+        headers={"If-None-Match": first.headers["ETag"]},
+    )
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert json.loads(second.data)["total_packets"] == 150
+
+
+def test_chart_parameters_are_in_the_key(app, client, dashboard_capture):
+    url = "/api/paquets/charts/time-series"
+    first = client.get(url, query_string={"file": dashboard_capture})
+    app.config["CHART_MAX_POINTS"] = 2
+    second = client.get(url, query_string={"file": dashboard_capture})
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+def test_dashboard_prefetches_the_charts(client, dashboard_capture):
+    assert client.get(f"/packets/{dashboard_capture}").status_code == 200
+    before = chart_cache.stats()
+    response = client.get("/dashboard")
+    assert response.status_code == 200
+    for name in CHARTS:
+        # Capture de la session, calcul lancé par la page
+        assert client.get(f"/api/paquets/charts/{name}").status_code == 200
+    after = chart_cache.stats()
+    # Aucune requête ne calcule de graphique : elles attendent le préchargement
+    assert after["misses"] == before["misses"]
+    served = after["hits"] + after["waits"] - before["hits"] - before["waits"]
+    assert served == len(CHARTS)
+    assert after["computing"] == 0
+
+
+def test_chart_errors(client, dashboard_capture):
+    response = client.get(
+        "/api/paquets/charts/unknown", query_string={"file": dashboard_capture}
+    )
+    assert response.status_code == 404
+    response = client.get(
+        "/api/paquets/charts/statistics", query_string={"file": "missing.json"}
+    )
+    assert response.status_code == 404
+    response = client.get(
+        "/api/paquets/charts/statistics", query_string={"file": "../capture.json"}
+    )
+    assert response.status_code == 404
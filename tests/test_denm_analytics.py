@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+def test_distance_analytics(capture):
+    packets = Packets(capture)
+    furthest = packets.get_furthest_station_distance()
+    distribution = packets.get_distance_distribution()
+    assert furthest
+    assert sum(data["count"] for data in distribution.values()) > 0
+    percentages = [data["percentage"] for data in distribution.values()]
+    assert sum(percentages) == pytest.approx(100)
+
+
+def test_distance_analytics_without_cams(tmp_path):
+    path = tmp_path / "capture.json"
+    write_export(path, kinds=["denm", "geo", "ipv6"])
+    packets = Packets(str(path))
+    assert packets.get_furthest_station_distance() == {}
+    assert packets.get_distance_distribution() == {}
+
+
+def test_distance_charts_without_cams(client, data_dir, capsys):
+    write_export(f"{data_dir}/capture.json", kinds=["denm", "geo"])
+    capsys.readouterr()
+    for name in ("furthest-distance", "distance-distribution"):
+        response = client.get(f"/api/paquets/charts/{name}?file=capture.json")
+        assert response.status_code == 200
+        assert json.loads(response.data) == {}
+    # Plus de traces de débogage à chaque requête
+    assert "Distance" not in capsys.readouterr().out
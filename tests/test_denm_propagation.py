@@ -0,0 +1,97 @@
+from collections import defaultdict
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+@pytest.fixture(params=[1, 5])
+def relayed(request, tmp_path):
+    """The packets of a capture with many relayed DENMs, and its collection"""
+    path = str(tmp_path / "capture.json")
+    write_export(path, count=600, seed=request.param, kinds=["cam", "denm", "denm"])
+    return Packets(path, use_sidecar=False).packets, Packets(path)
+
+
+def scan_messages(packets):
+    """Group the DENMs by station and sequence number, like the original scans"""
+    messages = defaultdict(lambda: defaultdict(list))
+    for packet in packets:
+        if isinstance(packet, DENM):
+            station = packet.originating_station_id
+            messages[station][packet.sequence_number].append(packet)
+    return messages
+
+
+def station_by_mac(packets):
+    """The station of the first CAM sent from each address"""
+    stations = {}
+    for packet in packets:
+        if isinstance(packet, CAM):
+            stations.setdefault(packet.src_mac, packet.stationID)
+    return stations
+
+
+def scan_distribution(packets, select, path=False):
+    """A distribution computed from scratch from the packet list
+
+    Args:
+        packets (List[Packet]): The packets
+        select (Callable[[List[DENM]], List[DENM]]): The receptions counted
+        path (bool): Whether to keep the relaying stations in order
+    """
+    stations = station_by_mac(packets)
+    data = defaultdict(list)
+    for station_id, sequences in scan_messages(packets).items():
+        for receptions in sequences.values():
+            selected = select(receptions)
+            relays = [stations.get(packet.src_mac) for packet in selected]
+            relays = [relay for relay in relays if relay]
+            entry = {"passage_details": dict.fromkeys(relays, 0)}
+            for relay in relays:
+                entry["passage_details"][relay] += 1
+            if path:
+                entry["hop_count"] = len(selected)
+                entry["passage_path"] = relays
+            else:
+                entry["hop_count"] = len(selected) - 1
+            data[station_id].append(entry)
+    return data
+
+
+def first_of_each(attribute):
+    """Keep the first reception of each value of an attribute"""
+
+    def select(receptions):
+        first = {}
+        for packet in receptions:
+            first.setdefault(getattr(packet, attribute), packet)
+        return list(first.values())
+
+    return select
+
+
+def test_distributions_match_the_scans(relayed):
+    packets, collection = relayed
+    assert collection.get_reception_distribution() == scan_distribution(
+        packets, first_of_each("seq_num")
+    )
+    assert collection.get_repetition_distribution() == scan_distribution(
+        packets, list
+    )
+    assert collection.get_hops_distribution() == scan_distribution(
+        packets, first_of_each("rhl"), path=True
+    )
+    assert collection.get_denm_stations() == list(scan_messages(packets))
+
+
+def test_relays_are_found(relayed):
+    packets, collection = relayed
+    hops = collection.get_hops_distribution()
+    assert any(entry["passage_path"] for entries in hops.values() for entry in entries)
+    assert sum(len(entries) for entries in hops.values()) == sum(
+        len(sequences) for sequences in scan_messages(packets).values()
+    )
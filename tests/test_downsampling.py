@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from app.utils.downsampling import LTTB, MINMAX, downsample, lttb, minmax
+
+
+def scan_lttb(x, y, target):
+    """Largest-Triangle-Three-Buckets, one point and one bucket at a time"""
+    count = len(x)
+    edges = [1 + bucket * (count - 2) // (target - 2) for bucket in range(target - 1)]
+    selected, previous = [0], 0
+    for bucket in range(target - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            following = range(end, edges[bucket + 2])
+            next_x = sum(x[i] for i in following) / len(following)
+            next_y = sum(y[i] for i in following) / len(following)
+        else:
+            next_x, next_y = x[-1], y[-1]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs(
+                (x[previous] - next_x) * (y[i] - y[previous])
+                - (x[previous] - x[i]) * (next_y - y[previous])
+            )
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        previous = best
+    return selected + [count - 1]
+
+
+def scan_minmax(y, target):
+    """The first minimum and maximum of each bucket, one bucket at a time"""
+    count, buckets = len(y), target // 2
+    selected = {0, count - 1}
+    for bucket in range(buckets):
+        start, end = bucket * count // buckets, (bucket + 1) * count // buckets
+        values = y[start:end]
+        if len(values):
+            selected.add(start + values.index(min(values)))
+            selected.add(start + values.index(max(values)))
+    return sorted(selected)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 1000))
+    y = rng.normal(0, 1, 1000).cumsum()
+    # Pic isolé sur un seul point
+    y[537] += 100
+    return x, y
+
+
+@pytest.mark.parametrize("target", [3, 4, 10, 84, 100, 333, 999])
+def test_lttb_matches_scan(series, target):
+    x, y = series
+    selected = lttb(x, y, target)
+    assert selected.tolist() == scan_lttb(x.tolist(), y.tolist(), target)
+    assert len(selected) == target
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+    assert (np.diff(selected) > 0).all()
+    assert 537 in selected
+
+
+@pytest.mark.parametrize("target", [2, 3, 10, 76, 100, 333, 999])
+def test_minmax_matches_scan(series, target):
+    x, y = series
+    selected = minmax(x, y, target)
+    assert selected.tolist() == scan_minmax(y.tolist(), target)
+    assert np.argmin(y) in selected and np.argmax(y) in selected
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+
+
+@pytest.mark.parametrize("method", [lttb, minmax])
+def test_short_series_unchanged(method):
+    assert method([1.0, 2.0, 3.0], [5.0, 1.0, 4.0], 10).tolist() == [0, 1, 2]
+
+
+def test_downsample_keeps_the_extremes_of_every_series(series):
+    x, y = series
+    other = -y[::-1]
+    selected = downsample(x, [y, other], 50, method=MINMAX)
+    for values in (y, other):
+        assert values[selected].min() == values.min()
+        assert values[selected].max() == values.max()
+    union = np.union1d(lttb(x, y, 50), lttb(x, other, 50))
+    assert downsample(x, [y, other], 50, method=LTTB).tolist() == union.tolist()
+    assert downsample(x, [y], None).tolist() == list(range(len(x)))
+
+
+def test_downsample_unknown_method(series):
+    with pytest.raises(ValueError):
+        downsample(*series, 10, method="mean")
@@ -0,0 +1,155 @@
+import csv
+import gzip
+import io
+import json
+import random
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.Packet import Packet
+from app.models.Packets import Packets
+from app.services import export
+from tests.conftest import write_export
+
+
+@pytest.fixture
+def export_capture(data_dir):
+    """A capture of the data directory, and its packets parsed from scratch"""
+    path = f"{data_dir}/capture.json"
+    write_export(path, count=700, seed=6)
+    return "capture.json", Packets(path, use_sidecar=False).packets
+
+
+def scan_csv(packets, fields):
+    """The CSV of some packets, written row by row"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, lineterminator="\n")
+    writer.writeheader()
+    for packet in packets:
+        values = packet.to_dict()
+        writer.writerow({field: values.get(field, "") for field in fields})
+    return buffer.getvalue()
+
+
+def get_export(client, url, gzipped=False, **args):
+    headers = {"Accept-Encoding": "gzip"} if gzipped else {}
+    response = client.get(url, query_string=args, headers=headers)
+    assert response.status_code == 200, response.data
+    assert response.is_streamed
+    return response
+
+
+def test_ndjson_export(app, client, export_capture):
+    filename, packets = export_capture
+    response = get_export(client, "/api/paquets/export", file=filename)
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == (
+        'attachment; filename="capture.ndjson"'
+    )
+    assert "Content-Encoding" not in response.headers
+    lines = response.data.decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(
+        app.json.dumps([packet.to_dict() for packet in packets])
+    )
+
+
+def test_csv_export(client, export_capture):
+    filename, packets = export_capture
+    response = get_export(client, "/api/paquets/export", file=filename, format="csv")
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"].endswith('capture.csv"')
+    # Colonnes de toutes les classes, cellules vides pour les autres
+    assert response.data.decode("utf-8") == scan_csv(packets, export.columns(Packet))
+
+    cams = [packet for packet in packets if isinstance(packet, CAM)]
+    response = get_export(
+        client, "/api/paquets/cam/export", file=filename, format="csv"
+    )
+    assert response.data.decode("utf-8") == scan_csv(cams, export.columns(CAM))
+
+    fields = ["frame_number", "time", "stationID"]
+    response = get_export(
+        client,
+        "/api/paquets/export",
+        file=filename,
+        format="csv",
+        fields=",".join(fields),
+    )
+    assert response.data.decode("utf-8") == scan_csv(packets, fields)
+
+
+def test_gzip_export(client, export_capture):
+    filename, _ = export_capture
+    for export_format in ("ndjson", "csv"):
+        plain = get_export(
+            client, "/api/paquets/export", file=filename, format=export_format
+        )
+        compressed = get_export(
+            client,
+            "/api/paquets/export",
+            gzipped=True,
+            file=filename,
+            format=export_format,
+        )
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert compressed.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(compressed.data) == plain.data
+        assert len(compressed.data) < len(plain.data)
+
+
+def test_gzip_chunks(monkeypatch):
+    monkeypatch.setattr(export, "GZIP_CHUNK_SIZE", 1024)
+    rnd = random.Random(0)
+    stream = [
+        "".join(rnd.choice("0123456789abcdef") for _ in range(500)).encode()
+        for _ in range(100)
+    ]
+    chunks = list(export.gzip_chunks(iter(stream)))
+    # Morceaux d'au moins GZIP_CHUNK_SIZE octets, sauf le dernier
+    assert len(chunks) > 1
+    assert all(len(chunk) >= 1024 for chunk in chunks[:-1])
+    assert gzip.decompress(b"".join(chunks)) == b"".join(stream)
+    assert gzip.decompress(b"".join(export.gzip_chunks(iter([])))) == b""
+
+
+def test_filtered_export(client, export_capture):
+    filename, packets = export_capture
+    mac = packets[0].src_mac
+    expected = [
+        packet.frame_number
+        for packet in packets
+        if isinstance(packet, DENM) and packet.src_mac == mac
+    ]
+    assert expected
+    for url, args in (
+        ("/api/paquets/export", {"type": "denm", "src_mac": mac}),
+        ("/api/paquets/denm/export", {"src_mac": mac}),
+    ):
+        response = get_export(client, url, file=filename, fields="frame_number", **args)
+        lines = response.data.decode("utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"frame_number": number} for number in expected
+        ]
+
+    # Aucun paquet : export vide, en-tête seul en CSV
+    response = get_export(client, "/api/paquets/export", file=filename, station="7")
+    assert response.data == b""
+    response = get_export(
+        client, "/api/paquets/export", file=filename, station="7", format="csv"
+    )
+    assert response.data.decode("utf-8").splitlines() == [
+        ",".join(export.columns(Packet))
+    ]
+
+
+def test_export_errors(client, export_capture):
+    filename, _ = export_capture
+    for args in ({"format": "xml"}, {"fields": "x"}, {"bbox": "1,2,3"}):
+        response = client.get(
+            "/api/paquets/export", query_string=dict(args, file=filename)
+        )
+        assert response.status_code == 400, args
+    response = client.get("/api/paquets/export", query_string={"file": "missing.json"})
+    assert response.status_code == 404
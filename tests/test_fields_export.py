@@ -0,0 +1,49 @@
+import pytest
+
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+def first_value(layers, name):
+    """The first occurrence of a field in exported layers, like -E occurrence=f"""
+    for key, value in layers.items():
+        if key == name and isinstance(value, str):
+            return value
+        if isinstance(value, dict):
+            found = first_value(value, name)
+            if found is not None:
+                return found
+    return None
+
+
+def write_fields_export(path, packets):
+    """Write the tshark -T fields export of exported packets"""
+    fields = Packets.tshark_fields()
+    with open(path, "w") as file:
+        file.write("\t".join(fields) + "\n")
+        for packet in packets:
+            layers = packet["_source"]["layers"]
+            values = [first_value(layers, field) or "" for field in fields]
+            file.write("\t".join(values) + "\n")
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets]
+
+
+@pytest.mark.parametrize("utc_offset", [0, 7200])
+def test_fields_export_matches_json(tmp_path, utc_offset):
+    packets = write_export(tmp_path / "capture.json", utc_offset=utc_offset)
+    write_fields_export(tmp_path / "capture.tsv", packets)
+    expected = Packets(str(tmp_path / "capture.json"), use_sidecar=False)
+    loaded = Packets(str(tmp_path / "capture.tsv"), use_sidecar=False)
+    assert {type(packet).__name__ for packet in loaded.packets} >= {"CAM", "DENM"}
+    assert attributes(loaded.packets) == attributes(expected.packets)
+
+
+def test_projection_covers_the_models():
+    fields = Packets.tshark_fields()
+    assert len(fields) == len(set(fields))
+    # Heure locale de la trame pour le fuseau de la capture, type d'en-tête GN
+    assert {"frame.time_epoch", "frame.time", "geonw.ch.htype"} <= set(fields)
+    assert {"cam.generationDeltaTime", "denm.detectionTime"} <= set(fields)
@@ -0,0 +1,35 @@
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+def source_position(packet):
+    """The GeoNetworking source position of an exported packet, in degrees"""
+    gnw = packet["_source"]["layers"].get("gnw", {})
+    for header in gnw.values():
+        if "geonw.src_pos_tree" in header:
+            position = header["geonw.src_pos_tree"]
+            return {
+                "latitude": int(position["geonw.src_pos.lat"]) / 1e7,
+                "longitude": int(position["geonw.src_pos.long"]) / 1e7,
+            }
+    return None
+
+
+def test_first_position(tmp_path):
+    path = tmp_path / "capture.json"
+    # Premier paquet IPv6 : sans position
+    packets = write_export(path, seed=13)
+    assert source_position(packets[0]) is None
+    expected = next(filter(None, map(source_position, packets)))
+
+    assert Packets(str(path)).get_first_position() == expected
+    # Lecture du sidecar : les objets des paquets ne sont pas construits
+    loaded = Packets(str(path))
+    assert loaded.get_first_position() == expected
+    assert loaded._packets is None
+
+
+def test_first_position_without_geonetworking(tmp_path):
+    path = tmp_path / "capture.json"
+    write_export(path, count=20, kinds=["ipv6"])
+    assert Packets(str(path)).get_first_position() is None
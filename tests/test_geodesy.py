@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.utils import geodesy
+
+
+def haversine(lat1, long1, lat2, long2):
+    """The scalar haversine of GeoNetworking before the geodesy module"""
+    lat1, long1, lat2, long2 = map(math.radians, [lat1, long1, lat2, long2])
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * geodesy.EARTH_RADIUS_KM
+
+
+@pytest.fixture
+def points():
+    """Random points, plus poles, the antimeridian and repeated points"""
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([rng.uniform(-90, 90, 500), [90, -90, 0, 0, 45, 45]])
+    lons = np.concatenate([rng.uniform(-180, 180, 500), [0, 0, 179.9, -179.9, 3, 3]])
+    return lats, lons
+
+
+def test_distance_matches_haversine(points):
+    lats, lons = points
+    for lat1, lon1, lat2, lon2 in zip(lats, lons, lats[::-1], lons[::-1]):
+        expected = haversine(lat1, lon1, lat2, lon2)
+        assert geodesy.distance(lat1, lon1, lat2, lon2) == pytest.approx(
+            expected, rel=1e-9, abs=1e-9
+        )
+    assert geodesy.distance(45, 3, 45, 3) == 0.0
+    assert geodesy.distance(0, 0, 0, 180) == pytest.approx(
+        math.pi * geodesy.EARTH_RADIUS_KM
+    )
+
+
+def test_pairwise_matches_distance(points):
+    lats, lons = points
+    expected = [
+        geodesy.distance(*pair) for pair in zip(lats, lons, lats[::-1], lons[::-1])
+    ]
+    result = geodesy.pairwise(lats, lons, lats[::-1], lons[::-1])
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(
+        geodesy.one_to_many(lats[0], lons[0], lats, lons),
+        [geodesy.distance(lats[0], lons[0], lat, lon) for lat, lon in zip(lats, lons)],
+        rtol=1e-12,
+        atol=1e-9,
+    )
+
+
+def test_pairwise_nan():
+    result = geodesy.pairwise(np.array([np.nan, 1.0]), np.array([0.0, 1.0]), 1.0, 1.0)
+    assert np.isnan(result[0]) and result[1] == 0.0
+
+
+def test_many_to_many_matrix(points):
+    lats, lons = points
+    matrix = geodesy.many_to_many(lats[:40], lons[:40], lats[20:], lons[20:])
+    others = list(zip(lats[20:], lons[20:]))
+    expected = [
+        [geodesy.distance(lat1, lon1, lat2, lon2) for lat2, lon2 in others]
+        for lat1, lon1 in zip(lats[:40], lons[:40])
+    ]
+    np.testing.assert_allclose(matrix, expected, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("cutoff", [0.0, 50.0, 800.0, 5000.0, 30000.0])
+def test_many_to_many_cutoff_matches_matrix(points, cutoff, monkeypatch):
+    lats, lons = points
+    # Petits blocs pour traverser plusieurs itérations
+    monkeypatch.setattr(geodesy, "CHUNK_SIZE", 64)
+    # Points proches autour des pôles et de l'antiméridien
+    lats2 = np.concatenate([lats, lats[-6:] - 0.001 * np.sign(lats[-6:] + 0.5)])
+    lons2 = np.concatenate([lons, -lons[-6:]])
+    firsts, seconds, distances = geodesy.many_to_many(
+        lats, lons, lats2, lons2, cutoff=cutoff
+    )
+    matrix = geodesy.many_to_many(lats, lons, lats2, lons2)
+    expected_firsts, expected_seconds = np.nonzero(matrix <= cutoff)
+    assert firsts.tolist() == expected_firsts.tolist()
+    assert seconds.tolist() == expected_seconds.tolist()
+    np.testing.assert_array_equal(distances, matrix[firsts, seconds])
+
+
+def test_bounding_margin_contains_radius():
+    rng = np.random.default_rng(1)
+    for lat, radius in [(0.0, 10.0), (49.25, 0.5), (-70.0, 300.0), (89.99, 5.0)]:
+        lat_margin, lon_margin = geodesy.bounding_margin(lat, radius)
+        lats = np.clip(lat + rng.uniform(-1, 1, 2000) * 2 * lat_margin, -90, 90)
+        lons = rng.uniform(-1, 1, 2000) * min(2 * lon_margin, 180)
+        inside = geodesy.one_to_many(lat, 0.0, lats, lons) <= radius
+        assert inside.any()
+        assert (np.abs(lats[inside] - lat) <= lat_margin).all()
+        assert (np.abs(lons[inside]) <= lon_margin).all()
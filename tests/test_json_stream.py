@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+
+from app.services.json_stream import item_offsets, iter_array_items, split_array
+
+
+def tshark_packet(number):
+    """Build a packet shaped like those of a tshark -T json export"""
+    return {
+        "_index": "packets-2024-06-12",
+        "_type": "doc",
+        "_score": None,
+        "_source": {
+            "layers": {
+                "frame": {"frame.number": str(number), "frame.len": "120"},
+                # Texte non ASCII : les offsets sont en octets, pas en caractères
+                "eth": {
+                    "eth.src": "02:00:00:00:00:%02x" % number,
+                    "note": "é€" * number,
+                },
+                "data": {"data.text": '{"_index": ' * (number % 3), "value": 1.5e-3},
+            }
+        },
+    }
+
+
+@pytest.fixture
+def export(tmp_path):
+    packets = [tshark_packet(number) for number in range(1, 41)]
+    path = tmp_path / "capture.json"
+    path.write_text(json.dumps(packets, indent=2, ensure_ascii=False), encoding="utf-8")
+    return str(path), packets
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_array_items_matches_json_load(export, chunk_size):
+    path, packets = export
+    with open(path, "rb") as file:
+        items = [item for _, item in iter_array_items(file, chunk_size=chunk_size)]
+    with open(path, encoding="utf-8") as file:
+        assert items == json.load(file) == packets
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+def test_iter_array_items_offsets(export, chunk_size):
+    path, packets = export
+    with open(path, "rb") as file:
+        data = file.read()
+        file.seek(0)
+        items = iter_array_items(file, chunk_size=chunk_size)
+        offsets = [offset for offset, _ in items]
+    decoder = json.JSONDecoder()
+    for offset, packet in zip(offsets, packets):
+        assert decoder.raw_decode(data[offset:].decode("utf-8"))[0] == packet
+    assert offsets == item_offsets(path)
+
+
+def test_iter_array_items_resumes_inside(export):
+    path, packets = export
+    offsets = item_offsets(path)
+    with open(path, "rb") as file:
+        file.seek(offsets[10])
+        items = [item for _, item in iter_array_items(file, chunk_size=5, inside=True)]
+    assert items == packets[10:]
+
+
+def test_iter_array_items_pipe():
+    stream = io.BufferedReader(io.BytesIO(b' [1, {"a": [2, 3]}, "x" ,-4.5e2] '))
+    items = [item for _, item in iter_array_items(stream, chunk_size=2)]
+    assert items == [1, {"a": [2, 3]}, "x", -450.0]
+
+
+@pytest.mark.parametrize("content", [b"", b"{}", b"[1 2]", b"[1, 2"])
+def test_iter_array_items_invalid(content):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array_items(io.BytesIO(content), chunk_size=2))
+
+
+def test_split_array_covers_every_packet(export):
+    path, packets = export
+    ranges = split_array(path, 6)
+    assert len(ranges) > 1
+    assert [start for start, _ in ranges] == [
+        offset for offset in item_offsets(path) if offset in dict(ranges)
+    ]
+    items = []
+    with open(path, "rb") as file:
+        for start, end in ranges:
+            file.seek(start)
+            for offset, item in iter_array_items(file, inside=True):
+                if offset >= end:
+                    break
+                items.append(item)
+    assert items == packets
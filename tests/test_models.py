@@ -0,0 +1,35 @@
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.Packet import to_number
+from app.models.Packets import Packets
+
+
+def test_packets_have_slots_only(capture):
+    packets = Packets(capture, use_sidecar=False).packets
+    assert {type(packet) for packet in packets} >= {CAM, DENM}
+    for packet in packets:
+        assert not hasattr(packet, "__dict__")
+        assert list(packet.attributes()) == type(packet).attribute_names()
+
+
+def test_numeric_fields_and_shared_strings(capture):
+    packets = Packets(capture, use_sidecar=False).packets
+    cams = [packet for packet in packets if isinstance(packet, CAM)]
+    for cam in cams:
+        assert isinstance(cam.frame_number, int)
+        assert isinstance(cam.stationID, int)
+        assert isinstance(cam.latitude, int) and isinstance(cam.timestamp, float)
+    # Adresses et piles de protocoles identiques : une seule chaîne par valeur
+    by_value = {}
+    for packet in packets:
+        for value in (packet.src_mac, packet.protocol):
+            assert by_value.setdefault(value, value) is value
+
+
+def test_to_number():
+    assert to_number("42") == 42
+    assert to_number("4.5") == 4.5
+    assert to_number(7) == 7
+    # Valeur non numérique : chaîne internée
+    text = to_number("".join(["0x", "8947"]))
+    assert text == "0x8947" and to_number("".join(["0x8", "947"])) is text
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+
+import pytest
+
+from app.models.Packets import Packets
+from app.services import sidecar
+from tests.conftest import write_export
+from tests.test_fields_export import write_fields_export
+
+PAGES = [(1, 10), (2, 10), (30, 10), (31, 10), (4, 7), (1, 1000), (0, 10), (3, 0)]
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets]
+
+
+def expected_page(packets, page, per_page):
+    if page < 1 or per_page < 1:
+        return []
+    return packets[(page - 1) * per_page : page * per_page]
+
+
+@pytest.fixture(params=["json", "tsv"])
+def export_file(request, tmp_path):
+    """A tshark JSON export, then the fields export of the same packets"""
+    path = str(tmp_path / "capture.json")
+    packets = write_export(path, count=305, seed=8)
+    if request.param == "tsv":
+        path = str(tmp_path / "capture.tsv")
+        write_fields_export(path, packets)
+    return path
+
+
+def test_pages_match_the_slices(export_file):
+    packets = Packets(export_file, use_sidecar=False).packets
+    reader = Packets(export_file, load=False)
+    assert reader.count_packets() == len(packets)
+    for page, per_page in PAGES:
+        assert attributes(reader.read_packets(page, per_page)) == attributes(
+            expected_page(packets, page, per_page)
+        ), (page, per_page)
+
+
+def test_offsets_are_kept(export_file, tmp_path):
+    assert sidecar.load_offsets(export_file) is None
+    offsets = Packets(export_file, load=False).offsets.tolist()
+    assert sidecar.load_offsets(export_file).tolist() == offsets
+    # Chaque offset est le début d'un paquet : objet JSON ou ligne du TSV
+    with open(export_file, "rb") as file:
+        data = file.read()
+    assert offsets == sorted(offsets)
+    for offset in offsets:
+        if export_file.endswith(".json"):
+            assert data[offset : offset + 1] == b"{"
+        else:
+            assert data[offset - 1 : offset] == b"\n"
+
+    # Nouvel export au même chemin : l'index est reconstruit
+    packets = write_export(str(tmp_path / "new.json"), count=120, seed=9)
+    if export_file.endswith(".json"):
+        os.replace(tmp_path / "new.json", export_file)
+    else:
+        write_fields_export(export_file, packets)
+    assert sidecar.load_offsets(export_file) is None
+    assert Packets(export_file, load=False).count_packets() == 120
+
+
+def test_export_without_index_objects(tmp_path):
+    path = str(tmp_path / "capture.json")
+    packets = write_export(path, count=120, seed=2)
+    expected = attributes(Packets(path, use_sidecar=False).packets)
+    # Autre version de tshark : pas d'objet « _index »
+    for packet in packets:
+        del packet["_index"]
+    with open(path, "w") as file:
+        json.dump(packets, file, indent=2)
+    reader = Packets(path, load=False)
+    assert reader.count_packets() == 120
+    assert attributes(reader.read_packets(3, 25)) == expected[50:75]
+
+
+def test_misleading_index_object(tmp_path, capsys):
+    path = str(tmp_path / "capture.json")
+    packets = write_export(path, count=120, seed=3)
+    expected = attributes(Packets(path, use_sidecar=False).packets)
+    # Objet « _index » imbriqué dans un paquet, au début d'une ligne après une
+    # virgule : pris pour le début d'un paquet par la recherche
+    packets[60]["_source"]["layers"]["extra"] = [0, {"_index": "x"}]
+    with open(path, "w") as file:
+        json.dump(packets, file, indent=2)
+    reader = Packets(path, load=False)
+    assert attributes(reader.read_packets(4, 20)) == expected[60:80]
+    assert "Rebuilding the offset index" in capsys.readouterr().out
+    assert reader.count_packets() == 120
+    assert attributes(reader.read_packets(6, 20)) == expected[100:120]
+
+
+def test_packets_view(client, data_dir):
+    path = os.path.join(data_dir, "capture.json")
+    write_export(path, count=95, seed=4)
+    packets = Packets(path, use_sidecar=False).packets
+    for page in (1, 5, 10):
+        response = client.get(f"/packets/capture.json?page={page}")
+        assert response.status_code == 200
+        html = response.data.decode("utf-8")
+        assert "Total: 95 paquets" in html
+        numbers = re.findall(r'<td class="px-6 py-4">(\d+)</td>', html)
+        assert [int(number) for number in numbers] == [
+            packet.frame_number for packet in expected_page(packets, page, 10)
+        ]
+    assert client.get("/packets/missing.json").status_code == 404
@@ -0,0 +1,77 @@
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.GeoNetworking import GeoNetworking
+from app.models.Packet import Packet
+from app.models.Packets import Packets
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets]
+
+
+@pytest.fixture(params=["json", "sidecar"])
+def loaded(request, capture):
+    """The capture parsed from the JSON export, then read from its sidecar"""
+    Packets(capture)
+    scan = Packets(capture, use_sidecar=False).packets
+    packets = Packets(capture, use_sidecar=request.param == "sidecar")
+    assert (packets._packets is None) == (request.param == "sidecar")
+    return scan, packets
+
+
+def test_statistics_and_types(loaded):
+    scan, packets = loaded
+    count = {
+        packet_type: sum(isinstance(packet, packet_type) for packet in scan)
+        for packet_type in (Packet, GeoNetworking, CAM, DENM)
+    }
+    assert packets.statistics() == {
+        "total_packets": len(scan),
+        "total_cam": count[CAM],
+        "total_denm": count[DENM],
+        "total_geo": count[GeoNetworking],
+        "total_other": count[Packet] - (count[CAM] + count[DENM]),
+    }
+    assert sorted(packets.get_packet_types()) == sorted(
+        {type(packet).__name__ for packet in scan}
+    )
+    for packet_type in (Packet, GeoNetworking, CAM, DENM):
+        assert packets.count_type(packet_type) == count[packet_type]
+
+
+def test_selections(loaded):
+    scan, packets = loaded
+    for packet_type in (GeoNetworking, CAM, DENM):
+        expected = [packet for packet in scan if isinstance(packet, packet_type)]
+        assert attributes(packets.get_packets_by_type(packet_type)) == attributes(
+            expected
+        )
+    for mac in {packet.src_mac for packet in scan[:20]}:
+        expected = [packet for packet in scan if packet.src_mac == mac]
+        assert attributes(packets.get_packets_by_src_mac(mac)) == attributes(expected)
+    for mac in {packet.dst_mac for packet in scan}:
+        expected = [packet for packet in scan if packet.dst_mac == mac]
+        assert attributes(packets.get_packets_by_dst_mac(mac)) == attributes(expected)
+    assert packets.get_packets_by_src_mac("02:ff:ff:ff:ff:ff") == []
+
+
+def test_pages(loaded):
+    scan, packets = loaded
+    for page in (0, 1, 2, 7, 100):
+        expected = scan[(page - 1) * 40 : page * 40]
+        assert attributes(packets.get_packets(page, 40)) == attributes(expected)
+
+
+def test_point_lookups(loaded):
+    scan, packets = loaded
+    for packet in scan[::25] + scan[-1:]:
+        for number in (packet.frame_number, str(packet.frame_number)):
+            found = packets.get_packet(number)
+            assert (type(found), found.attributes()) == (
+                type(packet),
+                packet.attributes(),
+            )
+    assert packets.get_packet(0) is None
+    assert packets.get_packet(len(scan) + 1) is None
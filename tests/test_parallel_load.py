@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from app.models.Packets import Packets
+from tests.conftest import write_export
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets.packets]
+
+
+@pytest.fixture
+def serial(capture):
+    return attributes(Packets(capture, use_sidecar=False))
+
+
+def test_parallel_load_matches_serial(capture, serial):
+    assert attributes(Packets(capture, workers=2, use_sidecar=False)) == serial
+
+
+def test_parallel_load_falls_back_to_serial(tmp_path, capsys):
+    # Des objets {"_index": ...} imbriqués attirent les points de découpe au
+    # milieu des paquets
+    path = tmp_path / "capture.json"
+    packets = write_export(path, count=60)
+    for packet in packets:
+        layers = packet["_source"]["layers"]
+        layers["data"] = {"data.items": [{"_index": i} for i in range(50)]}
+    path.write_text(json.dumps(packets, indent=2))
+    expected = attributes(Packets(str(path), use_sidecar=False))
+
+    loaded = Packets(str(path), workers=2, use_sidecar=False)
+    assert attributes(loaded) == expected
+    assert len(expected) == 60
+    assert "decoding it serially" in capsys.readouterr().out
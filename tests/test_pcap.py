@@ -0,0 +1,199 @@
+import struct
+import time
+
+import pytest
+
+from app.models.Packets import Packets
+from app.services import PCAPtoJSON
+from tests.conftest import write_export
+
+
+class BitWriter:
+    """Write constrained whole numbers in UPER, the inverse of BitReader"""
+
+    def __init__(self):
+        self.value = 0
+        self.size = 0
+
+    def write(self, value, bits, minimum=0):
+        self.value = (self.value << bits) | (value - minimum)
+        self.size += bits
+
+    def to_bytes(self):
+        padding = -self.size % 8
+        return (self.value << padding).to_bytes((self.size + padding) // 8, "big")
+
+
+def mac_bytes(address):
+    return bytes(int(part, 16) for part in address.split(":"))
+
+
+def write_reference_position(writer, position):
+    writer.write(int(position["its.latitude"]), 31, -900000000)
+    writer.write(int(position["its.longitude"]), 32, -1800000000)
+    for value in position["its.positionConfidenceEllipse_element"].values():
+        writer.write(int(value), 12)
+    altitude = position["its.altitude_element"]
+    writer.write(int(altitude["its.altitudeValue"]), 20, -100000)
+    writer.write(int(altitude["its.altitudeConfidence"]), 4)
+
+
+def encode_its(its):
+    """Encode the ITS PDU header and the CAM or DENM of exported layers"""
+    station_id = int(its["its.ItsPduHeader_element"]["its.stationId"])
+    writer = BitWriter()
+    if "cam.CamPayload_element" in its:
+        message_id = PCAPtoJSON.ITS_MESSAGE_CAM
+        cam = its["cam.CamPayload_element"]
+        basic = cam["cam.camParameters_element"]["cam.basicContainer_element"]
+        writer.write(int(cam["cam.generationDeltaTime"]), 16)
+        writer.write(0, 4)  # Extensions, sans conteneur optionnel
+        writer.write(int(basic["its.stationType"]), 8)
+        write_reference_position(writer, basic["its.referencePosition_element"])
+    elif "denm.DenmPayload_element" in its:
+        message_id = PCAPtoJSON.ITS_MESSAGE_DENM
+        management = its["denm.DenmPayload_element"]["denm.management_element"]
+        action = management["denm.actionId_element"]
+        writer.write(0, 9)  # Conteneurs et champs optionnels absents
+        writer.write(int(action["its.originatingStationId"]), 32)
+        writer.write(int(action["its.sequenceNumber"]), 16)
+        writer.write(int(management["denm.detectionTime"]), 42)
+        writer.write(int(management["denm.referenceTime"]), 42)
+        write_reference_position(writer, management["denm.eventPosition_element"])
+        writer.write(int(management["denm.stationType"]), 8)
+    else:
+        message_id = 3  # Autre message ITS : en-tête seul
+    header = struct.pack(">BBI", 2, message_id, station_id)
+    return header + writer.to_bytes()
+
+
+def encode_frame(layers):
+    """Encode the layers of a tshark export as an Ethernet frame"""
+    eth = layers["eth"]
+    eth_type = int(eth["eth.type"], 16)
+    data = mac_bytes(eth["eth.dst"]) + mac_bytes(eth["eth.src"])
+    data += struct.pack(">H", eth_type)
+    if eth_type != PCAPtoJSON.ETHERTYPE_GEONETWORKING:
+        return data + bytes(40)
+
+    gnw = layers["gnw"]
+    rhl = int(gnw["geonw.bh"]["geonw.bh.rhl"])
+    header_type = int(gnw["geonw.ch"]["geonw.ch.htype"], 16)
+    data += bytes([0x11, 0, 0x1A, rhl])
+    its = encode_its(layers["its"])
+    data += struct.pack(">BBBBHBB", 0x20, header_type, 0, 0, len(its) + 4, 1, 0)
+    extended = gnw.get("geonw.gbc") or gnw["geonw.tsb"]
+    position = extended["geonw.src_pos_tree"]
+    vector = struct.pack(
+        ">QIiiHH",
+        0,
+        0,
+        int(position["geonw.src_pos.lat"]),
+        int(position["geonw.src_pos.long"]),
+        int(position["geonw.src_pos.speed"]) & 0x7FFF,
+        0,
+    )
+    if "geonw.gbc" in gnw:
+        data += struct.pack(">HH", int(extended["geonw.seq_num"]), 0)
+        data += vector + bytes(16)  # Zone de destination
+    else:
+        data += vector + bytes(4)
+    return data + struct.pack(">HH", 2001, 0) + its
+
+
+def frame_records(packets):
+    """The timestamp, original length and bytes of each exported packet"""
+    for packet in packets:
+        layers = packet["_source"]["layers"]
+        seconds, fraction = layers["frame"]["frame.time_epoch"].split(".")
+        yield (
+            int(seconds),
+            int(fraction),
+            int(layers["frame"]["frame.len"]),
+            encode_frame(layers),
+        )
+
+
+def write_pcap(path, packets):
+    with open(path, "wb") as file:
+        file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for seconds, nanoseconds, original, data in frame_records(packets):
+            file.write(
+                struct.pack("<IIII", seconds, nanoseconds // 1000, len(data), original)
+            )
+            file.write(data)
+
+
+def pcapng_block(block_type, body):
+    body += bytes(-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+def write_pcapng(path, packets):
+    with open(path, "wb") as file:
+        header = struct.pack("<IHHq", PCAPtoJSON.PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1)
+        file.write(pcapng_block(PCAPtoJSON.PCAPNG_SECTION_HEADER, header))
+        # Horodatage en nanosecondes (if_tsresol = 9)
+        options = struct.pack("<HHB3xHH", 9, 1, 9, 0, 0)
+        file.write(pcapng_block(1, struct.pack("<HHI", 1, 0, 65535) + options))
+        for seconds, nanoseconds, original, data in frame_records(packets):
+            units = seconds * 1_000_000_000 + nanoseconds
+            header = struct.pack(
+                "<IIIII", 0, units >> 32, units & 0xFFFFFFFF, len(data), original
+            )
+            file.write(pcapng_block(6, header + data))
+
+
+@pytest.fixture
+def paris(monkeypatch):
+    """frame.time is written in the local time zone, here CEST"""
+    monkeypatch.setenv("TZ", "Europe/Paris")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets]
+
+
+@pytest.mark.parametrize("write", [write_pcap, write_pcapng])
+def test_native_reader_matches_tshark(tmp_path, paris, write):
+    export = tmp_path / "export.json"
+    packets = write_export(export, utc_offset=7200)
+    write(tmp_path / "capture.pcap", packets)
+    converted = tmp_path / "capture.json"
+    count = PCAPtoJSON.convert(str(tmp_path / "capture.pcap"), str(converted))
+    assert count == len(packets)
+
+    expected = Packets(str(export), use_sidecar=False).packets
+    native = Packets(str(converted), use_sidecar=False).packets
+    assert {type(packet).__name__ for packet in native} >= {"CAM", "DENM"}
+    for packet, reference in zip(native, expected):
+        if reference.protocol.endswith(":ipv6:icmpv6"):
+            # Sans tshark, les couches au-delà d'Ethernet ne sont pas décodées
+            assert packet.protocol == "eth:ethertype:ipv6"
+            packet.protocol = reference.protocol
+    assert attributes(native) == attributes(expected)
+
+
+def test_truncated_its_message(tmp_path):
+    packets = write_export(tmp_path / "export.json", count=40, kinds=["cam"])
+    layers = packets[0]["_source"]["layers"]
+    frame = encode_frame(layers)[:-10]
+    decoded, needs_tshark = PCAPtoJSON.decode_frame(1, 1, 1718186400, 0, 200, frame)
+    # En-tête ITS conservé, message tronqué ignoré
+    assert not needs_tshark
+    assert decoded["its"]["its.ItsPduHeader_element"]["its.stationId"] == str(
+        layers["its"]["its.ItsPduHeader_element"]["its.stationId"]
+    )
+    assert "cam.CamPayload_element" not in decoded["its"]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "capture.pcap"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        list(PCAPtoJSON.iter_layers(str(path)))
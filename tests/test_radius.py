@@ -0,0 +1,37 @@
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.Packets import Packets
+from app.utils import geodesy
+
+# Points autour de Valenciennes, en degrés
+POINTS = [(50.35, 3.52), (50.351, 3.521), (50.3, 3.6), (48.85, 2.35)]
+
+
+@pytest.mark.parametrize("radius", [0.1, 1.0, 10.0, 300.0])
+def test_radius_methods_agree(capture, radius):
+    packets = Packets(capture).packets
+    cams = [packet for packet in packets if isinstance(packet, CAM)]
+    denms = [packet for packet in packets if isinstance(packet, DENM)]
+    assert cams and denms
+    for lat, long in POINTS:
+        for cam in cams:
+            # Le générateur place la position de référence sur celle de l'émetteur
+            assert cam.latitude == cam.src_pos_lat
+            inside = cam.is_within_radius(lat, long, radius)
+            assert cam.is_within_radius_cam(lat, long, radius) == inside
+            assert inside == (cam.calculate_distance(lat, long) <= radius)
+        for denm in denms:
+            distance = geodesy.distance(
+                float(denm.latitude) / 1e7, float(denm.longitude) / 1e7, lat, long
+            )
+            assert denm.is_within_radius_denm(lat, long, radius) == (distance <= radius)
+
+
+def test_radius_of_a_cam_position(capture):
+    cam = next(packet for packet in Packets(capture).packets if isinstance(packet, CAM))
+    lat, long = float(cam.latitude) / 1e7, float(cam.longitude) / 1e7
+    assert cam.is_within_radius(lat, long, 0.001)
+    assert cam.is_within_radius_cam(lat, long, 0.001)
+    assert not cam.is_within_radius_cam(lat + 0.1, long, 1.0)
@@ -0,0 +1,117 @@
+import re
+
+import pytest
+
+from app.models.Packets import Packets
+from app.models.SearchIndex import CACHED_SEARCHES, FIELDS, _required_literal
+from tests.conftest import write_export
+
+TERMS = [
+    "",
+    "Source Speed: 1",
+    "gnw:btpb",
+    "02:00:00:00:00:0a",
+    "RHL: 9",
+    "ipv6",
+    "absent",
+    r"Frame Length: 1\d\d,",
+    r"^From: 02:00:00:00:00:0[1-3]",
+    r"Speed: (1|2)\b",
+    r"Source Position: \(50349",
+    r"RHL: [0-9]+, Source",
+    r"[Ee]thernet Type: 0x8947",
+    r"(?i)ETHERTYPE:IPV6",
+    r"To: ff+:",
+    r"x{0}Frame",
+    r"Length: 1\d{2}, Eth",
+    "0x86dd",
+]
+
+
+@pytest.fixture(scope="module")
+def searched(tmp_path_factory):
+    """The packets of a capture of several index blocks, and its collection"""
+    path = str(tmp_path_factory.mktemp("search") / "capture.json")
+    write_export(path, count=900, seed=7)
+    return Packets(path, use_sidecar=False).packets, Packets(path)
+
+
+def numbers(packets):
+    return [packet.frame_number for packet in packets]
+
+
+def scan_field(packets, field, value):
+    """The packets with a value in a field, read from their attributes"""
+    found = []
+    for packet in packets:
+        for name in FIELDS[field]:
+            attribute = getattr(packet, name, None)
+            if attribute is None:
+                continue
+            if field == "protocol":
+                matched = value in attribute.split(":")
+            elif field == "mac":
+                matched = attribute == value.lower()
+            else:
+                matched = str(attribute) == value
+            if matched:
+                found.append(packet)
+                break
+    return found
+
+
+@pytest.mark.parametrize("term", TERMS)
+def test_search_matches_the_scan(searched, term):
+    packets, collection = searched
+    expected = [packet for packet in packets if re.search(term, packet.summary())]
+    assert numbers(collection.search_packets(term)) == numbers(expected)
+    assert collection.count_search_results(term) == len(expected)
+    for page in (1, 2, 5):
+        assert numbers(collection.search_packets(term, page, 40)) == numbers(
+            expected[(page - 1) * 40 : page * 40]
+        )
+
+
+def test_field_searches(searched):
+    packets, collection = searched
+    cases = [
+        ("mac", "02:00:00:00:00:0A"),
+        ("mac", "ff:ff:ff:ff:ff:ff"),
+        ("protocol", "its"),
+        ("protocol", "ipv6"),
+        ("protocol", "btp"),
+        ("station", "1004"),
+        ("station", str(packets[0].stationID)),
+        ("seq", "12"),
+        ("seq", "0"),
+    ]
+    for field, value in cases:
+        expected = numbers(scan_field(packets, field, value))
+        assert numbers(collection.search_packets(f"{field}:{value}")) == expected
+    assert collection.search_packets("protocol:btp") == []
+    assert collection.search_packets("mac:ff:ff:ff:ff:ff:ff")
+
+
+def test_required_literal():
+    assert _required_literal(r"Frame Length: 1\d\d,") == "Frame Length: 1"
+    assert _required_literal(r"ab?cdef") == "cdef"
+    assert _required_literal(r"(abc)de+fgh") == "fgh"
+    assert _required_literal(r"x|yyyy") == ""
+    assert _required_literal(r"[abc]{2}") == ""
+
+
+def test_kept_results(searched):
+    _, collection = searched
+    index = collection.search_index
+    first = collection.search_packets("RHL: 2")
+    assert "RHL: 2" in index
+    assert numbers(collection.search_packets("RHL: 2")) == numbers(first)
+    for number in range(CACHED_SEARCHES):
+        collection.search_packets(f"Frame Length: {number}")
+    assert "RHL: 2" not in index
+
+
+def test_invalid_expression(searched):
+    _, collection = searched
+    with pytest.raises(re.error):
+        collection.search_packets("Speed: (")
@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+
+from app.models.Packets import Packets
+from app.services import sidecar
+from tests.conftest import write_export
+
+
+def attributes(packets):
+    return [(type(packet), packet.attributes()) for packet in packets.packets]
+
+
+def test_sidecar_round_trip(capture):
+    expected = attributes(Packets(capture, use_sidecar=False))
+    assert sidecar.load_table(capture) is None
+
+    written = Packets(capture)
+    assert sidecar.load_table(capture) is not None
+    loaded = Packets(capture)
+    # Colonnes projetées en mémoire, objets construits à la demande
+    assert loaded._packets is None
+    assert isinstance(loaded.table.types, np.memmap)
+    assert attributes(loaded) == attributes(written) == expected
+
+
+def test_fingerprint_changes_with_the_content(capture):
+    before = sidecar.fingerprint(capture)
+    assert sidecar.fingerprint(capture) == before
+
+    # Même taille et même date de modification, un octet différent au milieu
+    stat = os.stat(capture)
+    with open(capture, "r+b") as file:
+        file.seek(stat.st_size // 2)
+        byte = file.read(1)
+        file.seek(stat.st_size // 2)
+        file.write(b"0" if byte != b"0" else b"1")
+    os.utime(capture, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    after = sidecar.fingerprint(capture)
+    assert after["size"] == before["size"]
+    assert after["mtime_ns"] == before["mtime_ns"]
+    assert after["hash"] != before["hash"]
+
+
+def test_stale_sidecar_is_rebuilt(tmp_path):
+    path = str(tmp_path / "capture.json")
+    write_export(path, count=100, seed=1)
+    assert len(Packets(path).packets) == 100
+
+    # Nouvel export au même chemin : le sidecar ne correspond plus
+    write_export(path, count=120, seed=2)
+    assert sidecar.load_table(path) is None
+    reloaded = Packets(path)
+    assert reloaded._packets is not None
+    assert attributes(reloaded) == attributes(Packets(path, use_sidecar=False))
+    assert len(Packets(path).table) == 120
+
+
+def test_sidecar_of_another_format_version(capture):
+    Packets(capture)
+    meta_path = os.path.join(sidecar.sidecar_path(capture), "meta.json")
+    with open(meta_path) as file:
+        meta = json.load(file)
+    meta["version"] = sidecar.FORMAT_VERSION - 1
+    with open(meta_path, "w") as file:
+        json.dump(meta, file)
+    assert sidecar.load_table(capture) is None
+    assert Packets(capture)._packets is not None
+
+
+def test_damaged_sidecar_is_ignored(capture):
+    expected = attributes(Packets(capture, use_sidecar=False))
+    Packets(capture)
+    os.remove(os.path.join(sidecar.sidecar_path(capture), "column_0.npy"))
+    assert sidecar.load_table(capture) is None
+    assert attributes(Packets(capture)) == expected
+
+
+def test_offsets_round_trip(capture):
+    assert sidecar.load_offsets(capture) is None
+    sidecar.save_offsets(capture, [0, 10, 25])
+    assert sidecar.load_offsets(capture).tolist() == [0, 10, 25]
+    sidecar.save_offsets(capture, [])
+    assert sidecar.load_offsets(capture).tolist() == []
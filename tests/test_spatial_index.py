@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.Packets import Packets
+from app.models.SpatialIndex import POSITIONS, SpatialIndex
+from app.utils import geodesy
+
+# Points autour de Valenciennes, en degrés
+POINTS = [(50.35, 3.52), (50.3505, 3.5195), (50.36, 3.5), (48.85, 2.35)]
+
+
+def position(packet, positions):
+    """The position of a packet in degrees, None if it has none"""
+    lat, lon = (getattr(packet, name, None) for name in POSITIONS[positions])
+    if lat is None or lon is None:
+        return None
+    return float(lat) / 1e7, float(lon) / 1e7
+
+
+def scan_within(packets, positions, lat, lon, radius):
+    return [
+        packet.frame_number
+        for packet in packets
+        if position(packet, positions)
+        and geodesy.distance(*position(packet, positions), lat, lon) <= radius
+    ]
+
+
+def scan_in_box(packets, positions, min_lat, min_lon, max_lat, max_lon):
+    numbers = []
+    for packet in packets:
+        point = position(packet, positions)
+        if point is None:
+            continue
+        lat, lon = point
+        if min_lon <= max_lon:
+            inside_lon = min_lon <= lon <= max_lon
+        else:
+            inside_lon = lon >= min_lon or lon <= max_lon
+        if min_lat <= lat <= max_lat and inside_lon:
+            numbers.append(packet.frame_number)
+    return numbers
+
+
+def scan_nearest(packets, positions, lat, lon, count):
+    distances = [
+        (geodesy.distance(*position(packet, positions), lat, lon), packet.frame_number)
+        for packet in packets
+        if position(packet, positions)
+    ]
+    return sorted(distances)[:count]
+
+
+def numbers(packets):
+    return [packet.frame_number for packet in packets]
+
+
+@pytest.mark.parametrize("positions", list(POSITIONS))
+def test_queries_match_the_scans(capture, positions):
+    collection = Packets(capture)
+    packets = Packets(capture, use_sidecar=False).packets
+    for lat, lon in POINTS:
+        for radius in (0.05, 0.5, 2.0, 500.0):
+            assert numbers(
+                collection.get_packets_by_location(lat, lon, radius, positions)
+            ) == scan_within(packets, positions, lat, lon, radius)
+        for count in (1, 5, 40, 10_000):
+            nearest = collection.get_nearest_packets(lat, lon, count, positions)
+            expected = scan_nearest(packets, positions, lat, lon, count)
+            assert [packet.frame_number for packet, _ in nearest] == [
+                number for _, number in expected
+            ]
+            assert [distance for _, distance in nearest] == pytest.approx(
+                [distance for distance, _ in expected]
+            )
+    for box in [(50.348, 3.515, 50.352, 3.525), (50.0, 3.0, 51.0, 4.0), (0, 0, 1, 1)]:
+        assert numbers(collection.get_packets_in_area(*box, positions)) == (
+            scan_in_box(packets, positions, *box)
+        )
+
+
+@pytest.mark.parametrize("cell_size_km", [0.1, 50.0, 5000.0])
+def test_index_over_the_whole_earth(make_table, cell_size_km):
+    rnd = random.Random(cell_size_km)
+    specs = []
+    for number in range(1, 600):
+        lat, lon = rnd.uniform(-90, 90), rnd.uniform(-180, 180)
+        if number % 7 == 0:
+            # Positions proches des pôles et de l'antiméridien
+            lat, lon = rnd.choice([89.99, -89.99, 0.0]), rnd.choice([179.99, -179.99])
+        values = {"frame_number": number}
+        if number % 11:
+            values.update(latitude=round(lat * 1e7), longitude=round(lon * 1e7))
+        specs.append((CAM, values))
+    table = make_table(specs)
+    packets = table.materialize(range(len(specs)))
+    index = SpatialIndex.from_table(table, "latitude", "longitude", cell_size_km)
+    assert len(index) == sum(1 for packet in packets if position(packet, "reference"))
+
+    def frame_numbers(rows):
+        return [packets[row].frame_number for row in rows.tolist()]
+
+    for lat, lon in [(0.0, 179.9), (89.9, 10.0), (-45.0, -60.0), (10.0, 20.0)]:
+        for radius in (10.0, 1000.0, 8000.0):
+            assert frame_numbers(index.within(lat, lon, radius)) == scan_within(
+                packets, "reference", lat, lon, radius
+            )
+        rows, distances = index.nearest(lat, lon, 25)
+        expected = scan_nearest(packets, "reference", lat, lon, 25)
+        assert frame_numbers(rows) == [number for _, number in expected]
+        assert distances.tolist() == pytest.approx([d for d, _ in expected])
+    for box in [(-10, 170, 10, -170), (-90, -180, 90, 180), (80, -50, 90, 50)]:
+        assert frame_numbers(index.in_box(*box)) == scan_in_box(
+            packets, "reference", *box
+        )
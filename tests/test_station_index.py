@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.GeoNetworking import GeoNetworking
+from app.models.StationIndex import StationIndex
+
+MACS = [f"02:00:00:00:00:{number:02x}" for number in range(12)]
+
+
+@pytest.fixture
+def capture(make_table):
+    """A capture where stations change MAC address and addresses are reused"""
+    rnd = random.Random(3)
+    specs = []
+    for number in range(400):
+        # Pseudonymes : la station derrière une adresse change au fil du temps
+        mac = rnd.choice(MACS)
+        station = str(1000 + (MACS.index(mac) + number // 100) % 8)
+        time = 1718186400 + number * 0.1 + rnd.choice([0.0, -0.05])
+        packet_type = rnd.choice([CAM, CAM, CAM, DENM, GeoNetworking])
+        values = {"src_mac": mac, "timestamp": time}
+        if packet_type is not GeoNetworking:
+            values["stationID"] = station
+        if mac == MACS[-1] and packet_type is CAM:
+            # Relais qui n'envoie jamais de CAM, comme une RSU
+            packet_type = DENM
+        specs.append((packet_type, values))
+    return specs, make_table(specs)
+
+
+def scan_station(specs, mac_address):
+    """The station of the first CAM from an address, by a scan of the capture"""
+    for packet_type, values in specs:
+        if packet_type is CAM and values["src_mac"] == mac_address:
+            return values["stationID"]
+    return None
+
+
+def scan_intervals(specs, mac_address):
+    """The [station, first, last] intervals of an address, in order of first CAM"""
+    intervals = {}
+    for packet_type, values in specs:
+        if packet_type is CAM and values["src_mac"] == mac_address:
+            interval = intervals.setdefault(values["stationID"], [None, None])
+            time = values["timestamp"]
+            interval[0] = time if interval[0] is None else min(interval[0], time)
+            interval[1] = time if interval[1] is None else max(interval[1], time)
+    return [[station, first, last] for station, (first, last) in intervals.items()]
+
+
+def test_station_matches_scan(capture):
+    specs, table = capture
+    index = StationIndex.from_table(table)
+    for mac in MACS + ["ff:ff:ff:ff:ff:ff"]:
+        assert index.station(mac) == scan_station(specs, mac)
+    assert index.station(MACS[-1]) is None
+
+
+def test_station_at_time_matches_scan(capture):
+    specs, table = capture
+    index = StationIndex.from_table(table)
+    reused = 0
+    for mac in MACS[:-1]:
+        intervals = scan_intervals(specs, mac)
+        assert index.intervals[mac] == intervals
+        reused += len(intervals) > 1
+        for time in [values["timestamp"] for _, values in specs] + [0.0, 2e9]:
+            # Intervalle contenant le temps, sinon le plus proche (premier si égalité)
+            gaps = [max(first - time, time - last, 0.0) for _, first, last in intervals]
+            expected = intervals[gaps.index(min(gaps))][0]
+            assert index.station(mac, time) == expected
+    assert reused
+
+
+def test_mac_addresses_matches_scan(capture):
+    specs, table = capture
+    index = StationIndex.from_table(table)
+    for station in {values.get("stationID") for _, values in specs} - {None}:
+        expected = sorted(
+            (
+                (mac, first, last)
+                for mac in MACS
+                for used_by, first, last in scan_intervals(specs, mac)
+                if used_by == station
+            ),
+            key=lambda entry: entry[1],
+        )
+        assert index.mac_addresses(station) == expected
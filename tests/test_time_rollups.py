@@ -0,0 +1,121 @@
+import math
+from collections import Counter, defaultdict
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.Packets import Packets
+from app.models.TimeRollups import CATEGORIES, RESOLUTIONS
+from tests.conftest import write_export
+
+
+@pytest.fixture(params=[0, 7200])
+def minutes(request, tmp_path):
+    """A capture spanning a few minutes, in UTC then in CEST"""
+    path = str(tmp_path / "capture.json")
+    write_export(path, count=1500, seed=3, utc_offset=request.param)
+    return Packets(path, use_sidecar=False)
+
+
+def category(packet):
+    if isinstance(packet, CAM):
+        return "CAM"
+    if isinstance(packet, DENM):
+        return "DENM"
+    return "Autres"
+
+
+def scan_series(packets, start=None, end=None):
+    """Count the packets of each minute label, like the original scan
+
+    The minutes overlapping the range from start to end are counted whole.
+    """
+    grouped = defaultdict(Counter)
+    for packet in packets:
+        minute = math.floor(packet.timestamp) // 60 * 60
+        if start is not None and minute < start // 60 * 60:
+            continue
+        if end is not None and minute > end:
+            continue
+        grouped[packet.time[:16] + ":00"][category(packet)] += 1
+    times = sorted(grouped)
+    return {
+        "times": times,
+        "cam_counts": [grouped[time]["CAM"] for time in times],
+        "denm_counts": [grouped[time]["DENM"] for time in times],
+        "other_counts": [grouped[time]["Autres"] for time in times],
+    }
+
+
+def test_series_match_the_scan(minutes):
+    scan = scan_series(minutes.packets)
+    assert len(scan["times"]) >= 3
+    assert minutes.time_series_data() == scan
+
+
+def test_series_of_a_range(minutes):
+    packets = minutes.packets
+    start, end = packets[400].timestamp, packets[1100].timestamp
+    assert len(scan_series(packets, start, end)["times"]) < len(
+        scan_series(packets)["times"]
+    )
+    assert minutes.time_series_data(start, end) == scan_series(packets, start, end)
+    # Bornes données en heure locale de la capture
+    series = minutes.time_series_data(packets[400].time, packets[1100].time)
+    assert series == scan_series(packets, start, end)
+
+
+def test_every_resolution_counts_every_packet(minutes):
+    packets = minutes.packets
+    totals = Counter(category(packet) for packet in packets)
+    lengths = Counter()
+    for packet in packets:
+        lengths[category(packet)] += packet.frame_len
+    for resolution in RESOLUTIONS:
+        buckets = minutes.rollups.query(resolution=resolution)
+        assert buckets["resolution"] == resolution
+        assert buckets["times"] == sorted(set(buckets["times"]))
+        assert all(time % resolution == 0 for time in buckets["times"])
+        for name in CATEGORIES:
+            assert sum(buckets[name]["counts"]) == totals[name]
+            assert sum(buckets[name]["bytes"]) == lengths[name]
+
+
+def test_buckets_match_the_scan(minutes):
+    packets = minutes.packets
+    for resolution in RESOLUTIONS[:2]:
+        expected = Counter(
+            int(packet.timestamp) // resolution * resolution for packet in packets
+        )
+        buckets = minutes.rollups.query(resolution=resolution)
+        counts = [
+            sum(buckets[name]["counts"][index] for name in CATEGORIES)
+            for index in range(len(buckets["times"]))
+        ]
+        assert dict(zip(buckets["times"], counts)) == expected
+
+
+def test_resolution_for_points(minutes):
+    first, last = minutes.rollups._bounds()
+    assert minutes.rollups.query(points=1)["resolution"] == 60
+    assert minutes.rollups.query(points=(last - first) // 10)["resolution"] == 10
+    assert minutes.rollups.query(points=10 ** 6)["resolution"] == 1
+    series = minutes.time_series_data(points=(last - first) // 10)
+    assert sum(series["cam_counts"]) == sum(
+        isinstance(packet, CAM) for packet in minutes.packets
+    )
+
+
+def test_downsampled_series(minutes):
+    full = minutes.time_series_data(points=10 ** 6)
+    kept = minutes.time_series_data(points=10 ** 6, max_points=20)
+    # Au plus 20 points par série, les points gardés par une série le sont
+    # pour toutes
+    assert 20 <= len(kept["times"]) <= 3 * 20 < len(full["times"])
+    assert kept["times"][0] == full["times"][0]
+    assert kept["times"][-1] == full["times"][-1]
+    assert set(kept["times"]) <= set(full["times"])
+    index = {time: number for number, time in enumerate(full["times"])}
+    for name in ("cam_counts", "denm_counts", "other_counts"):
+        assert kept[name] == [full[name][index[time]] for time in kept["times"]]
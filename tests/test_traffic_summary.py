@@ -0,0 +1,101 @@
+from collections import Counter
+
+import pytest
+
+from app.models.CAM import CAM
+from app.models.DENM import DENM
+from app.models.GeoNetworking import GeoNetworking
+from app.models.Packet import Packet
+from app.models.Packets import Packets
+from app.models.TrafficSummary import TrafficSummary
+
+
+def scan_traffic(packets, attribute):
+    """Count the packets of each address, like the original loops"""
+    traffic = {}
+    for packet in packets:
+        address = getattr(packet, attribute)
+        if address not in traffic:
+            traffic[address] = 0
+        traffic[address] += 1
+    return traffic
+
+
+def scan_details(packets):
+    details = {}
+    for packet in packets:
+        if packet.src_mac not in details:
+            details[packet.src_mac] = {
+                "total_packets": 0,
+                "cam_packets": 0,
+                "denm_packets": 0,
+                "other_packets": 0,
+            }
+        details[packet.src_mac]["total_packets"] += 1
+        if isinstance(packet, CAM):
+            details[packet.src_mac]["cam_packets"] += 1
+        elif isinstance(packet, DENM):
+            details[packet.src_mac]["denm_packets"] += 1
+        else:
+            details[packet.src_mac]["other_packets"] += 1
+    return details
+
+
+@pytest.mark.parametrize("use_sidecar", [False, True])
+def test_traffic_matches_the_scans(capture, use_sidecar):
+    Packets(capture)
+    packets = Packets(capture, use_sidecar=False).packets
+    collection = Packets(capture, use_sidecar=use_sidecar)
+    # Mêmes adresses, dans l'ordre de leur premier paquet
+    assert list(collection.get_src_traffic().items()) == list(
+        scan_traffic(packets, "src_mac").items()
+    )
+    assert list(collection.get_dst_traffic().items()) == list(
+        scan_traffic(packets, "dst_mac").items()
+    )
+    assert list(collection.get_traffic_details().items()) == list(
+        scan_details(packets).items()
+    )
+
+
+def test_bytes_and_counts(capture):
+    packets = Packets(capture, use_sidecar=False).packets
+    traffic = Packets(capture).traffic
+    counts, lengths = Counter(), Counter()
+    for packet in packets:
+        counts[type(packet)] += 1
+        lengths[type(packet)] += packet.frame_len
+    assert {key: value for key, value in traffic.type_counts.items() if value} == (
+        dict(counts)
+    )
+    assert {key: value for key, value in traffic.type_bytes.items() if value} == (
+        dict(lengths)
+    )
+    for packet_type in (Packet, GeoNetworking, CAM, DENM):
+        assert traffic.count(packet_type) == sum(
+            isinstance(packet, packet_type) for packet in packets
+        )
+    sources = scan_traffic(packets, "src_mac")
+    source_bytes = Counter()
+    for packet in packets:
+        source_bytes[packet.src_mac] += packet.frame_len
+    assert dict(zip(traffic.sources, traffic.source_bytes.tolist())) == dict(
+        source_bytes
+    )
+    assert traffic.sources == list(sources)
+
+
+def test_missing_addresses(make_table):
+    specs = [
+        (CAM, {"src_mac": "02:00:00:00:00:01", "dst_mac": None, "frame_len": 10}),
+        (DENM, {"src_mac": None, "dst_mac": "ff:ff:ff:ff:ff:ff", "frame_len": 20}),
+        (Packet, {"src_mac": "02:00:00:00:00:01", "dst_mac": None}),
+        (GeoNetworking, {"src_mac": None, "dst_mac": "ff:ff:ff:ff:ff:ff"}),
+    ]
+    table = make_table(specs)
+    packets = table.materialize(range(len(specs)))
+    traffic = TrafficSummary.from_table(table)
+    assert traffic.src_traffic() == scan_traffic(packets, "src_mac")
+    assert traffic.dst_traffic() == scan_traffic(packets, "dst_mac")
+    assert traffic.traffic_details() == scan_details(packets)
+    assert traffic.source_bytes.tolist() == [10, 20]